@@ -980,7 +980,7 @@ class ErrorPreventionMechanismHistoryAdmin(admin.ModelAdmin):
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import DTPMCheckpoint, DTPMChecklistFMA03New, DTPMCheckResultNew, DTPMIssueNew, DTPMVerificationHistory
+from .models import DTPMCheckpoint, DTPMChecklistFMA03New, DTPMCheckResultNew, DTPMIssueNew, DTPMVerificationHistory, Job
 
 
 @admin.register(DTPMCheckpoint)
@@ -1155,25 +1155,15 @@ class DTPMChecklistFMA03NewAdmin(admin.ModelAdmin):
     verification_status_link.short_description = 'Verification'
     
     def regenerate_check_results(self, request, queryset):
-        """Regenerate check results for selected checklists"""
-        from django.db import transaction
-        
-        total_added = 0
-        for checklist in queryset:
-            with transaction.atomic():
-                active_checkpoints = DTPMCheckpoint.objects.filter(is_active=True)
-                existing_checkpoint_ids = checklist.check_results.values_list('checkpoint_id', flat=True)
-                
-                for checkpoint in active_checkpoints:
-                    if checkpoint.id not in existing_checkpoint_ids:
-                        DTPMCheckResultNew.objects.create(
-                            checklist=checklist,
-                            checkpoint=checkpoint,
-                            status='NG'
-                        )
-                        total_added += 1
-        
-        self.message_user(request, f'Added {total_added} missing check results')
+        """Regenerate check results for selected checklists in the background"""
+        from .job_utils import enqueue
+
+        job = enqueue(
+            'dtpm_regenerate_check_results',
+            {'checklist_ids': list(queryset.values_list('id', flat=True))},
+            user=request.user,
+        )
+        self.message_user(request, f'Queued job #{job.pk} to add missing check results')
     regenerate_check_results.short_description = 'Regenerate missing check results'
 
 
@@ -1839,6 +1829,7 @@ class ChecksheetFieldInline(admin.TabularInline):
         'is_required',
         'has_status_field',
         'requires_comment_if_nok',
+        'is_program_selector',
         'auto_fill_based_on_model',
         'is_active'
     ]
@@ -2226,6 +2217,7 @@ class ChecksheetFieldAdmin(admin.ModelAdmin):
             'fields': (
                 'has_status_field', 
                 'requires_comment_if_nok',
+                'is_program_selector',
                 'auto_fill_based_on_model', 
                 'model_value_mapping'
             ),
@@ -2323,6 +2315,9 @@ class ChecksheetFieldAdmin(admin.ModelAdmin):
         if obj.has_status_field:
             flags.append('<span style="background-color: #ffc107; color: black; padding: 2px 6px; border-radius: 3px; font-size: 10px;">OK/NOK</span>')
         
+        if obj.is_program_selector:
+            flags.append('<span style="background-color: #28a745; color: white; padding: 2px 6px; border-radius: 3px; font-size: 10px;">PROGRAM</span>')
+        
         if obj.auto_fill_based_on_model:
             flags.append('<span style="background-color: #17a2b8; color: white; padding: 2px 6px; border-radius: 3px; font-size: 10px;">AUTO-FILL</span>')
         
@@ -2534,5 +2529,20 @@ admin.site.site_header = '🔧 Checklist System Administration'
 admin.site.site_title = 'Checklist System'
 admin.site.index_title = '📋 Checksheet & Checklist Management Dashboard'
 
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Read-only view of background jobs"""
+    list_display = ['id', 'kind', 'status', 'progress_display', 'attempts', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    readonly_fields = [field.name for field in Job._meta.fields]
+
+    def progress_display(self, obj):
+        return f"{obj.progress}%"
+    progress_display.short_description = 'Progress'
+
+    def has_add_permission(self, request):
+        return False
+
+
 # Change the default empty text
 admin.site.empty_value_display = '—'
\ No newline at end of file
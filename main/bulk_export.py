@@ -0,0 +1,100 @@
+# bulk_export.py
+"""
+Bulk checklist export: every checklist matching a date range (and optional
+model / shift) rendered from the checklist template and packed into one zip
+of workbooks.
+
+Exports run as 'checklist_bulk_export' background jobs (see job_utils), and
+the finished file is kept in MEDIA_ROOT/exports/<job id>/.
+"""
+import io
+import os
+import shutil
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .job_utils import enqueue, report_progress
+from .models import ChecklistBase, Job
+
+EXPORT_DIR = 'exports'
+MAX_RANGE_DAYS = 92
+# Finished exports are removed after this long
+RETENTION = timedelta(days=2)
+
+
+def job_dir(job_id):
+    return os.path.join(settings.MEDIA_ROOT, EXPORT_DIR, str(job_id))
+
+
+def cleanup_old_exports():
+    expired = Job.objects.filter(
+        kind='checklist_bulk_export', finished_at__lt=timezone.now() - RETENTION
+    ).values_list('pk', flat=True)
+    for job_id in expired:
+        shutil.rmtree(job_dir(job_id), ignore_errors=True)
+
+
+def start_checklist_export(filters, user):
+    """
+    Queue a bulk export for ``filters`` (start_date, end_date as ISO dates,
+    optional model and shift_type). Returns the Job.
+    """
+    cleanup_old_exports()
+    return enqueue('checklist_bulk_export', filters, user=user)
+
+
+def checklist_export_queryset(filters):
+    checklists = ChecklistBase.objects.filter(
+        verification_status__date__range=[filters['start_date'], filters['end_date']]
+    )
+    if filters.get('model'):
+        checklists = checklists.filter(selected_model=filters['model'])
+    if filters.get('shift_type'):
+        checklists = checklists.filter(verification_status__shift__shift_type=filters['shift_type'])
+
+    return checklists.order_by('verification_status__date', 'created_at')
+
+
+def run_checklist_export(job):
+    """Job handler: render every matching checklist into one zip"""
+    from .export_utils import (
+        CHECKLIST_TEMPLATE_PATH, checklist_export_prefetch, render_checklist_workbook, template_cache,
+    )
+
+    filters = job.payload
+    checklists = checklist_export_queryset(filters)
+    total = checklists.count()
+    report_progress(job, 0, total, force=True)
+
+    template = template_cache.get(os.path.join(settings.STATIC_ROOT, CHECKLIST_TEMPLATE_PATH))
+    checklists = checklist_export_prefetch(checklists)
+
+    os.makedirs(job_dir(job.pk), exist_ok=True)
+    file_name = f"checklists_{filters['start_date']}_{filters['end_date']}.zip"
+    path = os.path.join(job_dir(job.pk), file_name)
+    try:
+        with zipfile.ZipFile(f'{path}.part', 'w', zipfile.ZIP_DEFLATED) as archive:
+            for done, checklist in enumerate(checklists.iterator(chunk_size=100), 1):
+                wb = render_checklist_workbook(template, checklist, list(checklist.subgroup_entries.all()))
+                buffer = io.BytesIO()
+                wb.save(buffer)
+
+                status = checklist.verification_status
+                day = status.date.isoformat() if status else 'undated'
+                shift_type = status.shift.shift_type if status else (checklist.shift or 'NA')
+                archive.writestr(
+                    f'{day}_{shift_type}_{checklist.selected_model}_{checklist.id}.xlsx',
+                    buffer.getvalue()
+                )
+                report_progress(job, done)
+    except Exception:
+        # Don't leave the partial archive behind until the retry overwrites it
+        if os.path.exists(f'{path}.part'):
+            os.remove(f'{path}.part')
+        raise
+
+    os.replace(f'{path}.part', path)
+    return {'file_name': file_name}
@@ -0,0 +1,105 @@
+# change_tracking.py
+"""
+Field change tracking without re-reading the row on save.
+
+Models using ChangeTrackingMixin keep a snapshot of their tracked fields as
+loaded from the database (``from_db``); on save the changes are diffed in
+memory and, when a history model is configured, written with a single
+``bulk_create``.
+"""
+from django.apps import apps
+from django.db import transaction
+
+
+class ChangeTrackingMixin:
+    """
+    Set ``tracked_fields`` to the attribute names to watch. To record history,
+    also set ``history_model`` ("app_label.ModelName", resolved lazily so it
+    may be defined after the tracked model), the name of its foreign key to
+    the tracked object (``history_object_field``) and of its user field
+    (``history_user_field``); the history model must have ``field_name``,
+    ``old_value`` and ``new_value``.
+
+    ``watched_fields`` are compared the same way but never written to
+    history; the names of those changed by a save are left in
+    ``saved_watched_changes``. Writes that bypass save() (QuerySet.update(),
+    bulk_update()) are not seen at all.
+    """
+    tracked_fields = ()
+    watched_fields = ()
+    history_model = None
+    history_object_field = None
+    history_user_field = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked(dict(zip(field_names, values)))
+        return instance
+
+    def _snapshot_tracked(self, values=None):
+        if values is None:
+            values = self.__dict__
+        self._loaded_values = {
+            field: values[field] for field in self._snapshot_fields() if field in values
+        }
+
+    def _snapshot_fields(self):
+        return tuple(self.tracked_fields) + tuple(self.watched_fields)
+
+    def _loaded_tracked_values(self):
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None and self.pk:
+            # Not loaded through a queryset (e.g. built by hand with a pk)
+            loaded = type(self)._default_manager.filter(pk=self.pk).values(*self._snapshot_fields()).first()
+        return loaded or {}
+
+    def tracked_changes(self, fields=None):
+        """[(field, old value, new value)] for tracked fields (or ``fields``) changed since load"""
+        if not self.pk:
+            return []
+        loaded = self._loaded_tracked_values()
+        return [
+            (field, loaded[field], getattr(self, field))
+            for field in (self.tracked_fields if fields is None else fields)
+            if field in loaded and loaded[field] != getattr(self, field)
+        ]
+
+    def build_history(self, changes, user):
+        history_model = apps.get_model(self.history_model)
+        return [
+            history_model(**{
+                self.history_object_field: self,
+                self.history_user_field: user,
+                'field_name': field,
+                'old_value': str(old_value) if old_value is not None else None,
+                'new_value': str(new_value) if new_value is not None else None,
+            })
+            for field, old_value, new_value in changes
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Save, then store one history row per changed tracked field in a
+        single INSERT. History is written when a history model is configured
+        and the editing user has been set on the instance (``_editing_user``).
+        The changes are left in ``saved_changes`` (and the changed watched
+        fields in ``saved_watched_changes``) for post_save receivers.
+        """
+        changes = self.tracked_changes()
+        watched = {field for field, _, _ in self.tracked_changes(self.watched_fields)}
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # update_fields holds field names; watched fields may be attnames
+            saved = {self._meta.get_field(name).attname for name in update_fields} | set(update_fields)
+            changes = [change for change in changes if change[0] in saved]
+            watched &= saved
+        self.saved_changes = changes
+        self.saved_watched_changes = watched
+
+        user = getattr(self, '_editing_user', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if changes and user and self.history_model:
+                apps.get_model(self.history_model).objects.bulk_create(self.build_history(changes, user))
+        self._snapshot_tracked()
@@ -0,0 +1,94 @@
+# checklist_utils.py
+"""
+Setup of a newly created ChecklistBase.
+
+Everything a new checklist needs (frequency config, category timings, the
+verification status moving to in progress) is done here in a fixed number
+of queries, inside the transaction the checklist is created in.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SubgroupCategoryFrequencyConfig, SubgroupCategoryTiming, SubgroupFrequencyConfig
+
+DEFAULT_CATEGORY_FREQUENCY_MINUTES = 60
+DEFAULT_CATEGORY_MAX_READINGS = 5
+
+
+def category_configs_for_model(model_name):
+    """
+    {category: SubgroupCategoryFrequencyConfig} for every category of
+    ``model_name``, creating the missing ones with defaults in one INSERT
+    """
+    configs = {
+        config.category: config
+        for config in SubgroupCategoryFrequencyConfig.objects.filter(model_name=model_name)
+    }
+    missing = [
+        SubgroupCategoryFrequencyConfig(
+            model_name=model_name,
+            category=category,
+            frequency_minutes=DEFAULT_CATEGORY_FREQUENCY_MINUTES,
+            max_readings_per_shift=DEFAULT_CATEGORY_MAX_READINGS,
+            is_active=True,
+        )
+        for category, _ in SubgroupCategoryFrequencyConfig.CATEGORY_CHOICES
+        if category not in configs
+    ]
+    for config in SubgroupCategoryFrequencyConfig.objects.bulk_create(missing):
+        configs[config.category] = config
+    return configs
+
+
+def create_category_timings(checklist):
+    """Add the timing rows the checklist is missing, one per category"""
+    configs = category_configs_for_model(checklist.selected_model)
+    existing = set(
+        SubgroupCategoryTiming.objects.filter(checklist=checklist).values_list('category', flat=True)
+    )
+
+    now = timezone.now()
+    SubgroupCategoryTiming.objects.bulk_create([
+        SubgroupCategoryTiming(
+            checklist=checklist,
+            category=category,
+            last_reading_time=now,
+            next_reading_due=now + timedelta(minutes=config.frequency_minutes),
+            frequency_config=config,
+            readings_count=0,
+            is_overdue=False,
+        )
+        for category, config in configs.items()
+        if category not in existing
+    ])
+
+
+def initialize_checklist(checklist):
+    """
+    Run once for a new checklist, in its creation transaction: make sure
+    the model has a frequency config, create the category timings and mark
+    the verification status as in progress.
+    """
+    from .schedule_utils import get_subgroup_schedule
+
+    if checklist.selected_model:
+        SubgroupFrequencyConfig.objects.get_or_create(
+            model_name=checklist.selected_model,
+            defaults={'frequency_hours': 2, 'max_subgroups': 6}
+        )
+
+    create_category_timings(checklist)
+
+    if checklist.verification_status_id:
+        # A real save, so the status receivers (e.g. invalidating the
+        # schedules of the other checklists on it) still run
+        verification_status = checklist.verification_status
+        verification_status.status = 'in_progress'
+        verification_status.supervisor_notified = True
+        verification_status.save(update_fields=['status', 'supervisor_notified', 'updated_at'])
+
+    # Build the schedule once the checklist is committed, so the first
+    # dashboard poll is a cache hit
+    transaction.on_commit(lambda: get_subgroup_schedule(checklist))
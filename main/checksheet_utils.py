@@ -0,0 +1,181 @@
+# checksheet_utils.py
+"""
+Compiled checksheet schemas.
+
+A ChecksheetSchema is built once per checksheet with a single prefetch:
+its active sections and fields in display order, each field's POST keys
+and the program selection field. Schemas are cached in the process and
+dropped when a section or field of the checksheet changes (and after
+SCHEMA_TIMEOUT, so other processes pick up changes too).
+
+Field responses read from a submitted form are written back with
+save_field_responses, one upsert for the whole checksheet.
+"""
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Checksheet, ChecksheetField, ChecksheetFieldResponse, ChecksheetSection
+
+SCHEMA_TIMEOUT = 300
+
+
+class CompiledField:
+    """An active ChecksheetField with its form keys"""
+    __slots__ = ('field', 'id', 'field_key', 'status_key', 'comment_key')
+
+    def __init__(self, field):
+        self.field = field
+        self.id = field.id
+        self.field_key = f'field_{field.id}'
+        self.status_key = f'status_{field.id}'
+        self.comment_key = f'comment_{field.id}'
+
+
+class ChecksheetSchema:
+    def __init__(self, checksheet, sections):
+        self.checksheet_id = checksheet.pk
+        # ChecksheetSection instances with their active fields prefetched,
+        # so templates can iterate section.fields.all without queries
+        self.sections = sections
+        self.fields = [
+            CompiledField(field) for section in sections for field in section.fields.all()
+        ]
+        self.fields_by_id = {compiled.id: compiled for compiled in self.fields}
+        self.program_field = next(
+            (compiled for compiled in self.fields if compiled.field.is_program_selector), None
+        )
+        self.built_at = time.monotonic()
+
+    def selected_model(self, data):
+        """The model chosen in the program selection field of submitted ``data``"""
+        if self.program_field is None:
+            return None
+        return data.get(self.program_field.field_key, '') or None
+
+
+def build_schema(checksheet_id):
+    checksheet = Checksheet.objects.prefetch_related(
+        Prefetch(
+            'sections',
+            queryset=ChecksheetSection.objects.filter(is_active=True).order_by('order').prefetch_related(
+                Prefetch('fields', queryset=ChecksheetField.objects.filter(is_active=True).order_by('order'))
+            )
+        )
+    ).get(pk=checksheet_id)
+    return ChecksheetSchema(checksheet, list(checksheet.sections.all()))
+
+
+class SchemaCache:
+    def __init__(self):
+        self._schemas = {}
+        self._lock = threading.Lock()
+
+    def get(self, checksheet_id):
+        schema = self._schemas.get(checksheet_id)
+        if schema is None or time.monotonic() - schema.built_at > SCHEMA_TIMEOUT:
+            schema = build_schema(checksheet_id)
+            with self._lock:
+                self._schemas[checksheet_id] = schema
+        return schema
+
+    def invalidate(self, checksheet_id=None):
+        with self._lock:
+            if checksheet_id is None:
+                self._schemas.clear()
+            else:
+                self._schemas.pop(checksheet_id, None)
+
+
+schema_cache = SchemaCache()
+
+
+def read_field_values(schema, data):
+    """
+    Values of every schema field from the POSTed ``data``, validated.
+    Returns ([(field, value, status, comment)], errors).
+    """
+    selected_model = schema.selected_model(data)
+    rows = []
+    errors = []
+
+    for compiled in schema.fields:
+        field = compiled.field
+        comment = data.get(compiled.comment_key, '').strip()
+        value = data.get(compiled.field_key, '').strip()
+        # For OK/NOK and Yes/No fields without a separate status the value
+        # IS the selection; otherwise the status comes in its own input
+        status = data.get(compiled.status_key, '').strip() if field.has_status_field else ''
+
+        # Auto-fill based on model (only if value is empty)
+        if field.auto_fill_based_on_model and selected_model and field.model_value_mapping and not value:
+            auto_value = field.get_value_for_model(selected_model)
+            if auto_value:
+                value = auto_value
+
+        # Required: the status when the field has one, otherwise the value
+        if field.is_required and not (status if field.has_status_field else value):
+            errors.append(f"{field.label} is required")
+
+        if field.requires_comment_if_nok:
+            if field.has_status_field:
+                if status in ['NOK', 'No'] and not comment:
+                    errors.append(f"Comment is required for '{field.label}' when {status}")
+            elif field.field_type in ['ok_nok', 'yes_no']:
+                if value in ['NOK', 'No'] and not comment:
+                    errors.append(f"Comment is required for '{field.label}' when {value}")
+
+        if field.field_type in ['number', 'decimal'] and value:
+            try:
+                numeric_value = float(value)
+                if field.min_value is not None and numeric_value < field.min_value:
+                    errors.append(f"{field.label} must be at least {field.min_value} {field.unit}")
+                if field.max_value is not None and numeric_value > field.max_value:
+                    errors.append(f"{field.label} must be at most {field.max_value} {field.unit}")
+            except ValueError:
+                errors.append(f"{field.label} must be a valid number")
+
+        rows.append((field, value, status, comment))
+
+    return rows, errors
+
+
+def save_field_responses(response, rows, user):
+    """
+    Store the (field, value, status, comment) ``rows`` of ``response``:
+    the existing field responses are read in one query and the new or
+    changed ones written with a single upsert on (response, field), after
+    which the response's completion and NOK counters are recomputed.
+    Returns the number of rows written.
+    """
+    existing = {
+        field_id: (value, status, comment)
+        for field_id, value, status, comment in ChecksheetFieldResponse.objects.filter(
+            response=response
+        ).values_list('field_id', 'value', 'status', 'comment')
+    }
+
+    changed = [
+        ChecksheetFieldResponse(
+            response=response,
+            field=field,
+            value=value,
+            status=status,
+            comment=comment,
+            filled_by=user,
+        )
+        for field, value, status, comment in rows
+        if existing.get(field.id) != (value, status, comment)
+    ]
+    with transaction.atomic():
+        if changed:
+            ChecksheetFieldResponse.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['response', 'field'],
+                update_fields=['value', 'status', 'comment', 'filled_by', 'filled_at'],
+            )
+        response.refresh_counters()
+    return len(changed)
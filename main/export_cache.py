@@ -0,0 +1,142 @@
+# export_cache.py
+"""
+On-disk cache of generated export files for records whose content is final
+(quality approved / verified).
+
+Files are content-addressed: the key is a hash of (export type, pk,
+version), where the version covers everything the file is rendered from.
+The key doubles as the ETag, so a client holding it gets a 304 without the
+file even being read. Least recently used files are evicted once the cache
+grows past EXPORT_CACHE_MAX_BYTES.
+"""
+import hashlib
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+
+from .export_utils import XLSX_CONTENT_TYPE
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = 'export_cache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ExportFileCache:
+    def __init__(self):
+        self._evict_lock = threading.Lock()
+
+    @property
+    def root(self):
+        return os.path.join(settings.MEDIA_ROOT, CACHE_DIR)
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, 'EXPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+    @staticmethod
+    def key(export_type, pk, version):
+        return hashlib.sha256(f'{export_type}:{pk}:{version}'.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], f'{key}.xlsx')
+
+    def get(self, key):
+        """Path of the cached file, marked as just used; None on a miss"""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, workbook):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        workbook.save(tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        """Delete least recently used files until the cache fits in max_bytes"""
+        with self._evict_lock:
+            files = []
+            total = 0
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    if not name.endswith('.xlsx'):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+export_cache = ExportFileCache()
+
+
+def fingerprint(*parts):
+    """
+    Hash of everything an export is rendered from, for use as its version.
+    Model instances contribute their concrete field values, so a change to
+    any related row that is passed in changes the version even when it
+    bumps no timestamp.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, models.Model):
+            part = (part._meta.label, [getattr(part, field.attname) for field in part._meta.concrete_fields])
+        digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+
+def cached_export_response(request, export_type, pk, version, render, filename):
+    """
+    Serve the export identified by (``export_type``, ``pk``, ``version``)
+    from the cache, rendering it with ``render()`` (returning a workbook)
+    only on a miss. Honours If-None-Match.
+    """
+    key = export_cache.key(export_type, pk, version)
+    etag = f'"{key}"'
+
+    if _etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        path = export_cache.get(key)
+        if path is None:
+            path = export_cache.put(key, render())
+            logger.info("Cached %s export %s", export_type, pk)
+        response = FileResponse(
+            open(path, 'rb'), as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE
+        )
+
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
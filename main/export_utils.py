@@ -0,0 +1,607 @@
+# export_utils.py
+import copy
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+from django.db.models import Prefetch
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .models import (
+    DTPMCheckResult, DTPMIssue, ErrorPreventionMechanismStatus,
+    SubgroupEntry,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WorkbookTemplate:
+    """
+    A parsed Excel template. ``anchors`` maps every cell coordinate that is
+    part of a merged range to the coordinate of the range's top-left cell,
+    so writers never have to scan ``merged_cells.ranges`` per cell.
+    """
+
+    def __init__(self, path, mtime, workbook):
+        self.path = path
+        self.mtime = mtime
+        self.workbook = workbook
+        self.anchors = {}
+        for ws in workbook.worksheets:
+            sheet_anchors = {}
+            for merged_range in ws.merged_cells.ranges:
+                anchor = merged_range.start_cell.coordinate
+                for row in ws.iter_rows(
+                    min_row=merged_range.min_row, max_row=merged_range.max_row,
+                    min_col=merged_range.min_col, max_col=merged_range.max_col
+                ):
+                    for cell in row:
+                        sheet_anchors[cell.coordinate] = anchor
+            self.anchors[ws.title] = sheet_anchors
+
+    def copy(self):
+        """A private copy of the workbook for one export"""
+        return copy.deepcopy(self.workbook)
+
+
+class WorkbookTemplateCache:
+    """
+    Parses each template once per process and re-parses it only when the
+    file's mtime changes.
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        mtime = os.path.getmtime(path)
+        template = self._templates.get(path)
+        if template is not None and template.mtime == mtime:
+            return template
+
+        with self._lock:
+            template = self._templates.get(path)
+            if template is None or template.mtime != mtime:
+                workbook = load_workbook(path)
+                # Drop external links once so copies don't trigger validation warnings
+                if getattr(workbook, 'external_links', None):
+                    workbook.external_links = []
+                template = WorkbookTemplate(path, mtime, workbook)
+                self._templates[path] = template
+                logger.info("Loaded Excel template %s", path)
+            return template
+
+
+template_cache = WorkbookTemplateCache()
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def streamed_xlsx_response(build, filename):
+    """
+    Build a workbook with XlsxWriter in ``constant_memory`` mode and stream
+    it to the client. ``build(workbook)`` must write each sheet's rows in
+    order. Rows are flushed to disk as they are written and the finished
+    file is served from a temporary file in chunks, so memory stays flat
+    however many rows are exported.
+    """
+    import xlsxwriter
+
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    try:
+        build(workbook)
+    finally:
+        workbook.close()
+    output.seek(0)
+
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+
+# Style cache: every fill/font/alignment is created once per process and
+# shared by all exported cells
+def _style(fill=None, font=None, alignment=None):
+    return {
+        'fill': PatternFill(start_color=fill, end_color=fill, fill_type='solid') if fill else None,
+        'font': Font(**font) if font else None,
+        'alignment': Alignment(**alignment) if alignment else None,
+    }
+
+
+STYLES = {
+    'title': _style(font={'size': 14, 'bold': True}, alignment={'horizontal': 'center'}),
+    'section': _style(font={'size': 12, 'bold': True}),
+    'header': _style('1F4E78', {'color': 'FFFFFF', 'bold': True}, {'horizontal': 'center', 'vertical': 'center'}),
+    # Template checklist pass/fail cells
+    'pass': _style('C6EFCE', {'color': '006100'}, {'horizontal': 'center', 'vertical': 'center'}),
+    'fail': _style('FFC7CE', {'color': '9C0006'}, {'horizontal': 'center', 'vertical': 'center'}),
+    # OK/NG/N/A result cells
+    'ok': _style('C6EFCE', {'color': '006100'}, {'horizontal': 'center'}),
+    'ng': _style('FFC7CE', {'color': '9C0006'}, {'horizontal': 'center'}),
+    'na': _style('FFEB9C', {'color': '9C6500'}, {'horizontal': 'center'}),
+}
+
+
+def apply_style(cell, style):
+    if isinstance(style, str):
+        style = STYLES[style]
+    if style['fill'] is not None:
+        cell.fill = style['fill']
+    if style['font'] is not None:
+        cell.font = style['font']
+    if style['alignment'] is not None:
+        cell.alignment = style['alignment']
+
+
+# Checklist export ("new demo.xlsx") cell mapping
+
+CHECKLIST_TEMPLATE_PATH = os.path.join('templates', 'new demo.xlsx')
+
+# Single-value machine settings, written to column B
+CHECKLIST_FIELD_ROWS = [
+    (20, 'selected_model', False),
+    (21, 'line_pressure', False),
+    (22, 'oring_condition', True),
+    (23, 'uv_flow_input_pressure', False),
+    (26, 'master_verification_lvdt', True),
+    (27, 'good_bad_master_verification', True),
+    (28, 'test_pressure_vacuum', False),
+    (30, 'tool_alignment', True),
+    (31, 'top_tool_id', False),
+    (32, 'bottom_tool_id', False),
+    (33, 'uv_assy_stage_id', False),
+    (35, 'retainer_part_no', False),
+    (36, 'uv_clip_part_no', False),
+    (37, 'umbrella_part_no', False),
+    (38, 'retainer_id_lubrication', True),
+]
+
+# Per-subgroup measurements with their acceptance ranges
+SUBGROUP_MEASUREMENT_ROWS = [
+    (24, 'uv_vacuum_test', (-43, -35)),
+    (25, 'uv_flow_value', (30, 40)),
+]
+
+# Per-subgroup OK/Yes checks
+SUBGROUP_CHECK_ROWS = [
+    (29, 'umbrella_valve_assembly'),
+    (39, 'uv_clip_pressing'),
+    (41, 'workstation_clean'),
+    (42, 'error_proofing_verification'),
+    (43, 'bin_contamination_check'),
+]
+
+# Signatures, taken from the shift
+SIGNATURE_ROWS = [
+    (44, 'operator'),
+    (45, 'shift_supervisor'),
+    (46, 'quality_supervisor'),
+]
+
+_checklist_plans = {}
+
+
+def checklist_cell_plan(template, subgroup_count):
+    """
+    Precompiled list of writes for a checklist with ``subgroup_count``
+    subgroups: (anchor coordinate, source, field, subgroup index, style rule).
+
+    Compiled once per template version and subgroup count. Coordinates are
+    already resolved to merged-range anchors and overlapping writes are
+    collapsed to the last one, which is the one that used to win.
+    """
+    key = (template.path, template.mtime, subgroup_count)
+    plan = _checklist_plans.get(key)
+    if plan is not None:
+        return plan
+
+    writes = [
+        ('B5', 'header', 'date', None, None),
+        ('E5', 'header', 'shift', None, None),
+    ]
+
+    # Record time, row 16
+    for sg_index in range(subgroup_count):
+        col_start = 2 + sg_index * 5
+        for i in range(5):
+            writes.append((f'{get_column_letter(col_start + i)}16', 'time', None, sg_index, None))
+
+    for row, field, pass_fail in CHECKLIST_FIELD_ROWS:
+        writes.append((f'B{row}', 'checklist', field, None, 'ok_ng' if pass_fail else None))
+
+    for row, field, limits in SUBGROUP_MEASUREMENT_ROWS:
+        for sg_index in range(subgroup_count):
+            col_start = 2 + sg_index * 5
+            for i in range(6):
+                writes.append((f'{get_column_letter(col_start + i)}{row}', 'measurement', field, sg_index, limits))
+
+    for row, field in SUBGROUP_CHECK_ROWS:
+        for sg_index in range(subgroup_count):
+            col_start = 2 + sg_index * 6
+            for i in range(5):
+                writes.append((f'{get_column_letter(col_start + i)}{row}', 'check', field, sg_index, 'ok_yes'))
+
+    for row, field in SIGNATURE_ROWS:
+        for sg_index in range(subgroup_count):
+            col_start = 2 + sg_index * 6
+            for i in range(5):
+                writes.append((f'{get_column_letter(col_start + i)}{row}', 'signature', field, sg_index, None))
+
+    anchors = template.anchors[template.workbook.active.title]
+    resolved = {}
+    for coord, *rest in writes:
+        anchor = anchors.get(coord, coord)
+        # Re-insert so the surviving write keeps its original (last) position
+        resolved.pop(anchor, None)
+        resolved[anchor] = tuple(rest)
+
+    plan = [(coord, *rest) for coord, rest in resolved.items()]
+    _checklist_plans[key] = plan
+    return plan
+
+
+def checklist_export_prefetch(queryset):
+    """Prefetch plan for render_checklist_workbook: shift people and ordered subgroups"""
+    return queryset.select_related(
+        'verification_status__shift__operator',
+        'verification_status__shift__shift_supervisor',
+        'verification_status__shift__quality_supervisor',
+    ).prefetch_related(
+        Prefetch('subgroup_entries', queryset=SubgroupEntry.objects.order_by('subgroup_number'))
+    )
+
+
+def _signature_name(user):
+    if not user:
+        return 'N/A'
+    return user.get_full_name().strip() or user.username
+
+
+def render_checklist_workbook(template, checklist, subgroups):
+    """
+    Fill a private copy of the checklist template for ``checklist`` and its
+    ordered ``subgroups``. Load checklists with checklist_export_prefetch().
+    """
+    wb = template.copy()
+    ws = wb.active
+
+    verification_status = checklist.verification_status
+    shift = verification_status.shift if verification_status else None
+    if shift:
+        header = {
+            'date': shift.date.strftime('%Y-%m-%d'),
+            'shift': shift.get_shift_type_display(),
+        }
+    else:
+        header = {
+            'date': timezone.localtime(checklist.created_at).strftime('%Y-%m-%d'),
+            'shift': checklist.get_shift_display() if checklist.shift else 'N/A',
+        }
+    record_times = [timezone.localtime(sg.timestamp).strftime('%H:%M') for sg in subgroups]
+    signatures = {
+        field: _signature_name(getattr(shift, field, None))
+        for _, field in SIGNATURE_ROWS
+    }
+
+    for coord, source, field, sg_index, style_rule in checklist_cell_plan(template, len(subgroups)):
+        if source == 'header':
+            value = header[field]
+        elif source == 'time':
+            value = record_times[sg_index]
+        elif source == 'checklist':
+            value = getattr(checklist, field, 'N/A')
+            if value is None:
+                value = 'N/A'
+        elif source == 'measurement':
+            value = getattr(subgroups[sg_index], field, 0)
+            if value is None:
+                value = 0
+        elif source == 'check':
+            value = getattr(subgroups[sg_index], field, 'N/A')
+            if value is None:
+                value = 'N/A'
+        else:
+            value = signatures[field]
+
+        cell = ws[coord]
+        cell.value = value
+
+        # Pass/fail styling
+        if style_rule == 'ok_ng':
+            if value in ['OK', 'NG']:
+                apply_style(cell, 'pass' if value == 'OK' else 'fail')
+        elif style_rule == 'ok_yes':
+            apply_style(cell, 'pass' if value in ['OK', 'Yes'] else 'fail')
+        elif style_rule is not None:
+            low, high = style_rule
+            try:
+                within = low <= value <= high
+            except TypeError:
+                continue
+            apply_style(cell, 'pass' if within else 'fail')
+
+    return wb
+
+
+# Export engine for the generated (non-template) sheets: a sheet is
+# described once as blocks of fields and tables, and rendered for one or
+# many objects loaded with the export's prefetch plan.
+
+class Field:
+    """A label/value pair; the value may be merged across to ``merge_to``"""
+
+    def __init__(self, label, value, merge_to=None):
+        self.label = label
+        self.value = value
+        self.merge_to = merge_to
+
+
+class Column:
+    """A table column; ``style(row, value)`` names a STYLES entry or returns None"""
+
+    def __init__(self, header, value, width=None, style=None):
+        self.header = header
+        self.value = value
+        self.width = width
+        self.style = style
+
+
+class Fields:
+    """
+    Rows of up to two Fields (label columns A and D, values B and E), with
+    an optional section title above them. A None row is left blank.
+    """
+
+    def __init__(self, rows, title=None, space_before=1):
+        self.rows = rows
+        self.title = title
+        self.space_before = space_before
+
+
+class Table:
+    """A header row and one row per item of ``rows(obj)``"""
+
+    def __init__(self, columns, rows, title=None, space_before=1, skip_empty=False):
+        self.columns = columns
+        self.rows = rows
+        self.title = title
+        self.space_before = space_before
+        self.skip_empty = skip_empty
+
+
+class SheetSpec:
+    """
+    A generated export: the sheet layout, a title and file name per object,
+    and ``prefetch(queryset)`` loading everything the layout reads so a
+    batch of objects is rendered without per-row queries.
+    """
+
+    def __init__(self, title, blocks, column_widths, sheet_name, filename,
+                 prefetch, span='G'):
+        self.title = title
+        self.blocks = blocks
+        self.column_widths = column_widths
+        self.sheet_name = sheet_name
+        self.filename = filename
+        self.prefetch = prefetch
+        self.span = span
+
+
+def excel_value(value):
+    """Excel has no time zones: aware datetimes are written in local time"""
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def _write_title(ws, row, text, style, span):
+    ws.merge_cells(f'A{row}:{span}{row}')
+    cell = ws[f'A{row}']
+    cell.value = text
+    apply_style(cell, style)
+
+
+def render_sheet(ws, spec, obj):
+    _write_title(ws, 1, spec.title, 'title', spec.span)
+    row = 1
+
+    for block in spec.blocks:
+        if isinstance(block, Table):
+            items = list(block.rows(obj))
+            if block.skip_empty and not items:
+                continue
+        row += block.space_before + 1
+
+        if block.title:
+            _write_title(ws, row, block.title, 'section', spec.span)
+            row += 1
+
+        if isinstance(block, Fields):
+            for fields in block.rows:
+                if fields:
+                    for field, label_col in zip(fields, (1, 4)):
+                        ws.cell(row=row, column=label_col, value=field.label)
+                        ws.cell(row=row, column=label_col + 1, value=excel_value(field.value(obj)))
+                        if field.merge_to:
+                            ws.merge_cells(f'{get_column_letter(label_col + 1)}{row}:{field.merge_to}{row}')
+                row += 1
+            row -= 1
+            continue
+
+        for col, column in enumerate(block.columns, 1):
+            apply_style(ws.cell(row=row, column=col, value=column.header), 'header')
+        for item in items:
+            row += 1
+            for col, column in enumerate(block.columns, 1):
+                value = column.value(item)
+                cell = ws.cell(row=row, column=col, value=excel_value(value))
+                style = column.style(item, value) if column.style else None
+                if style:
+                    apply_style(cell, style)
+
+    for col, width in enumerate(spec.column_widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+
+def render_workbook(spec, objects):
+    """One sheet per object, in a single pass over an already prefetched iterable"""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for obj in objects:
+        render_sheet(wb.create_sheet(spec.sheet_name(obj)), spec, obj)
+    if not wb.worksheets:
+        wb.create_sheet(spec.title[:31])
+    return wb
+
+
+def workbook_response(wb, filename):
+    response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    wb.save(response)
+    return response
+
+
+def _username(user, default=''):
+    return user.username if user else default
+
+
+def _result_style(row, value):
+    return {'OK': 'ok', 'NG': 'ng'}.get(value)
+
+
+# DTPM FMA03 checklist
+
+def _dtpm_prefetch(queryset):
+    return queryset.select_related('shift', 'operator', 'supervisor').prefetch_related(
+        Prefetch(
+            'check_results',
+            queryset=DTPMCheckResult.objects.select_related('checked_by').order_by('item_number')
+        ),
+        Prefetch('check_results__issues', queryset=DTPMIssue.objects.select_related('reported_by')),
+    )
+
+
+def _dtpm_issues(checklist):
+    return [issue for check in checklist.check_results.all() for issue in check.issues.all()]
+
+
+_DTPM_ITEM_DESCRIPTIONS = dict(DTPMCheckResult.CHECK_ITEMS)
+
+DTPM_EXPORT = SheetSpec(
+    title="DTPM FMA03 Operation 35 Checklist",
+    blocks=[
+        Fields([
+            [Field("Date:", lambda c: c.date), Field("Shift:", lambda c: c.shift.get_shift_type_display())],
+            [Field("Operator:", lambda c: c.operator.username), Field("Status:", lambda c: c.get_status_display())],
+        ]),
+        Table(
+            [
+                Column('Item #', lambda r: r.item_number),
+                Column('Description', lambda r: _DTPM_ITEM_DESCRIPTIONS.get(r.item_number, '')),
+                Column('Result', lambda r: r.result, style=_result_style),
+                Column('Comments', lambda r: r.comments),
+                Column('Checked By', lambda r: _username(r.checked_by)),
+                Column('Checked At', lambda r: r.checked_at),
+            ],
+            rows=lambda c: c.check_results.all(),
+        ),
+        Table(
+            [
+                Column('Check Item', lambda i: i.check_result.item_number),
+                Column('Description', lambda i: i.description),
+                Column('Priority', lambda i: i.get_priority_display()),
+                Column('Status', lambda i: i.get_status_display()),
+                Column('Reported By', lambda i: _username(i.reported_by)),
+                Column('Created At', lambda i: i.created_at),
+            ],
+            rows=_dtpm_issues,
+            title="Issues",
+            space_before=2,
+            skip_empty=True,
+        ),
+    ],
+    column_widths=[10, 50, 10, 30, 15, 20],
+    sheet_name=lambda c: f"{c.date} #{c.pk}",
+    filename=lambda c: f"dtpm_checklist_{c.date}.xlsx",
+    prefetch=_dtpm_prefetch,
+)
+
+
+# Error Prevention check
+
+def _ep_prefetch(queryset):
+    return queryset.select_related(
+        'verification_status__shift', 'operator', 'supervisor', 'quality_supervisor'
+    ).prefetch_related(
+        Prefetch(
+            'mechanism_statuses',
+            queryset=ErrorPreventionMechanismStatus.objects.select_related('mechanism').order_by('ep_mechanism_id')
+        ),
+    )
+
+
+def _ep_status_value(status):
+    return 'N/A' if status.is_not_applicable else status.status
+
+
+def _ep_status_style(status, value):
+    return 'na' if status.is_not_applicable else _result_style(status, value)
+
+
+def _ep_mechanism_id(status):
+    return status.mechanism.mechanism_id if status.mechanism else status.ep_mechanism_id
+
+
+def _ep_mechanism_description(status):
+    return status.mechanism.description if status.mechanism else 'Unknown'
+
+
+EP_EXPORT = SheetSpec(
+    title="Error Prevention Check Master List",
+    blocks=[
+        Fields([
+            [Field("Date:", lambda c: c.date),
+             Field("Shift:", lambda c: c.verification_status.shift.get_shift_type_display())],
+            [Field("Operator:", lambda c: c.operator.username), Field("Model:", lambda c: c.current_model)],
+            [Field("Status:", lambda c: c.get_status_display())],
+        ]),
+        Table(
+            [
+                Column('Mechanism ID', _ep_mechanism_id),
+                Column('Description', _ep_mechanism_description),
+                Column('Status', _ep_status_value, style=_ep_status_style),
+                Column('N/A', lambda s: 'Yes' if s.is_not_applicable else 'No'),
+                Column('Working', lambda s: 'Yes' if s.is_working else 'No'),
+                Column('Alternative Method', lambda s: s.alternative_method),
+                Column('Comments', lambda s: s.comments),
+            ],
+            rows=lambda c: c.mechanism_statuses.all(),
+        ),
+        Fields(
+            [
+                None,
+                [Field("Operator:", lambda c: c.operator.username)],
+                [Field("Supervisor:", lambda c: _username(c.supervisor, 'Not verified'))],
+                [Field("Quality Supervisor:", lambda c: _username(c.quality_supervisor, 'Not verified'))],
+                None,
+                [Field("Comments:", lambda c: c.comments, merge_to='G')],
+                None,
+                [Field("Verification Status:", lambda c: c.verification_status.get_status_display())],
+            ],
+            title="Verification Details",
+            space_before=2,
+        ),
+    ],
+    column_widths=[15, 40, 10, 10, 10, 25, 30],
+    sheet_name=lambda c: f"{c.date} #{c.pk}",
+    filename=lambda c: f"ep_check_{c.date}.xlsx",
+    prefetch=_ep_prefetch,
+)
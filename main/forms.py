@@ -19,6 +19,7 @@ from .models import (
     DefectType
 )
 from .models import SubgroupEntry, SubgroupFrequencyConfig, ChecksheetContentConfig
+from .shift_calendar import current_shift_type
 
 class DateInput(forms.DateInput):
     """Custom DateInput with HTML5 date type for better date pickers"""
@@ -315,36 +316,12 @@ class ChecklistBaseForm(forms.ModelForm):
 
 
 # Updated utility functions for views.py
-def get_current_shift_type():
-    """Get current shift type based on time - UPDATED"""
-    from django.utils import timezone
-    
-    current_hour = timezone.localtime(timezone.now()).hour
-    current_minute = timezone.localtime(timezone.now()).minute
-    current_time_minutes = current_hour * 60 + current_minute
-    
-    # Define shift time ranges in minutes from midnight
-    if (6 * 60 + 30) <= current_time_minutes < (15 * 60):  # 6:30 AM to 3:00 PM
-        return 'A'
-    elif (8 * 60 + 30) <= current_time_minutes < (17 * 60):  # 8:30 AM to 5:00 PM
-        return 'G'
-    elif (15 * 60) <= current_time_minutes < (23 * 60 + 30):  # 3:00 PM to 11:30 PM
-        return 'B'
-    elif current_time_minutes >= (23 * 60 + 30) or current_time_minutes < (6 * 60 + 30):  # 11:30 PM to 6:30 AM
-        return 'C'
-    elif (6 * 60 + 30) <= current_time_minutes < (18 * 60 + 30):  # 6:30 AM to 6:30 PM
-        return 'S1'
-    else:  # 6:30 PM to 6:30 AM
-        return 'S2'
-
-
-
 def get_current_shift(user):
     """Get or create the current shift based on date and time"""
     from django.utils import timezone
     
     current_date = timezone.now().date()
-    shift_type = get_current_shift_type()
+    shift_type = current_shift_type()
     
     # Try to find an existing shift for today and this shift type
     try:
@@ -1415,10 +1392,9 @@ class ErrorPreventionWorkflowForm(forms.Form):
             self.fields['operator'].widget.attrs['readonly'] = True
             
         # Set default shift based on current time
-        from main.utils import get_current_shift_type
-        current_shift_type = get_current_shift_type()
-        if current_shift_type:
-            self.initial['shift_type'] = current_shift_type
+        suggested_shift_type = current_shift_type()
+        if suggested_shift_type:
+            self.initial['shift_type'] = suggested_shift_type
     
     def clean(self):
         cleaned_data = super().clean()
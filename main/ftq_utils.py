@@ -0,0 +1,274 @@
+# ftq_utils.py
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import FTQDailyRollup, FTQRecord, TimeBasedDefectEntry
+
+SHIFT_LABELS = dict(FTQRecord.SHIFTS)
+MODEL_LABELS = dict(FTQRecord.MODEL_CHOICES)
+
+# Defect name for an entry, whether it uses a standard or a custom defect type
+DEFECT_NAME = Coalesce('defect_type__name', 'defect_type_custom__name')
+
+
+def calculate_ftq(total_inspected, total_defects):
+    """FTQ percentage rounded to 2 places (0 when nothing was inspected)"""
+    if total_inspected > 0:
+        return round(((total_inspected - total_defects) / total_inspected) * 100, 2)
+    return 0
+
+
+def shift_label(shift_type):
+    """Human readable shift name, 'Unknown' for records without a shift"""
+    if not shift_type:
+        return 'Unknown'
+    return SHIFT_LABELS.get(shift_type, shift_type)
+
+
+def with_defect_totals(queryset):
+    """
+    Annotate each FTQ record with ``defect_total`` so that
+    ``FTQRecord.total_defects`` does not run one aggregate query per record.
+    """
+    return queryset.annotate(
+        defect_total=Coalesce(Sum('time_based_defects__count'), 0)
+    )
+
+
+def ftq_breakdown(queryset, *fields):
+    """
+    Inspected/defect totals for an FTQRecord queryset.
+
+    Without ``fields`` a single totals dict is returned. With one or more
+    FTQRecord field names (e.g. 'model_name', 'shift_type', 'date') a dict
+    keyed by the field value (or a tuple of values) is returned instead.
+
+    Inspected and defect sums are taken in separate grouped queries so the
+    defect join never multiplies ``total_inspected``; the cost is two queries
+    whatever the number of records in range.
+    """
+    base = queryset.order_by()
+
+    if not fields:
+        totals = base.aggregate(
+            total_inspected=Coalesce(Sum('total_inspected'), 0),
+            record_count=Count('id'),
+        )
+        totals['total_defects'] = base.aggregate(
+            total=Coalesce(Sum('time_based_defects__count'), 0)
+        )['total']
+        totals['ftq_percentage'] = calculate_ftq(totals['total_inspected'], totals['total_defects'])
+        return totals
+
+    def row_key(row):
+        if len(fields) == 1:
+            return row[fields[0]]
+        return tuple(row[field] for field in fields)
+
+    breakdown = {}
+    inspected_rows = base.values(*fields).annotate(
+        total_inspected=Coalesce(Sum('total_inspected'), 0),
+        record_count=Count('id'),
+    )
+    for row in inspected_rows:
+        breakdown[row_key(row)] = {
+            'total_inspected': row['total_inspected'],
+            'total_defects': 0,
+            'record_count': row['record_count'],
+        }
+
+    defect_rows = base.values(*fields).annotate(
+        total_defects=Sum('time_based_defects__count')
+    )
+    for row in defect_rows:
+        if row_key(row) in breakdown:
+            breakdown[row_key(row)]['total_defects'] = row['total_defects'] or 0
+
+    for data in breakdown.values():
+        data['ftq_percentage'] = calculate_ftq(data['total_inspected'], data['total_defects'])
+
+    return breakdown
+
+
+def defect_breakdown(queryset, *fields, limit=None):
+    """
+    Defect counts per defect name for the FTQ records in ``queryset``,
+    optionally split further by FTQRecord fields (e.g. 'date', 'model_name').
+
+    Returns a list of dicts with ``name``, ``total_count`` and one key per
+    requested field, ordered by count (highest first).
+    """
+    record_fields = [f'ftq_record__{field}' for field in fields]
+
+    rows = TimeBasedDefectEntry.objects.filter(
+        ftq_record__in=queryset.order_by()
+    ).annotate(
+        name=DEFECT_NAME
+    ).values(
+        'name', *record_fields
+    ).annotate(
+        total_count=Sum('count')
+    ).order_by('-total_count', 'name')
+
+    if limit:
+        rows = rows[:limit]
+
+    return [
+        {
+            'name': row['name'],
+            'total_count': row['total_count'] or 0,
+            **{field: row[f'ftq_record__{field}'] for field in fields},
+        }
+        for row in rows
+    ]
+
+
+# Daily rollup maintenance
+
+def _bucket_records(record_date, shift_type, model_name):
+    """FTQ records belonging to one rollup bucket (blank and NULL shifts share a bucket)"""
+    records = FTQRecord.objects.filter(date=record_date, model_name=model_name)
+    if shift_type:
+        return records.filter(shift_type=shift_type)
+    return records.filter(Q(shift_type__isnull=True) | Q(shift_type=''))
+
+
+def refresh_ftq_rollup(record_date, shift_type, model_name):
+    """
+    Recompute the rollup rows of one (date, shift, model) bucket from the
+    source rows. Runs inside the caller's transaction so the rollup never
+    drifts from the records it summarises.
+    """
+    from .report_utils import invalidate_snapshots
+
+    shift_type = shift_type or ''
+    records = _bucket_records(record_date, shift_type, model_name)
+
+    with transaction.atomic():
+        invalidate_snapshots([record_date])
+        FTQDailyRollup.objects.filter(
+            date=record_date, shift_type=shift_type, model_name=model_name
+        ).delete()
+
+        totals = ftq_breakdown(records)
+        if not totals['record_count']:
+            return
+
+        bucket = {'date': record_date, 'shift_type': shift_type, 'model_name': model_name}
+        rows = [FTQDailyRollup(
+            **bucket,
+            total_inspected=totals['total_inspected'],
+            total_defects=totals['total_defects'],
+            record_count=totals['record_count'],
+        )]
+        for defect in defect_breakdown(records):
+            rows.append(FTQDailyRollup(
+                **bucket,
+                defect_type=defect['name'] or 'Unknown',
+                total_defects=defect['total_count'],
+            ))
+        FTQDailyRollup.objects.bulk_create(rows)
+
+
+def rebuild_ftq_rollup(start_date=None, end_date=None):
+    """
+    Rebuild the rollup from scratch (optionally limited to a date range).
+    Returns the number of rollup rows written.
+    """
+    from .report_utils import invalidate_snapshots
+
+    records = FTQRecord.objects.all()
+    rollups = FTQDailyRollup.objects.all()
+    if start_date:
+        records = records.filter(date__gte=start_date)
+        rollups = rollups.filter(date__gte=start_date)
+    if end_date:
+        records = records.filter(date__lte=end_date)
+        rollups = rollups.filter(date__lte=end_date)
+
+    fields = ('date', 'shift_type', 'model_name')
+
+    # Blank and NULL shifts collapse into the same bucket
+    totals = {}
+    for (record_date, shift_type, model_name), data in ftq_breakdown(records, *fields).items():
+        bucket = totals.setdefault((record_date, shift_type or '', model_name), {
+            'total_inspected': 0, 'total_defects': 0, 'record_count': 0,
+        })
+        for key in bucket:
+            bucket[key] += data[key]
+
+    defects = {}
+    for row in defect_breakdown(records, *fields):
+        key = (row['date'], row['shift_type'] or '', row['model_name'], row['name'] or 'Unknown')
+        defects[key] = defects.get(key, 0) + row['total_count']
+
+    rows = [
+        FTQDailyRollup(date=key[0], shift_type=key[1], model_name=key[2], **data)
+        for key, data in totals.items()
+    ]
+    rows += [
+        FTQDailyRollup(date=key[0], shift_type=key[1], model_name=key[2],
+                       defect_type=key[3], total_defects=count)
+        for key, count in defects.items()
+    ]
+
+    with transaction.atomic():
+        rollups.delete()
+        FTQDailyRollup.objects.bulk_create(rows, batch_size=500)
+        invalidate_snapshots({row.date for row in rows})
+
+    return len(rows)
+
+
+# Rollup readers
+
+def rollup_queryset(start_date, end_date, model_name='', shift_type=''):
+    """Rollup rows for a date range, optionally filtered by model and shift"""
+    rollups = FTQDailyRollup.objects.filter(date__range=[start_date, end_date])
+    if model_name:
+        rollups = rollups.filter(model_name=model_name)
+    if shift_type:
+        rollups = rollups.filter(shift_type=shift_type)
+    return rollups
+
+
+def rollup_breakdown(rollups, *fields):
+    """
+    Same shape as ftq_breakdown(), but summed from FTQDailyRollup rows
+    instead of scanning FTQ records and defect entries.
+    """
+    base = rollups.filter(defect_type='').order_by()
+    sums = {
+        'total_inspected': Coalesce(Sum('total_inspected'), 0),
+        'total_defects': Coalesce(Sum('total_defects'), 0),
+        'record_count': Coalesce(Sum('record_count'), 0),
+    }
+
+    if not fields:
+        totals = base.aggregate(**sums)
+        totals['ftq_percentage'] = calculate_ftq(totals['total_inspected'], totals['total_defects'])
+        return totals
+
+    breakdown = {}
+    for row in base.values(*fields).annotate(**sums):
+        key = row[fields[0]] if len(fields) == 1 else tuple(row[field] for field in fields)
+        breakdown[key] = {
+            'total_inspected': row['total_inspected'],
+            'total_defects': row['total_defects'],
+            'record_count': row['record_count'],
+            'ftq_percentage': calculate_ftq(row['total_inspected'], row['total_defects']),
+        }
+    return breakdown
+
+
+def rollup_defects(rollups, limit=None):
+    """Defect counts per defect name from rollup rows, highest first"""
+    rows = rollups.exclude(defect_type='').order_by().values('defect_type').annotate(
+        total_count=Sum('total_defects')
+    ).order_by('-total_count', 'defect_type')
+
+    if limit:
+        rows = rows[:limit]
+
+    return [{'name': row['defect_type'], 'total_count': row['total_count']} for row in rows]
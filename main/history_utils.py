@@ -1,7 +1,57 @@
 # history_utils.py
+import contextvars
+from contextlib import contextmanager
+
+from django.db import transaction
 from django.utils import timezone
 from .models import ErrorPreventionCheckHistory, ErrorPreventionMechanismHistory
 
+_active_recorder = contextvars.ContextVar('history_recorder', default=None)
+
+
+class HistoryRecorder:
+    """Collects EP history rows and inserts them with one bulk_create per model"""
+
+    def __init__(self):
+        self.rows = {ErrorPreventionCheckHistory: [], ErrorPreventionMechanismHistory: []}
+
+    def add(self, row):
+        self.rows[type(row)].append(row)
+
+    def flush(self):
+        for model, rows in self.rows.items():
+            if rows:
+                model.objects.bulk_create(rows)
+            self.rows[model] = []
+
+
+@contextmanager
+def history_recorder():
+    """
+    Collect the history written by the helpers below inside the block and
+    insert it when the surrounding transaction commits (straight away outside
+    a transaction). Nothing is written if the block raises or the transaction
+    rolls back.
+    """
+    recorder = HistoryRecorder()
+    token = _active_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _active_recorder.reset(token)
+    transaction.on_commit(recorder.flush)
+
+
+def record_history(row):
+    """Queue ``row`` on the active recorder, or save it now if there is none"""
+    recorder = _active_recorder.get()
+    if recorder is None:
+        row.save()
+    else:
+        recorder.add(row)
+    return row
+
+
 def track_ep_check_changes(original, updated, user):
     """Track changes made to EP check main fields"""
     if not user:
@@ -31,7 +81,7 @@ def track_ep_check_changes(original, updated, user):
             # Create human-readable description
             description = create_change_description(field, old_value, new_value)
             
-            ErrorPreventionCheckHistory.objects.create(
+            record_history(ErrorPreventionCheckHistory(
                 ep_check=updated,
                 changed_by=user,
                 action=action,
@@ -39,7 +89,7 @@ def track_ep_check_changes(original, updated, user):
                 old_value=str(old_value) if old_value is not None else None,
                 new_value=str(new_value) if new_value is not None else None,
                 description=description
-            )
+            ))
 
 def track_mechanism_changes(original, updated, user):
     """Track changes made to mechanism status fields"""
@@ -56,13 +106,13 @@ def track_mechanism_changes(original, updated, user):
         
         # Only create history entry if the value actually changed
         if old_value != new_value:
-            ErrorPreventionMechanismHistory.objects.create(
+            record_history(ErrorPreventionMechanismHistory(
                 mechanism_status=updated,
                 changed_by=user,
                 field_name=field,
                 old_value=str(old_value) if old_value is not None else None,
                 new_value=str(new_value) if new_value is not None else None
-            )
+            ))
             changes_made = True
     
     return changes_made
@@ -103,12 +153,12 @@ def create_change_description(field_name, old_value, new_value):
 
 def create_initial_history(ep_check, user):
     """Create initial history entry when EP check is created"""
-    ErrorPreventionCheckHistory.objects.create(
+    record_history(ErrorPreventionCheckHistory(
         ep_check=ep_check,
         changed_by=user,
         action='created',
         description=f"EP Check created for {ep_check.date}"
-    )
+    ))
 
 def get_mechanism_change_summary(mechanism_status, days=7):
     """Get a summary of changes for a mechanism in the last N days"""
@@ -0,0 +1,183 @@
+# ingest_utils.py
+"""
+Batch ingestion of parameter group entries from the shop-floor tablets.
+
+A tablet posts many entries at once, including ones queued while it was
+offline (each with the time it was recorded and its own client id). Every
+entry is validated with ParameterGroupEntryForm and checked against the
+cached parameter group configs; the valid ones are inserted together with
+bulk_create in one transaction, and a result is returned per entry.
+"""
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import shift_calendar
+from .forms import ParameterGroupEntryForm
+from .models import ParameterGroupEntry
+from .readings_utils import create_readings
+from .report_utils import invalidate_snapshots
+from .schedule_utils import parameter_group_configs
+
+MAX_BATCH_ENTRIES = 100
+
+
+def _expected_fills(shift_start, frequency_minutes, at):
+    """How many entries of a group are due by ``at`` (as on the fill page)"""
+    if frequency_minutes <= 0:
+        return 1
+    return int((at - shift_start).total_seconds() / 60 / frequency_minutes) + 1
+
+
+def _form_errors(form):
+    return [
+        str(error) if field == '__all__' else f'{field}: {error}'
+        for field, errors in form.errors.items()
+        for error in errors
+    ]
+
+
+def _prepare(checklist, item, configs, shift_start, now):
+    """(entry, recorded_at, warnings) for a valid item, or (None, None, errors)"""
+    if not isinstance(item, dict):
+        return None, None, ['Entry must be an object']
+
+    parameter_group = item.get('parameter_group')
+    if parameter_group not in configs:
+        return None, None, [f'Parameter group not configured for {checklist.selected_model}: {parameter_group}']
+
+    client_id = item.get('client_id')
+    if client_id is not None:
+        try:
+            client_id = uuid.UUID(str(client_id))
+        except ValueError:
+            return None, None, ['client_id must be a UUID']
+
+    recorded_at = now
+    if item.get('recorded_at'):
+        recorded_at = parse_datetime(str(item['recorded_at']))
+        if recorded_at is None:
+            return None, None, ['recorded_at must be an ISO 8601 date and time']
+        if timezone.is_naive(recorded_at):
+            recorded_at = timezone.make_aware(recorded_at)
+        if recorded_at < shift_start:
+            return None, None, ['Recorded before the current shift started']
+        recorded_at = min(recorded_at, now)
+
+    readings = item.get('readings')
+    form = ParameterGroupEntryForm(readings if isinstance(readings, dict) else {}, parameter_group=parameter_group)
+    if not form.is_valid():
+        return None, None, _form_errors(form)
+
+    entry = form.save(commit=False)
+    entry.checklist = checklist
+    entry.parameter_group = parameter_group
+    entry.is_completed = True
+    entry.client_id = client_id
+    return entry, recorded_at, getattr(form, 'warnings', [])
+
+
+def _insert(accepted):
+    """Insert the accepted (position, entry, recorded_at) entries with their readings"""
+    entries = [entry for _, entry, _ in accepted]
+    ParameterGroupEntry.objects.bulk_create(entries)
+    # timestamp is auto_now_add, so the recorded times are written after the insert
+    for _, entry, recorded_at in accepted:
+        entry.timestamp = recorded_at
+    ParameterGroupEntry.objects.bulk_update(entries, ['timestamp'])
+    create_readings(entries)
+    return entries
+
+
+def ingest_parameter_entries(checklist, items, now=None):
+    """
+    Validate ``items`` and insert the valid ones as completed entries of
+    ``checklist``. Returns one result per item, in order, with a status of
+    'created', 'duplicate' (client id already stored, possibly by a
+    concurrent request) or 'error'.
+    """
+    now = now or timezone.now()
+    configs = parameter_group_configs(checklist.selected_model)
+    shift = checklist.verification_status.shift if checklist.verification_status else None
+    shift_start = shift_calendar.shift_start(shift.shift_type if shift else None) or checklist.created_at
+
+    results = []
+    prepared = []
+    for position, item in enumerate(items):
+        entry, recorded_at, notes = _prepare(checklist, item, configs, shift_start, now)
+        client_id = item.get('client_id') if isinstance(item, dict) else None
+        if entry is None:
+            results.append({'index': position, 'client_id': client_id, 'status': 'error', 'errors': notes})
+        else:
+            results.append({'index': position, 'client_id': client_id, 'status': 'created', 'warnings': notes})
+            prepared.append((position, entry, recorded_at))
+
+    with transaction.atomic():
+        client_ids = [entry.client_id for _, entry, _ in prepared if entry.client_id]
+        stored = dict(
+            ParameterGroupEntry.objects.filter(client_id__in=client_ids).values_list('client_id', 'id')
+        )
+        counts = dict(
+            ParameterGroupEntry.objects.filter(checklist=checklist, is_completed=True)
+            .values_list('parameter_group')
+            .annotate(count=Count('id'))
+        )
+
+        accepted = []
+        # client id: entry accepted earlier in this batch
+        seen = {}
+        repeated = []
+        # In recorded order, so entries queued offline are checked against
+        # the schedule as it stood when they were taken
+        for position, entry, recorded_at in sorted(prepared, key=lambda p: p[2]):
+            result = results[position]
+            if entry.client_id in stored:
+                result.update(status='duplicate', entry_id=stored[entry.client_id])
+                continue
+            if entry.client_id in seen:
+                result['status'] = 'duplicate'
+                repeated.append((position, seen[entry.client_id]))
+                continue
+
+            group = entry.parameter_group
+            frequency_minutes = configs[group]
+            if counts.get(group, 0) >= _expected_fills(shift_start, frequency_minutes, recorded_at):
+                result.update(status='error', errors=[f'{group} is not due again yet'])
+                continue
+
+            counts[group] = counts.get(group, 0) + 1
+            if entry.client_id:
+                seen[entry.client_id] = entry
+            accepted.append((position, entry, recorded_at))
+
+        while True:
+            try:
+                # In a savepoint: a concurrent resend of the same entries can
+                # store their client ids after the check above
+                with transaction.atomic():
+                    entries = _insert(accepted)
+                break
+            except IntegrityError:
+                client_ids = [entry.client_id for _, entry, _ in accepted if entry.client_id]
+                conflicting = dict(
+                    ParameterGroupEntry.objects.filter(client_id__in=client_ids).values_list('client_id', 'id')
+                )
+                if not conflicting:
+                    raise
+                for position, entry, _ in accepted:
+                    if entry.client_id in conflicting:
+                        results[position].update(status='duplicate', entry_id=conflicting[entry.client_id])
+                accepted = [item for item in accepted if item[1].client_id not in conflicting]
+                stored.update(conflicting)
+
+        # bulk_create sends no post_save: entries queued offline may land on a closed day
+        invalidate_snapshots({timezone.localdate(entry.timestamp) for entry in entries})
+
+    for position, entry, _ in accepted:
+        results[position]['entry_id'] = entry.pk
+    for position, entry in repeated:
+        results[position]['entry_id'] = stored.get(entry.client_id, entry.pk)
+    return results
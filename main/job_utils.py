@@ -0,0 +1,192 @@
+# job_utils.py
+"""
+Database-backed background jobs.
+
+Views call ``enqueue()`` and return immediately; the ``run_jobs`` worker
+claims queued jobs and runs their handlers in a process pool. A failed job
+is retried with exponential backoff until ``max_attempts`` is reached.
+"""
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# kind: dotted path of ``handler(job)``. Handlers report progress with
+# report_progress() and return a JSON-serializable result.
+JOB_HANDLERS = {
+    'checklist_bulk_export': 'main.bulk_export.run_checklist_export',
+    'report_snapshots': 'main.report_utils.run_snapshot_job',
+    'dtpm_regenerate_check_results': 'main.job_utils.regenerate_dtpm_check_results',
+}
+
+RETRY_BASE_SECONDS = 30
+# Running jobs without a heartbeat for this long are assumed lost with their
+# worker (run_jobs sends one for each job in flight every minute)
+STALE_AFTER = timedelta(minutes=5)
+# Minimum interval between progress writes, to keep SQLite write locks short
+PROGRESS_INTERVAL = 1.0
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=3):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        created_by=user if user and user.is_authenticated else None,
+        max_attempts=max_attempts,
+    )
+
+
+def claim_jobs(limit):
+    """
+    Mark up to ``limit`` due jobs as running and return their ids. Each claim
+    is a conditional UPDATE, so two workers never take the same job.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status='queued', run_after__lte=now
+    ).order_by('run_after', 'pk').values_list('pk', flat=True)[:limit]
+
+    claimed = []
+    for pk in candidates:
+        updated = Job.objects.filter(pk=pk, status='queued').update(
+            status='running', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def heartbeat(job_ids):
+    """Mark the running jobs ``job_ids`` as still alive"""
+    return Job.objects.filter(pk__in=list(job_ids), status='running').update(heartbeat_at=timezone.now())
+
+
+def requeue_stale_jobs(exclude=()):
+    """Requeue running jobs without a heartbeat for STALE_AFTER, except the ids in ``exclude``"""
+    return Job.objects.filter(
+        status='running', heartbeat_at__lt=timezone.now() - STALE_AFTER
+    ).exclude(pk__in=list(exclude)).update(status='queued', run_after=timezone.now())
+
+
+def requeue_jobs(job_ids, error=''):
+    """
+    Put claimed jobs whose worker was lost back in the queue right away;
+    jobs that have used up their attempts are marked failed instead, so a
+    job that keeps killing its worker is not retried forever
+    """
+    now = timezone.now()
+    running = Job.objects.filter(pk__in=list(job_ids), status='running')
+    running.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error=error, finished_at=now
+    )
+    return running.filter(attempts__lt=F('max_attempts')).update(
+        status='queued', error=error, run_after=now
+    )
+
+
+_last_progress = {}
+
+
+def report_progress(job, done, total=None, force=False):
+    """Store progress, at most once per PROGRESS_INTERVAL unless ``force``"""
+    now = time.monotonic()
+    if not force and now - _last_progress.get(job.pk, 0) < PROGRESS_INTERVAL:
+        return
+    _last_progress[job.pk] = now
+
+    fields = {'progress_done': done, 'heartbeat_at': timezone.now()}
+    if total is not None:
+        fields['progress_total'] = total
+    Job.objects.filter(pk=job.pk).update(**fields)
+
+
+def init_worker():
+    """Process pool initializer: set Django up and drop inherited connections"""
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'checklist_system.settings')
+    django.setup()
+    from django.db import connections
+    connections.close_all()
+
+
+def run_job(job_id):
+    """Execute one claimed job (in a pool worker) and record the outcome"""
+    job = Job.objects.get(pk=job_id)
+    try:
+        handler = import_string(JOB_HANDLERS[job.kind])
+        result = handler(job)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.kind, job.attempts)
+        if job.attempts < job.max_attempts:
+            delay = RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', error=str(e), run_after=timezone.now() + timedelta(seconds=delay)
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status='failed', error=str(e), finished_at=timezone.now()
+            )
+        return False
+    finally:
+        _last_progress.pop(job.pk, None)
+
+    Job.objects.filter(pk=job.pk).update(
+        status='done', result=result, error='', finished_at=timezone.now(),
+        progress_done=F('progress_total'),
+    )
+    return True
+
+
+def job_status(job):
+    """JSON payload for the job status API"""
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'done': job.progress_done,
+        'total': job.progress_total,
+        'progress': job.progress,
+        'attempts': job.attempts,
+        'error': job.error,
+        'result': job.result,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# Bulk admin actions
+
+def regenerate_dtpm_check_results(job):
+    """Add missing check results (status NG) for active checkpoints to the given checklists"""
+    from django.db import transaction
+
+    from .models import DTPMCheckResultNew, active_checkpoint_ids
+
+    checklist_ids = job.payload['checklist_ids']
+    checkpoint_ids = active_checkpoint_ids()
+
+    total_added = 0
+    for done, checklist_id in enumerate(checklist_ids, 1):
+        with transaction.atomic():
+            existing = set(DTPMCheckResultNew.objects.filter(
+                checklist_id=checklist_id
+            ).values_list('checkpoint_id', flat=True))
+            missing = [
+                DTPMCheckResultNew(checklist_id=checklist_id, checkpoint_id=checkpoint_id, status='NG')
+                for checkpoint_id in checkpoint_ids if checkpoint_id not in existing
+            ]
+            DTPMCheckResultNew.objects.bulk_create(missing)
+            total_added += len(missing)
+        report_progress(job, done, len(checklist_ids))
+
+    return {'added': total_added}
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from main.models import EntryReading, ParameterGroupEntry, SubgroupEntry
+from main.readings_utils import backfill_readings
+
+
+class Command(BaseCommand):
+    help = 'Fills the long-format EntryReading table from subgroup and parameter group entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Entries read and readings inserted per batch (default: 500)'
+        )
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Delete all stored readings first and rebuild them from scratch'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            deleted, _ = EntryReading.objects.all().delete()
+            self.stdout.write(f'Deleted {deleted} stored reading(s)')
+
+        for model in (SubgroupEntry, ParameterGroupEntry):
+            label = model._meta.verbose_name_plural
+            self.stdout.write(f'Backfilling readings of {label}...')
+            created = backfill_readings(
+                model, options['batch_size'],
+                progress=lambda count: self.stdout.write(f'  {count} reading(s)...')
+            )
+            self.stdout.write(self.style.SUCCESS(f'✓ Created {created} reading(s) for {label}'))
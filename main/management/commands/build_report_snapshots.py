@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from main.job_utils import enqueue
+from main.report_utils import build_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Computes and stores report snapshots for closed days, weeks and months (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='First date to snapshot (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last date to snapshot (YYYY-MM-DD), defaults to yesterday')
+        parser.add_argument(
+            '--days', type=int, default=7,
+            help='Without --start-date, how many days back to (re)build (default: 7)'
+        )
+        parser.add_argument(
+            '--period', choices=['day', 'week', 'month'], action='append',
+            help='Only build this period type (repeatable, default: all)'
+        )
+        parser.add_argument(
+            '--keep-existing', action='store_true',
+            help='Only fill in missing snapshots instead of recomputing them'
+        )
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Queue the build as a background job for run_jobs instead of running it here'
+        )
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        try:
+            end_date = self._parse_date(options['end_date']) or yesterday
+            start_date = (
+                self._parse_date(options['start_date'])
+                or end_date - timedelta(days=options['days'] - 1)
+            )
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format')
+
+        if start_date > end_date:
+            raise CommandError('--start-date must not be after --end-date')
+
+        # Late approvals change recent days, so recompute them unless asked not to
+        force = not options['keep_existing']
+
+        if options['background']:
+            job = enqueue('report_snapshots', {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'periods': options['period'],
+                'force': force,
+            })
+            self.stdout.write(self.style.SUCCESS(f'✓ Queued job #{job.pk}'))
+            return
+
+        for period_type in options['period'] or ['day', 'week', 'month']:
+            self.stdout.write(f'Building {period_type} snapshots from {start_date} to {end_date}...')
+            written = build_snapshots(period_type, start_date, end_date, force=force)
+            self.stdout.write(self.style.SUCCESS(f'✓ Wrote {written} {period_type} snapshot(s)'))
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        return datetime.strptime(value, '%Y-%m-%d').date()
@@ -67,6 +67,7 @@ class Command(BaseCommand):
                 is_required=True,
                 help_text="Model selection",
                 help_text_hindi="मॉडल चयन",
+                is_program_selector=True,
                 order=2,
                 is_active=True
             )
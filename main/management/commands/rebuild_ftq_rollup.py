@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.ftq_utils import rebuild_ftq_rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the FTQ daily rollup table from FTQ records and time-based defect entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='First date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last date to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = self._parse_date(options['start_date'])
+            end_date = self._parse_date(options['end_date'])
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format')
+
+        self.stdout.write('Rebuilding FTQ daily rollup...')
+        row_count = rebuild_ftq_rollup(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(f'✓ Wrote {row_count} rollup row(s)'))
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        return datetime.strptime(value, '%Y-%m-%d').date()
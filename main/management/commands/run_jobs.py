@@ -0,0 +1,99 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from main.job_utils import claim_jobs, heartbeat, init_worker, requeue_jobs, requeue_stale_jobs, run_job
+
+# Seconds between heartbeats for the jobs in flight and checks for jobs left
+# running by a runner that went away (well under job_utils.STALE_AFTER)
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (exports, report builds, bulk admin actions) in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes (default: 2)')
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds between checks for new jobs when idle (default: 2)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run the jobs that are due now, then exit'
+        )
+
+    def new_pool(self, workers):
+        # Workers are forked from this process; don't hand them our connection
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+
+    def requeue_stale(self, in_flight):
+        requeued = requeue_stale_jobs(exclude=in_flight.values())
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+
+        self.requeue_stale({})
+        last_stale_check = time.monotonic()
+
+        self.stdout.write(f'Running jobs with {workers} worker(s)...')
+        in_flight = {}
+        pool = self.new_pool(workers)
+        try:
+            while True:
+                if time.monotonic() - last_stale_check >= STALE_CHECK_INTERVAL:
+                    heartbeat(in_flight.values())
+                    self.requeue_stale(in_flight)
+                    last_stale_check = time.monotonic()
+
+                claimed = []
+                try:
+                    free = workers - len(in_flight)
+                    if free:
+                        claimed = claim_jobs(free)
+                        while claimed:
+                            in_flight[pool.submit(run_job, claimed[0])] = claimed.pop(0)
+
+                    if not in_flight:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    finished, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        job_id = in_flight[future]
+                        try:
+                            succeeded = future.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            del in_flight[future]
+                            self.stderr.write(f'Job #{job_id} raised in its worker: {e}')
+                            requeue_jobs([job_id], error=str(e))
+                            continue
+                        del in_flight[future]
+                        if succeeded:
+                            self.stdout.write(self.style.SUCCESS(f'✓ Job #{job_id} done'))
+                        else:
+                            self.stdout.write(self.style.WARNING(f'Job #{job_id} failed'))
+                except BrokenProcessPool as e:
+                    # A worker process died; every job handed to the pool is
+                    # lost with it, so put them back and start a fresh pool
+                    lost = list(in_flight.values()) + claimed
+                    self.stderr.write(f'Worker pool broke ({e}); requeueing job(s) {lost}')
+                    requeue_jobs(lost, error=f'Worker process died: {e}')
+                    in_flight.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.new_pool(workers)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping, waiting for running jobs to finish...')
+        finally:
+            pool.shutdown(wait=True)
@@ -2,7 +2,8 @@ from django.shortcuts import redirect
 from django.urls import reverse, NoReverseMatch
 from django.contrib import messages
 from django.utils import timezone
-from datetime import time
+
+from .shift_calendar import current_shift_type, latest_shift_window
 
 class ShiftMiddleware:
     def __init__(self, get_response):
@@ -10,13 +11,14 @@ class ShiftMiddleware:
 
     def __call__(self, request):
         if request.user.is_authenticated and request.user.user_type == 'operator':
-            current_time = timezone.localtime().time()
-            is_day_shift = time(8, 0) <= current_time < time(20, 0)
+            now = timezone.localtime()
+            shift_type = current_shift_type(now)
+            window = latest_shift_window(shift_type, now)
             
             # Store current shift information in request
-            request.current_shift = 'day' if is_day_shift else 'night'
-            request.shift_start = time(8, 0) if is_day_shift else time(20, 0)
-            request.shift_end = time(20, 0) if is_day_shift else time(8, 0)
+            request.current_shift = shift_type
+            request.shift_start = timezone.localtime(window[0]).time() if window else None
+            request.shift_end = timezone.localtime(window[1]).time() if window else None
 
         response = self.get_response(request)
         return response
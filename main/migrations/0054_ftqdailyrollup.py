@@ -0,0 +1,133 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_ftq_rollup(apps, schema_editor):
+    FTQRecord = apps.get_model("main", "FTQRecord")
+    TimeBasedDefectEntry = apps.get_model("main", "TimeBasedDefectEntry")
+    FTQDailyRollup = apps.get_model("main", "FTQDailyRollup")
+
+    totals = {}
+    inspected_rows = FTQRecord.objects.order_by().values(
+        "date", "shift_type", "model_name"
+    ).annotate(total_inspected=Sum("total_inspected"), record_count=Count("id"))
+    for row in inspected_rows:
+        key = (row["date"], row["shift_type"] or "", row["model_name"])
+        bucket = totals.setdefault(
+            key, {"total_inspected": 0, "total_defects": 0, "record_count": 0}
+        )
+        bucket["total_inspected"] += row["total_inspected"] or 0
+        bucket["record_count"] += row["record_count"]
+
+    defects = {}
+    defect_rows = TimeBasedDefectEntry.objects.order_by().annotate(
+        name=Coalesce("defect_type__name", "defect_type_custom__name")
+    ).values(
+        "name", "ftq_record__date", "ftq_record__shift_type", "ftq_record__model_name"
+    ).annotate(total_count=Sum("count"))
+    for row in defect_rows:
+        key = (
+            row["ftq_record__date"],
+            row["ftq_record__shift_type"] or "",
+            row["ftq_record__model_name"],
+        )
+        count = row["total_count"] or 0
+        totals[key]["total_defects"] += count
+        defect_key = key + (row["name"] or "Unknown",)
+        defects[defect_key] = defects.get(defect_key, 0) + count
+
+    rows = [
+        FTQDailyRollup(date=key[0], shift_type=key[1], model_name=key[2], **data)
+        for key, data in totals.items()
+    ]
+    rows += [
+        FTQDailyRollup(
+            date=key[0],
+            shift_type=key[1],
+            model_name=key[2],
+            defect_type=key[3],
+            total_defects=count,
+        )
+        for key, count in defects.items()
+    ]
+    FTQDailyRollup.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0053_errorpreventionmechanism_verification_method_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FTQDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "shift_type",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("S1", "S1 - 6:30 AM to 6:30 PM"),
+                            ("A", "A - 6:30 AM to 3:00 PM"),
+                            ("G", "G - 8:30 AM to 5:00 PM"),
+                            ("B", "B - 3:00 PM to 11:30 PM"),
+                            ("C", "C - 11:30 PM to 6:30 AM"),
+                            ("S2", "S2 - 6:30 PM to 6:30 AM"),
+                        ],
+                        default="",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "model_name",
+                    models.CharField(
+                        choices=[
+                            ("P703", "P703"),
+                            ("U704", "U704"),
+                            ("FD", "FD"),
+                            ("SA", "SA"),
+                            ("Gnome", "Gnome"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "defect_type",
+                    models.CharField(blank=True, default="", max_length=200),
+                ),
+                ("total_inspected", models.PositiveIntegerField(default=0)),
+                ("total_defects", models.PositiveIntegerField(default=0)),
+                ("record_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "FTQ Daily Rollup",
+                "verbose_name_plural": "FTQ Daily Rollups",
+                "ordering": ["date", "shift_type", "model_name", "defect_type"],
+                "indexes": [
+                    models.Index(
+                        fields=["date", "defect_type"],
+                        name="ftq_rollup_date_defect_idx",
+                    )
+                ],
+                "unique_together": {
+                    ("date", "shift_type", "model_name", "defect_type")
+                },
+            },
+        ),
+        migrations.RunPython(populate_ftq_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0054_ftqdailyrollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="parametergroupverification",
+            index=models.Index(
+                fields=["parameter_entry", "verification_type", "status"],
+                name="param_verif_entry_type_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0055_parametergroupverification_param_verif_entry_type_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period_type",
+                    models.CharField(
+                        choices=[("day", "Day"), ("week", "Week"), ("month", "Month")],
+                        max_length=10,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("period_end", models.DateField()),
+                ("payload", models.JSONField(default=dict)),
+                ("generated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Report Snapshot",
+                "verbose_name_plural": "Report Snapshots",
+                "ordering": ["period_type", "-period_start"],
+                "unique_together": {("period_type", "period_start")},
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0057_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EntryReading",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                ("parameter", models.CharField(max_length=30)),
+                ("index", models.PositiveSmallIntegerField()),
+                ("numeric_value", models.FloatField(blank=True, null=True)),
+                (
+                    "categorical_value",
+                    models.CharField(blank=True, max_length=5, null=True),
+                ),
+                (
+                    "checklist",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="readings",
+                        to="main.checklistbase",
+                    ),
+                ),
+                (
+                    "parameter_group_entry",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="readings",
+                        to="main.parametergroupentry",
+                    ),
+                ),
+                (
+                    "subgroup_entry",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="readings",
+                        to="main.subgroupentry",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Entry Reading",
+                "verbose_name_plural": "Entry Readings",
+                "indexes": [
+                    models.Index(
+                        fields=["parameter", "timestamp"], name="reading_param_time_idx"
+                    ),
+                    models.Index(
+                        fields=["checklist", "parameter"],
+                        name="reading_checklist_param_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("subgroup_entry__isnull", False)),
+                        fields=("subgroup_entry", "parameter", "index"),
+                        name="reading_subgroup_entry_uniq",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("parameter_group_entry__isnull", False)),
+                        fields=("parameter_group_entry", "parameter", "index"),
+                        name="reading_param_entry_uniq",
+                    ),
+                ],
+            },
+        ),
+    ]
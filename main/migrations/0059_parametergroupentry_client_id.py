@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0058_entryreading"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parametergroupentry",
+            name="client_id",
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
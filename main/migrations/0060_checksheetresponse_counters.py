@@ -0,0 +1,88 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:40
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_counters(apps, schema_editor):
+    ChecksheetField = apps.get_model("main", "ChecksheetField")
+    ChecksheetResponse = apps.get_model("main", "ChecksheetResponse")
+
+    required_totals = dict(
+        ChecksheetField.objects.filter(
+            section__is_active=True, is_required=True, is_active=True
+        )
+        .order_by()
+        .values_list("section__checksheet_id")
+        .annotate(total=Count("id"))
+    )
+
+    responses = ChecksheetResponse.objects.order_by().annotate(
+        filled_required=Count(
+            "field_responses",
+            filter=Q(
+                field_responses__field__is_required=True,
+                field_responses__field__is_active=True,
+            )
+            & ~Q(field_responses__value=""),
+        ),
+        nok=Count(
+            "field_responses",
+            filter=Q(field_responses__status="NOK") | Q(field_responses__value="NOK"),
+        ),
+    )
+    batch = []
+    for response in responses.iterator(chunk_size=500):
+        required_total = required_totals.get(response.checksheet_id, 0)
+        response.required_total = required_total
+        response.completion_pct = (
+            int((response.filled_required / required_total) * 100)
+            if required_total
+            else 100
+        )
+        response.nok_count = response.nok
+        batch.append(response)
+        if len(batch) >= 500:
+            ChecksheetResponse.objects.bulk_update(
+                batch, ["required_total", "completion_pct", "nok_count"]
+            )
+            batch = []
+    ChecksheetResponse.objects.bulk_update(
+        batch, ["required_total", "completion_pct", "nok_count"]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0059_parametergroupentry_client_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="checksheetresponse",
+            name="completion_pct",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="checksheetresponse",
+            name="nok_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="checksheetresponse",
+            name="required_total",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="checksheetresponse",
+            index=models.Index(
+                fields=["completion_pct"], name="cs_response_completion_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="checksheetresponse",
+            index=models.Index(fields=["nok_count"], name="cs_response_nok_idx"),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
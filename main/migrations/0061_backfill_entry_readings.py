@@ -0,0 +1,80 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:30
+
+from django.db import migrations
+
+# Frozen copy of readings_utils.READING_GROUPS / SPEC_LIMITS as of 0058:
+# parameter group: (field stem, number of readings)
+READING_GROUPS = {
+    "uv_vacuum": ("uv_vacuum_test", 5),
+    "uv_flow": ("uv_flow_value", 5),
+    "umbrella_valve": ("umbrella_valve_assembly", 5),
+    "uv_clip": ("uv_clip_pressing", 5),
+    "workstation": ("workstation_clean", 1),
+    "bin_contamination": ("bin_contamination_check", 5),
+}
+NUMERIC_GROUPS = ("uv_vacuum", "uv_flow")
+BATCH_SIZE = 500
+
+
+def reading_fields(group):
+    stem, count = READING_GROUPS[group]
+    if count == 1:
+        return [(1, stem)]
+    return [(number, f"{stem}_{number}") for number in range(1, count + 1)]
+
+
+def backfill(EntryReading, model, entry_key, has_group):
+    stored = EntryReading.objects.filter(**{f"{entry_key}__isnull": False}).values(entry_key)
+    entries = model.objects.exclude(pk__in=stored).order_by("pk")
+    columns = (
+        ("id", "checklist_id", "timestamp")
+        + (("parameter_group",) if has_group else ())
+        + tuple(field for group in READING_GROUPS for _, field in reading_fields(group))
+    )
+
+    batch = []
+    for row in entries.values_list(*columns).iterator(chunk_size=BATCH_SIZE):
+        values = dict(zip(columns, row))
+        groups = [values["parameter_group"]] if has_group else list(READING_GROUPS)
+        for group in groups:
+            if group not in READING_GROUPS:
+                continue
+            numeric = group in NUMERIC_GROUPS
+            for number, field in reading_fields(group):
+                value = values[field]
+                if value is None:
+                    continue
+                batch.append(
+                    EntryReading(
+                        **{entry_key: values["id"]},
+                        checklist_id=values["checklist_id"],
+                        timestamp=values["timestamp"],
+                        parameter=group,
+                        index=number,
+                        numeric_value=value if numeric else None,
+                        categorical_value=None if numeric else value,
+                    )
+                )
+        if len(batch) >= BATCH_SIZE:
+            EntryReading.objects.bulk_create(batch)
+            batch = []
+    EntryReading.objects.bulk_create(batch)
+
+
+def populate_entry_readings(apps, schema_editor):
+    EntryReading = apps.get_model("main", "EntryReading")
+    backfill(EntryReading, apps.get_model("main", "SubgroupEntry"), "subgroup_entry_id", False)
+    backfill(
+        EntryReading, apps.get_model("main", "ParameterGroupEntry"), "parameter_group_entry_id", True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0060_checksheetresponse_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_entry_readings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+def mark_program_selectors(apps, schema_editor):
+    # The program selection field used to be recognised by its label
+    ChecksheetField = apps.get_model("main", "ChecksheetField")
+    ChecksheetField.objects.filter(label__icontains="program").update(
+        is_program_selector=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0061_backfill_entry_readings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="checksheetfield",
+            name="is_program_selector",
+            field=models.BooleanField(
+                default=False,
+                help_text="The model chosen in this field drives the auto-filled fields",
+                verbose_name="Program selection field",
+            ),
+        ),
+        migrations.RunPython(mark_program_selectors, migrations.RunPython.noop),
+    ]
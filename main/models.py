@@ -1,10 +1,13 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef, Subquery
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+
+from .change_tracking import ChangeTrackingMixin
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -54,6 +57,22 @@ class Shift(models.Model):
 
 
 
+class DailyVerificationStatusQuerySet(models.QuerySet):
+    def with_workflow_state(self):
+        """
+        Annotate whether each status has a checklist, an EP check and a DTPM
+        checklist, and the model of its latest checklist, in the same query;
+        the workflow properties read these instead of querying per status
+        """
+        checklists = ChecklistBase.objects.filter(verification_status=OuterRef('pk'))
+        return self.annotate(
+            checklist_exists=Exists(checklists),
+            ep_check_exists=Exists(ErrorPreventionCheck.objects.filter(verification_status=OuterRef('pk'))),
+            dtpm_checklist_exists=Exists(DTPMChecklistFMA03New.objects.filter(verification_status=OuterRef('pk'))),
+            checklist_model=Subquery(checklists.order_by('-created_at').values('selected_model')[:1]),
+        )
+
+
 class DailyVerificationStatus(models.Model):
     """Central status tracking for daily verification/inspection sheets"""
     STATUS_CHOICES = (
@@ -75,23 +94,32 @@ class DailyVerificationStatus(models.Model):
     supervisor_notified = models.BooleanField(default=False)
     quality_notified = models.BooleanField(default=False)
     
+    objects = DailyVerificationStatusQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.date} - {self.shift.get_shift_type_display()} - {self.status}"
     
-    # Optional helper properties for consistency
+    # Optional helper properties for consistency; loaded through
+    # with_workflow_state() they use the annotations instead of querying
     @property
     def has_checklist(self):
         """Check if this verification has a checklist"""
+        if hasattr(self, 'checklist_exists'):
+            return self.checklist_exists
         return self.checklists.exists()
     
     @property
     def has_ep_check(self):
         """Check if this verification has an EP check"""
+        if hasattr(self, 'ep_check_exists'):
+            return self.ep_check_exists
         return self.error_prevention_checks.exists()
     
     @property
     def has_dtpm_checklist(self):
         """Check if this verification has a DTPM checklist"""
+        if hasattr(self, 'dtpm_checklist_exists'):
+            return self.dtpm_checklist_exists
         return self.dtpm_checklists.exists()
     
     @property
@@ -115,7 +143,10 @@ class DailyVerificationStatus(models.Model):
     @property
     def current_model_from_checklist(self):
         """Get the current model from the associated checklist"""
-        checklist = self.checklists.first()
+        if hasattr(self, 'checklist_model'):
+            return self.checklist_model
+        # The latest checklist, as with_workflow_state() annotates
+        checklist = self.checklists.order_by('-created_at').first()
         return checklist.selected_model if checklist else None
 
 
@@ -308,7 +339,10 @@ class ChecklistBase(models.Model):
         """Custom save method to set shift from new_shift"""
         if self.new_shift:
             self.shift = self.new_shift
-        super().save(*args, **kwargs)
+        # A new checklist is set up by a post_save receiver; keep that in the
+        # same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         shift_display = self.get_shift_display() if self.shift else "No Shift"
@@ -423,7 +457,21 @@ class SubgroupCategoryTiming(models.Model):
 
 
  
-class SubgroupEntry(models.Model):
+# Individual reading fields shared by SubgroupEntry, SubgroupEntryNew and
+# ParameterGroupEntry
+READING_FIELDS = (
+    'uv_vacuum_test_1', 'uv_vacuum_test_2', 'uv_vacuum_test_3', 'uv_vacuum_test_4', 'uv_vacuum_test_5',
+    'uv_flow_value_1', 'uv_flow_value_2', 'uv_flow_value_3', 'uv_flow_value_4', 'uv_flow_value_5',
+    'umbrella_valve_assembly_1', 'umbrella_valve_assembly_2', 'umbrella_valve_assembly_3',
+    'umbrella_valve_assembly_4', 'umbrella_valve_assembly_5',
+    'uv_clip_pressing_1', 'uv_clip_pressing_2', 'uv_clip_pressing_3', 'uv_clip_pressing_4', 'uv_clip_pressing_5',
+    'workstation_clean',
+    'bin_contamination_check_1', 'bin_contamination_check_2', 'bin_contamination_check_3',
+    'bin_contamination_check_4', 'bin_contamination_check_5',
+)
+
+
+class SubgroupEntry(ChangeTrackingMixin, models.Model):
     """Repeated measurements taken every 2 hours - now with 5 readings each (except workstation cleanliness)"""
     VERIFICATION_STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -666,48 +714,18 @@ class SubgroupEntry(models.Model):
     )
     nok_approval_timestamp = models.DateTimeField(null=True, blank=True)
 
+    # Edits of these fields by the _editing_user set in the views are
+    # recorded in SubgroupEditHistory
+    tracked_fields = READING_FIELDS
+    history_model = 'main.SubgroupEditHistory'
+    history_object_field = 'subgroup'
+    history_user_field = 'edited_by'
+    # Copied onto the entry's EntryReading rows (see readings_utils.sync_readings)
+    watched_fields = ('checklist_id', 'timestamp')
+
     class Meta:
         ordering = ['subgroup_number']
 
-    def save(self, *args, **kwargs):
-        # Track changes if this is an update (not initial creation)
-        if self.pk:  # Only for existing records
-            try:
-                old_instance = SubgroupEntry.objects.get(pk=self.pk)
-                
-                # Updated fields to track for changes (now 21 fields total)
-                tracked_fields = [
-                    'uv_vacuum_test_1', 'uv_vacuum_test_2', 'uv_vacuum_test_3', 'uv_vacuum_test_4', 'uv_vacuum_test_5',
-                    'uv_flow_value_1', 'uv_flow_value_2', 'uv_flow_value_3', 'uv_flow_value_4', 'uv_flow_value_5',
-                    'umbrella_valve_assembly_1', 'umbrella_valve_assembly_2', 'umbrella_valve_assembly_3', 'umbrella_valve_assembly_4', 'umbrella_valve_assembly_5',
-                    'uv_clip_pressing_1', 'uv_clip_pressing_2', 'uv_clip_pressing_3', 'uv_clip_pressing_4', 'uv_clip_pressing_5',
-                    'workstation_clean',  # Now single field
-                    'bin_contamination_check_1', 'bin_contamination_check_2', 'bin_contamination_check_3', 'bin_contamination_check_4', 'bin_contamination_check_5'
-                ]
-                
-                # Get the user who made the change (from thread-local storage or pass as parameter)
-                current_user = getattr(self, '_editing_user', None)
-                
-                if current_user:
-                    for field in tracked_fields:
-                        old_value = getattr(old_instance, field)
-                        new_value = getattr(self, field)
-                        
-                        if old_value != new_value:
-                            SubgroupEditHistory.objects.create(
-                                subgroup=self,
-                                edited_by=current_user,
-                                field_name=field,
-                                old_value=str(old_value) if old_value is not None else None,
-                                new_value=str(new_value) if new_value is not None else None
-                            )
-            except SubgroupEntry.DoesNotExist:
-                # This shouldn't happen, but handle gracefully
-                pass
-        
-        # Always call the parent save method
-        super().save(*args, **kwargs)        
-        
     def _check_for_nok_entries(self):
         """Check if any field has NOK or No value"""
         nok_fields = [
@@ -881,8 +899,12 @@ class SubgroupEntry(models.Model):
     
     
     
-class SubgroupEntryNew(models.Model):
+class SubgroupEntryNew(ChangeTrackingMixin, models.Model):
     """NEW MODEL - Enhanced subgroup measurements with category-specific timing"""
+
+    # Changed readings are available from tracked_changes() (no history table yet)
+    tracked_fields = READING_FIELDS
+
     VERIFICATION_STATUS_CHOICES = (
         ('verified', 'Verified'),
         ('rejected', 'Rejected'),
@@ -1206,49 +1228,14 @@ def get_next_due_category(checklist):
     return category_timings.category if category_timings else None
 
 
-def create_category_timing_for_checklist(checklist):
-    """Create initial timing records for all categories when checklist is created"""
-    model_name = checklist.selected_model
-    
-    for category_code, category_name in SubgroupCategoryFrequencyConfig.CATEGORY_CHOICES:
-        try:
-            frequency_config = SubgroupCategoryFrequencyConfig.objects.get(
-                model_name=model_name,
-                category=category_code,
-                is_active=True
-            )
-        except SubgroupCategoryFrequencyConfig.DoesNotExist:
-            # Create default config if none exists
-            frequency_config = SubgroupCategoryFrequencyConfig.objects.create(
-                model_name=model_name,
-                category=category_code,
-                frequency_minutes=60,  # Default 1 hour
-                max_readings_per_shift=5,
-                is_active=True
-            )
-        
-        from datetime import timedelta
-        now = timezone.now()
-        
-        SubgroupCategoryTiming.objects.get_or_create(
-            checklist=checklist,
-            category=category_code,
-            defaults={
-                'last_reading_time': now,
-                'next_reading_due': now + timedelta(minutes=frequency_config.frequency_minutes),
-                'frequency_config': frequency_config,
-                'readings_count': 0,
-                'is_overdue': False
-            }
-        )
-
-
-# Signals for automatic timing management
+# Everything a new checklist needs is set up by one service, in the
+# transaction the checklist is created in
 @receiver(post_save, sender=ChecklistBase)
-def create_checklist_category_timings(sender, instance, created, **kwargs):
-    """Automatically create category timing records when a new checklist is created"""
+def initialize_new_checklist(sender, instance, created, **kwargs):
     if created:
-        create_category_timing_for_checklist(instance)
+        from .checklist_utils import initialize_checklist
+
+        initialize_checklist(instance)
 
 
 @receiver(post_save, sender=SubgroupEntryNew)
@@ -1267,7 +1254,9 @@ def update_category_timing_on_reading(sender, instance, created, **kwargs):
             
         except SubgroupCategoryTiming.DoesNotExist:
             # Create timing record if it doesn't exist
-            create_category_timing_for_checklist(instance.checklist)
+            from .checklist_utils import create_category_timings
+
+            create_category_timings(instance.checklist)
 
 
 # Model for configurable checksheet content
@@ -1314,19 +1303,51 @@ class ChecksheetContentConfig(models.Model):
         return f"{self.model_name} - {self.parameter_name}"
 
 
-# Signal to create frequency config for new models
+# Keep the cached subgroup schedule in step with the checklist (new
+# checklists get theirs built by initialize_checklist)
 @receiver(post_save, sender=ChecklistBase)
-def create_frequency_config(sender, instance, created, **kwargs):
-    if created and instance.selected_model:
-        SubgroupFrequencyConfig.objects.get_or_create(
-            model_name=instance.selected_model,
-            defaults={
-                'frequency_hours': 2,
-                'max_subgroups': 6
-            }
+def refresh_subgroup_schedule(sender, instance, created, **kwargs):
+    from .schedule_utils import invalidate_subgroup_schedule
+
+    if not created:
+        invalidate_subgroup_schedule(instance.id)
+
+
+@receiver(post_save, sender=SubgroupEntry)
+@receiver(post_delete, sender=SubgroupEntry)
+def invalidate_schedule_on_subgroup_change(sender, instance, **kwargs):
+    from .schedule_utils import invalidate_subgroup_schedule
+
+    invalidate_subgroup_schedule(instance.checklist_id)
+
+
+# Schedules are built from verification_status.shift.shift_type
+@receiver(post_save, sender=DailyVerificationStatus)
+def invalidate_schedules_on_verification_change(sender, instance, created, **kwargs):
+    from .schedule_utils import invalidate_subgroup_schedules
+
+    if not created:
+        invalidate_subgroup_schedules(instance.checklists.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Shift)
+def invalidate_schedules_on_shift_change(sender, instance, created, **kwargs):
+    from .schedule_utils import invalidate_subgroup_schedules
+
+    if not created:
+        invalidate_subgroup_schedules(
+            ChecklistBase.objects.filter(verification_status__shift=instance).values_list('id', flat=True)
         )
 
 
+@receiver(post_save, sender=SubgroupFrequencyConfig)
+@receiver(post_delete, sender=SubgroupFrequencyConfig)
+def invalidate_schedules_on_config_change(sender, instance, **kwargs):
+    from .schedule_utils import invalidate_all_subgroup_schedules
+
+    invalidate_all_subgroup_schedules()
+
+
 
 
  
@@ -1443,9 +1464,20 @@ class FTQRecord(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the rollup bucket so an edit that moves the record can clear it
+        if {'date', 'shift_type', 'model_name'}.issubset(field_names):
+            instance._rollup_key = (instance.date, instance.shift_type or '', instance.model_name)
+        return instance
+    
     @property
     def total_defects(self):
         """Calculate total defects by summing all time-based defect entries"""
+        # Use the value annotated by ftq_utils.with_defect_totals() when present
+        if hasattr(self, 'defect_total'):
+            return self.defect_total or 0
         return self.time_based_defects.aggregate(
             total=Sum('count')
         )['total'] or 0
@@ -1579,18 +1611,79 @@ class CustomDefectType(models.Model):
     
     def __str__(self):
         return f"{self.operation_number.number} - {self.name} (Custom)"
-    
 
 
-@receiver(post_save, sender=ChecklistBase)
-def notify_supervisors(sender, instance, created, **kwargs):
-    """Notify supervisors when a checklist is created or updated"""
-    if created:
-        # Mark verification status as in progress
-        verification_status = instance.verification_status
-        verification_status.status = 'in_progress'
-        verification_status.supervisor_notified = True
-        verification_status.save()
+class FTQDailyRollup(models.Model):
+    """
+    Per-day FTQ totals kept in sync with FTQRecord / TimeBasedDefectEntry.
+
+    The row with a blank defect_type holds the inspected, defect and record
+    totals for its (date, shift, model) bucket; rows with a defect_type hold
+    the count for that defect only.
+    """
+    date = models.DateField()
+    shift_type = models.CharField(max_length=100, choices=FTQRecord.SHIFTS, blank=True, default='')
+    model_name = models.CharField(max_length=10, choices=FTQRecord.MODEL_CHOICES)
+    defect_type = models.CharField(max_length=200, blank=True, default='')
+
+    total_inspected = models.PositiveIntegerField(default=0)
+    total_defects = models.PositiveIntegerField(default=0)
+    record_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date', 'shift_type', 'model_name', 'defect_type']
+        unique_together = ['date', 'shift_type', 'model_name', 'defect_type']
+        indexes = [
+            models.Index(fields=['date', 'defect_type'], name='ftq_rollup_date_defect_idx'),
+        ]
+        verbose_name = "FTQ Daily Rollup"
+        verbose_name_plural = "FTQ Daily Rollups"
+
+    def __str__(self):
+        defect = self.defect_type or 'All defects'
+        return f"{self.date} - {self.shift_type} - {self.model_name} - {defect}"
+
+
+# Keep FTQDailyRollup in step with the FTQ source rows
+def _ftq_bucket_key(record):
+    return (record.date, record.shift_type or '', record.model_name)
+
+
+@receiver(post_save, sender=FTQRecord)
+def update_ftq_rollup_on_record_save(sender, instance, created, **kwargs):
+    """Refresh the rollup bucket of a saved FTQ record (and its old bucket if it moved)"""
+    from .ftq_utils import refresh_ftq_rollup
+
+    new_key = _ftq_bucket_key(instance)
+    old_key = getattr(instance, '_rollup_key', None)
+    if old_key and old_key != new_key:
+        refresh_ftq_rollup(*old_key)
+    refresh_ftq_rollup(*new_key)
+    instance._rollup_key = new_key
+
+
+@receiver(post_delete, sender=FTQRecord)
+def update_ftq_rollup_on_record_delete(sender, instance, **kwargs):
+    """Drop a deleted FTQ record from its rollup bucket"""
+    from .ftq_utils import refresh_ftq_rollup
+
+    refresh_ftq_rollup(*_ftq_bucket_key(instance))
+
+
+@receiver(post_save, sender=TimeBasedDefectEntry)
+@receiver(post_delete, sender=TimeBasedDefectEntry)
+def update_ftq_rollup_on_defect_change(sender, instance, **kwargs):
+    """Refresh the rollup bucket of the FTQ record a defect entry belongs to"""
+    from .ftq_utils import refresh_ftq_rollup
+
+    key = FTQRecord.objects.filter(pk=instance.ftq_record_id).values_list(
+        'date', 'shift_type', 'model_name'
+    ).first()
+    if key:
+        record_date, shift_type, model_name = key
+        refresh_ftq_rollup(record_date, shift_type or '', model_name)
+
 
 
 @receiver(post_save, sender=SubgroupVerification)
@@ -1689,6 +1782,12 @@ class DTPMChecklistFMA03(models.Model):
     def __str__(self):
         return f"DTPM Checklist - {self.date} - {self.shift}"
 
+    def save(self, *args, **kwargs):
+        # The check results are added by a post_save receiver; create them
+        # in the same transaction as the checklist
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class DTPMCheckResult(models.Model):
     """Results for each of the 7 fixed check items"""
@@ -1811,14 +1910,16 @@ class DTPMIssue(models.Model):
 def create_check_results(sender, instance, created, **kwargs):
     """Create the 7 standard check results when a new checklist is created"""
     if created:
-        # Create a check result for each of the 7 fixed items
-        for item_number, _ in DTPMCheckResult.CHECK_ITEMS:
-            DTPMCheckResult.objects.create(
+        # One check result for each of the 7 fixed items, in a single INSERT
+        DTPMCheckResult.objects.bulk_create([
+            DTPMCheckResult(
                 checklist=instance,
                 item_number=item_number,
                 result='',  # Empty result by default
                 checked_by=instance.operator  # Default to the operator who created the checklist
             )
+            for item_number, _ in DTPMCheckResult.CHECK_ITEMS
+        ])
             
             
             
@@ -2439,7 +2540,10 @@ class DTPMChecklistFMA03New(models.Model):
                 if not self.checklist_shift:
                     self.checklist_shift = checklist.shift
         
-        super().save(*args, **kwargs)
+        # Check results are added by a post_save receiver; keep them in the
+        # same transaction as the checklist
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     @property
     def get_model_from_checklist(self):
@@ -2609,21 +2713,33 @@ class DTPMVerificationHistory(models.Model):
         return f"{self.get_verification_type_display()} - {self.verified_by.username} - {self.verified_at}"
 
 
+def active_checkpoint_ids():
+    """
+    Ids of the active DTPM checkpoints in display order. Deliberately not
+    cached: the cache is per process, and a deleted checkpoint's id handed
+    to bulk_create would fail the checklist's save on its foreign key
+    """
+    return list(
+        DTPMCheckpoint.objects.filter(is_active=True)
+        .order_by('order', 'checkpoint_number')
+        .values_list('id', flat=True)
+    )
+
+
 # Signal to automatically create checkpoint results when a new DTPM checklist is created
 @receiver(post_save, sender=DTPMChecklistFMA03New)
 def create_check_results(sender, instance, created, **kwargs):
     """Create check results for all active checkpoints when a new checklist is created"""
     if created:
-        # Get all active checkpoints
-        active_checkpoints = DTPMCheckpoint.objects.filter(is_active=True).order_by('order', 'checkpoint_number')
-        
-        # Create a check result for each active checkpoint
-        for checkpoint in active_checkpoints:
-            DTPMCheckResultNew.objects.create(
+        # One INSERT for all active checkpoints
+        DTPMCheckResultNew.objects.bulk_create([
+            DTPMCheckResultNew(
                 checklist=instance,
-                checkpoint=checkpoint,
+                checkpoint_id=checkpoint_id,
                 status='NG'  # Default status
             )
+            for checkpoint_id in active_checkpoint_ids()
+        ])
             
             
             
@@ -2733,6 +2849,11 @@ class ChecksheetField(models.Model):
     default_value = models.CharField(max_length=200, blank=True, verbose_name="Default Value")
     placeholder = models.CharField(max_length=200, blank=True, verbose_name="Placeholder Text")
     
+    is_program_selector = models.BooleanField(
+        default=False,
+        verbose_name="Program selection field",
+        help_text="The model chosen in this field drives the auto-filled fields"
+    )
     auto_fill_based_on_model = models.BooleanField(
         default=False,
         verbose_name="Auto-fill based on selected model"
@@ -2777,6 +2898,27 @@ class ChecksheetField(models.Model):
         return self.default_value
 
 
+# Drop the compiled schema of a checksheet whose sections or fields change
+@receiver(post_save, sender=ChecksheetSection)
+@receiver(post_delete, sender=ChecksheetSection)
+def invalidate_schema_on_section_change(sender, instance, **kwargs):
+    from .checksheet_utils import schema_cache
+
+    schema_cache.invalidate(instance.checksheet_id)
+
+
+@receiver(post_save, sender=ChecksheetField)
+@receiver(post_delete, sender=ChecksheetField)
+def invalidate_schema_on_field_change(sender, instance, **kwargs):
+    from .checksheet_utils import schema_cache
+
+    try:
+        checksheet_id = instance.section.checksheet_id
+    except ChecksheetSection.DoesNotExist:
+        checksheet_id = None  # clears every schema
+    schema_cache.invalidate(checksheet_id)
+
+
 class ChecksheetResponse(models.Model):
     """Store responses to checksheet instances"""
     checksheet = models.ForeignKey(Checksheet, on_delete=models.CASCADE, related_name='responses')
@@ -2823,10 +2965,20 @@ class ChecksheetResponse(models.Model):
     rejection_reason = models.TextField(blank=True)
     notes = models.TextField(blank=True)
     
+    # Counters kept in step with the field responses (refresh_counters), so
+    # lists can show, sort and filter on them without per-row queries
+    required_total = models.PositiveIntegerField(default=0)
+    completion_pct = models.PositiveSmallIntegerField(default=0)
+    nok_count = models.PositiveIntegerField(default=0)
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Checksheet Response"
         verbose_name_plural = "Checksheet Responses"
+        indexes = [
+            models.Index(fields=['completion_pct'], name='cs_response_completion_idx'),
+            models.Index(fields=['nok_count'], name='cs_response_nok_idx'),
+        ]
     
     def __str__(self):
         return f"{self.checksheet.name} - {self.status}"
@@ -2926,37 +3078,47 @@ class ChecksheetResponse(models.Model):
         self.rejection_reason = reason
         self.save()
 
-    def get_completion_percentage(self):
-        """Calculate the completion percentage of required fields"""
-        total_required = self.checksheet.sections.filter(
+    def refresh_counters(self):
+        """
+        Recompute required_total, completion_pct and nok_count from the
+        field responses and store them with a single UPDATE
+        """
+        required_total = ChecksheetField.objects.filter(
+            section__checksheet_id=self.checksheet_id,
+            section__is_active=True,
+            is_required=True,
             is_active=True
-        ).aggregate(
-            count=models.Count('fields', filter=models.Q(fields__is_required=True, fields__is_active=True))
-        )['count'] or 0
-        
-        if total_required == 0:
-            return 100
-        
-        filled_required = self.field_responses.filter(
-            field__is_required=True,
-            field__is_active=True
-        ).exclude(
-            value=''
         ).count()
+        counts = self.field_responses.aggregate(
+            filled_required=models.Count(
+                'id',
+                filter=models.Q(field__is_required=True, field__is_active=True) & ~models.Q(value='')
+            ),
+            nok=models.Count('id', filter=models.Q(status='NOK') | models.Q(value='NOK')),
+        )
         
-        return int((filled_required / total_required) * 100)
+        self.required_total = required_total
+        self.completion_pct = (
+            int((counts['filled_required'] / required_total) * 100) if required_total else 100
+        )
+        self.nok_count = counts['nok']
+        ChecksheetResponse.objects.filter(pk=self.pk).update(
+            required_total=self.required_total,
+            completion_pct=self.completion_pct,
+            nok_count=self.nok_count
+        )
+
+    def get_completion_percentage(self):
+        """Completion percentage of required fields"""
+        return self.completion_pct
 
     def has_nok_items(self):
         """Check if there are any NOK or failed items"""
-        return self.field_responses.filter(
-            models.Q(status='NOK') | models.Q(value='NOK')
-        ).exists()
+        return self.nok_count > 0
 
     def get_nok_count(self):
         """Get count of NOK items"""
-        return self.field_responses.filter(
-            models.Q(status='NOK') | models.Q(value='NOK')
-        ).count()
+        return self.nok_count
 
 
 class ChecksheetFieldResponse(models.Model):
@@ -3076,8 +3238,21 @@ class ParameterGroupConfig(models.Model):
         return f"{self.model_name} - {self.get_parameter_group_display()} (after {self.frequency_minutes} min)"
 
 
-class ParameterGroupEntry(models.Model):
+@receiver(post_save, sender=ParameterGroupConfig)
+@receiver(post_delete, sender=ParameterGroupConfig)
+def invalidate_parameter_configs_on_change(sender, instance, **kwargs):
+    from .schedule_utils import invalidate_parameter_group_configs
+
+    invalidate_parameter_group_configs()
+
+
+class ParameterGroupEntry(ChangeTrackingMixin, models.Model):
     """Stores readings for each parameter group"""
+
+    # Changed readings are available from tracked_changes() (no history table yet)
+    tracked_fields = READING_FIELDS
+    # Copied onto the entry's EntryReading rows (see readings_utils.sync_readings)
+    watched_fields = ('checklist_id', 'timestamp', 'parameter_group')
     
     OK_NG_CHOICES = [('OK', 'OK'), ('NOK', 'NOK')]
     YES_NO_CHOICES = [('Yes', 'Yes'), ('No', 'No')]
@@ -3100,6 +3275,10 @@ class ParameterGroupEntry(models.Model):
     
     # Status
     is_completed = models.BooleanField(default=False)
+
+    # Id given by the tablet to an entry submitted through the batch API, so
+    # a resent batch does not create the entry twice
+    client_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
     
     # ============================================
     # UV VACUUM TEST (5 readings)
@@ -3408,8 +3587,185 @@ class ParameterGroupVerification(models.Model):
     class Meta:
         ordering = ['-verified_at']
         unique_together = ['parameter_entry', 'verification_type']
+        indexes = [
+            models.Index(
+                fields=['parameter_entry', 'verification_type', 'status'],
+                name='param_verif_entry_type_idx'
+            ),
+        ]
         verbose_name = "Parameter Group Verification"
         verbose_name_plural = "Parameter Group Verifications"
     
     def __str__(self):
-        return f"{self.parameter_entry.parameter_display_name} - {self.get_verification_type_display()} - {self.status}"
\ No newline at end of file
+        return f"{self.parameter_entry.parameter_display_name} - {self.get_verification_type_display()} - {self.status}"
+
+
+class ReportSnapshot(models.Model):
+    """
+    Precomputed report figures for a closed day, week or month.
+
+    Closed periods are served from here instead of recomputing them from the
+    checklist, parameter, FTQ, EP and DTPM tables on every report view; the
+    ``build_report_snapshots`` command builds them, and a change to a source
+    row deletes the snapshots covering its day so they are computed again.
+    """
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    period_type = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    payload = models.JSONField(default=dict)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['period_type', '-period_start']
+        unique_together = ['period_type', 'period_start']
+        verbose_name = "Report Snapshot"
+        verbose_name_plural = "Report Snapshots"
+
+    def __str__(self):
+        return f"{self.get_period_type_display()} {self.period_start} - {self.period_end}"
+
+
+# Snapshots are computed from these rows; a change on a closed day drops the
+# snapshots covering it (FTQ changes do the same through refresh_ftq_rollup)
+def _invalidate_report_snapshots(days):
+    from .report_utils import invalidate_snapshots
+
+    invalidate_snapshots(days)
+
+
+@receiver(post_save, sender=ChecklistBase)
+@receiver(post_delete, sender=ChecklistBase)
+def invalidate_snapshots_on_checklist_change(sender, instance, **kwargs):
+    if instance.verification_status_id:
+        _invalidate_report_snapshots(
+            Shift.objects.filter(verification_statuses=instance.verification_status_id).values_list('date', flat=True)
+        )
+
+
+@receiver(post_save, sender=ParameterGroupEntry)
+@receiver(post_delete, sender=ParameterGroupEntry)
+def invalidate_snapshots_on_parameter_entry_change(sender, instance, **kwargs):
+    # The loaded timestamp is still there in post_save, so a moved entry clears both days
+    loaded = getattr(instance, '_loaded_values', {}).get('timestamp')
+    _invalidate_report_snapshots(
+        timezone.localdate(timestamp) for timestamp in (instance.timestamp, loaded) if timestamp
+    )
+
+
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+@receiver(post_save, sender=ErrorPreventionCheck)
+@receiver(post_delete, sender=ErrorPreventionCheck)
+@receiver(post_save, sender=DTPMChecklistFMA03New)
+@receiver(post_delete, sender=DTPMChecklistFMA03New)
+def invalidate_snapshots_on_dated_change(sender, instance, **kwargs):
+    _invalidate_report_snapshots([instance.date])
+
+
+class Job(models.Model):
+    """
+    A unit of background work (exports, report builds, bulk admin actions)
+    queued by a view and executed by the ``run_jobs`` worker.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed while the job runs; a running job whose heartbeat stops is
+    # assumed lost with its worker
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+        verbose_name = "Background Job"
+        verbose_name_plural = "Background Jobs"
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def progress(self):
+        if not self.progress_total:
+            return 100 if self.status == 'done' else 0
+        return round(self.progress_done * 100 / self.progress_total)
+
+
+class EntryReading(models.Model):
+    """
+    One reading of a SubgroupEntry or ParameterGroupEntry in long format,
+    kept in step with the entry's reading columns on save (see
+    readings_utils) so statistics can be taken over date ranges in SQL.
+    """
+    subgroup_entry = models.ForeignKey(
+        SubgroupEntry, on_delete=models.CASCADE, null=True, blank=True, related_name='readings'
+    )
+    parameter_group_entry = models.ForeignKey(
+        ParameterGroupEntry, on_delete=models.CASCADE, null=True, blank=True, related_name='readings'
+    )
+    checklist = models.ForeignKey(ChecklistBase, on_delete=models.CASCADE, related_name='readings')
+    timestamp = models.DateTimeField()
+    # Parameter group key (uv_vacuum, uv_flow, ...) and reading number
+    parameter = models.CharField(max_length=30)
+    index = models.PositiveSmallIntegerField()
+    numeric_value = models.FloatField(null=True, blank=True)
+    categorical_value = models.CharField(max_length=5, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subgroup_entry', 'parameter', 'index'],
+                condition=models.Q(subgroup_entry__isnull=False),
+                name='reading_subgroup_entry_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['parameter_group_entry', 'parameter', 'index'],
+                condition=models.Q(parameter_group_entry__isnull=False),
+                name='reading_param_entry_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['parameter', 'timestamp'], name='reading_param_time_idx'),
+            models.Index(fields=['checklist', 'parameter'], name='reading_checklist_param_idx'),
+        ]
+        verbose_name = "Entry Reading"
+        verbose_name_plural = "Entry Readings"
+
+    def __str__(self):
+        value = self.numeric_value if self.numeric_value is not None else self.categorical_value
+        return f"{self.parameter} #{self.index}: {value}"
+
+
+@receiver(post_save, sender=SubgroupEntry)
+@receiver(post_save, sender=ParameterGroupEntry)
+def sync_entry_readings(sender, instance, created, **kwargs):
+    from .readings_utils import sync_readings
+
+    sync_readings(instance, created)
@@ -0,0 +1,363 @@
+# readings_utils.py
+"""
+Individual parameter readings in long format (one row per reading).
+
+Readings are streamed as CSV or JSON lines for SPC tooling, reading the
+entry columns with values_list().iterator() so no model instances are
+built. They are also kept in the EntryReading table, which backs the range
+statistics below (SQL aggregates, and NumPy for per-entry X-bar/R).
+"""
+import csv
+import functools
+import io
+import itertools
+import json
+import operator
+from datetime import datetime, time, timedelta
+
+from django.db.models import Avg, Count, F, Max, Min, Q, StdDev
+from django.utils import timezone
+
+from .models import EntryReading, ParameterGroupEntry, SubgroupEntry
+
+# parameter group: (field stem, number of readings)
+READING_GROUPS = {
+    'uv_vacuum': ('uv_vacuum_test', 5),
+    'uv_flow': ('uv_flow_value', 5),
+    'umbrella_valve': ('umbrella_valve_assembly', 5),
+    'uv_clip': ('uv_clip_pressing', 5),
+    'workstation': ('workstation_clean', 1),
+    'bin_contamination': ('bin_contamination_check', 5),
+}
+
+READING_COLUMNS = [
+    'source', 'entry_id', 'checklist_id', 'timestamp', 'model', 'shift',
+    'parameter_group', 'parameter', 'reading_number', 'value',
+]
+
+# Rows per database round trip and per chunk written to the response
+CHUNK_SIZE = 2000
+
+_ENTRY_COLUMNS = (
+    'id', 'checklist_id', 'timestamp', 'checklist__selected_model',
+    'checklist__verification_status__shift__shift_type',
+)
+
+
+def reading_fields(group):
+    """[(reading_number, field name)] of a parameter group"""
+    stem, count = READING_GROUPS[group]
+    if count == 1:
+        return [(1, stem)]
+    return [(number, f'{stem}_{number}') for number in range(1, count + 1)]
+
+
+# Specification limits of the numeric parameter groups; every other group
+# is categorical and passes with one of OK_VALUES
+SPEC_LIMITS = {
+    'uv_vacuum': (-43, -35),
+    'uv_flow': (30, 40),
+}
+OK_VALUES = ('OK', 'Yes')
+
+
+def out_of_spec_q(prefix=''):
+    """Q matching EntryReading rows outside their spec (``prefix`` for lookups through a relation)"""
+    numeric = [
+        Q(**{f'{prefix}parameter': group})
+        & (Q(**{f'{prefix}numeric_value__lt': low}) | Q(**{f'{prefix}numeric_value__gt': high}))
+        for group, (low, high) in SPEC_LIMITS.items()
+    ]
+    categorical = (
+        Q(**{f'{prefix}categorical_value__isnull': False})
+        & ~Q(**{f'{prefix}categorical_value__in': OK_VALUES})
+    )
+    return functools.reduce(operator.or_, numeric, categorical)
+
+
+def _filtered(queryset, start_date, end_date, model=None):
+    queryset = queryset.filter(timestamp__date__range=[start_date, end_date])
+    if model:
+        queryset = queryset.filter(checklist__selected_model=model)
+    return queryset.order_by('timestamp', 'id')
+
+
+def _rows(source, queryset, groups):
+    layout = [(group, field, number) for group in groups for number, field in reading_fields(group)]
+    columns = _ENTRY_COLUMNS + tuple(field for _, field, _ in layout)
+    offset = len(_ENTRY_COLUMNS)
+
+    for row in queryset.values_list(*columns).iterator(chunk_size=CHUNK_SIZE):
+        entry_id, checklist_id, timestamp, model, shift = row[:offset]
+        timestamp = timezone.localtime(timestamp).isoformat()
+        for index, (group, field, number) in enumerate(layout, offset):
+            value = row[index]
+            if value is None:
+                continue
+            yield (
+                source, entry_id, checklist_id, timestamp, model, shift,
+                group, READING_GROUPS[group][0], number, value,
+            )
+
+
+def reading_rows(start_date, end_date, model=None, parameter_group=None):
+    """
+    Every non-empty reading from parameter group entries and subgroup
+    entries timestamped within the date range, as tuples in READING_COLUMNS
+    order.
+    """
+    groups = [parameter_group] if parameter_group else list(READING_GROUPS)
+
+    entries = _filtered(ParameterGroupEntry.objects.all(), start_date, end_date, model)
+    for group in groups:
+        # A parameter group entry only carries its own group's readings
+        yield from _rows('parameter_entry', entries.filter(parameter_group=group), [group])
+
+    subgroups = _filtered(SubgroupEntry.objects.all(), start_date, end_date, model)
+    yield from _rows('subgroup', subgroups, groups)
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= CHUNK_SIZE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def csv_stream(rows):
+    """CSV text chunks, starting with a header line"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def lines():
+        for row in itertools.chain([READING_COLUMNS], rows):
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    return _batched(lines())
+
+
+def jsonl_stream(rows):
+    """JSON lines chunks, one object per reading"""
+    return _batched(
+        json.dumps(dict(zip(READING_COLUMNS, row))) + '\n'
+        for row in rows
+    )
+
+
+# EntryReading store
+
+def _entry_layout(entry):
+    """[(group, reading_number, field)] stored for an entry"""
+    # A parameter group entry only carries its own group's readings
+    groups = [entry.parameter_group] if isinstance(entry, ParameterGroupEntry) else list(READING_GROUPS)
+    return [
+        (group, number, field)
+        for group in groups if group in READING_GROUPS
+        for number, field in reading_fields(group)
+    ]
+
+
+def _entry_key(entry):
+    if isinstance(entry, ParameterGroupEntry):
+        return 'parameter_group_entry_id'
+    return 'subgroup_entry_id'
+
+
+def _reading(entry_key, entry_id, checklist_id, timestamp, group, number, value):
+    numeric = group in SPEC_LIMITS
+    return EntryReading(
+        **{entry_key: entry_id},
+        checklist_id=checklist_id,
+        timestamp=timestamp,
+        parameter=group,
+        index=number,
+        numeric_value=value if numeric else None,
+        categorical_value=None if numeric else value,
+    )
+
+
+def sync_readings(entry, created=False):
+    """
+    Bring the EntryReading rows of a just saved entry in line with its
+    columns: all of them for a new entry, or when a field copied onto every
+    reading (``entry.saved_watched_changes``: checklist, timestamp,
+    parameter group) changed; otherwise only the readings in
+    ``entry.saved_changes`` (replaced with one DELETE and one INSERT).
+
+    Only save() is seen: entries changed with QuerySet.update() or
+    bulk_update() must be resynced by the caller (or with
+    ``manage.py backfill_readings --rebuild``).
+    """
+    layout = _entry_layout(entry)
+    if not created:
+        stored = EntryReading.objects.filter(**{_entry_key(entry): entry.pk})
+        if getattr(entry, 'saved_watched_changes', None):
+            stored.delete()
+        else:
+            changed = {field for field, _, _ in getattr(entry, 'saved_changes', ())}
+            layout = [item for item in layout if item[2] in changed]
+            if not layout:
+                return
+            stored.filter(
+                functools.reduce(operator.or_, (Q(parameter=group, index=number) for group, number, _ in layout)),
+            ).delete()
+
+    EntryReading.objects.bulk_create(_entry_readings(entry, layout))
+
+
+def _entry_readings(entry, layout):
+    return [
+        _reading(_entry_key(entry), entry.pk, entry.checklist_id, entry.timestamp, group, number, value)
+        for group, number, field in layout
+        if (value := getattr(entry, field)) is not None
+    ]
+
+
+def create_readings(entries):
+    """Store the readings of entries saved with bulk_create (which sends no post_save)"""
+    EntryReading.objects.bulk_create([
+        reading for entry in entries for reading in _entry_readings(entry, _entry_layout(entry))
+    ])
+
+
+def backfill_readings(model, batch_size=500, progress=None):
+    """
+    Create EntryReading rows for every ``model`` entry (SubgroupEntry or
+    ParameterGroupEntry) that has none yet. Returns the number of rows
+    created.
+    """
+    entry_key = 'parameter_group_entry_id' if model is ParameterGroupEntry else 'subgroup_entry_id'
+    stored = EntryReading.objects.filter(**{f'{entry_key}__isnull': False}).values(entry_key)
+    entries = model.objects.exclude(pk__in=stored).order_by('pk')
+
+    group_column = ('parameter_group',) if model is ParameterGroupEntry else ()
+    columns = ('id', 'checklist_id', 'timestamp') + group_column + tuple(
+        field for group in READING_GROUPS for _, field in reading_fields(group)
+    )
+
+    created = 0
+    batch = []
+    for row in entries.values_list(*columns).iterator(chunk_size=batch_size):
+        values = dict(zip(columns, row))
+        groups = [values['parameter_group']] if group_column else list(READING_GROUPS)
+        batch.extend(
+            _reading(entry_key, values['id'], values['checklist_id'], values['timestamp'], group, number, values[field])
+            for group in groups if group in READING_GROUPS
+            for number, field in reading_fields(group)
+            if values[field] is not None
+        )
+        if len(batch) >= batch_size:
+            created += len(EntryReading.objects.bulk_create(batch))
+            batch = []
+            if progress:
+                progress(created)
+    if batch:
+        created += len(EntryReading.objects.bulk_create(batch))
+    return created
+
+
+def readings_in_range(start_date, end_date, model=None, parameter=None):
+    """EntryReading rows timestamped within the (local) date range"""
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    readings = EntryReading.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if model:
+        readings = readings.filter(checklist__selected_model=model)
+    if parameter:
+        readings = readings.filter(parameter=parameter)
+    return readings
+
+
+def reading_statistics(start_date, end_date, model=None):
+    """
+    {parameter group: figures} over the date range, from one grouped
+    query: count, mean / min / max / standard deviation of numeric readings,
+    and the OK and out-of-spec counts.
+    """
+    rows = readings_in_range(start_date, end_date, model).values('parameter').annotate(
+        count=Count('id'),
+        mean=Avg('numeric_value'),
+        minimum=Min('numeric_value'),
+        maximum=Max('numeric_value'),
+        std_dev=StdDev('numeric_value', sample=True),
+        ok_count=Count('id', filter=Q(categorical_value__in=OK_VALUES)),
+        out_of_spec=Count('id', filter=out_of_spec_q()),
+    ).order_by('parameter')
+    return {row.pop('parameter'): row for row in rows}
+
+
+def xbar_r(start_date, end_date, parameter, model=None):
+    """
+    X-bar/R figures of a numeric parameter group over the date range: the
+    mean and range of every entry's readings (in time order), their grand
+    averages, and per-entry out-of-spec flags. Computed with NumPy over one
+    query's rows.
+    """
+    import numpy as np
+
+    low, high = SPEC_LIMITS[parameter]
+    _, count = READING_GROUPS[parameter]
+    rows = list(
+        readings_in_range(start_date, end_date, model, parameter)
+        .filter(numeric_value__isnull=False)
+        .values_list('subgroup_entry_id', 'parameter_group_entry_id', 'timestamp', 'index', 'numeric_value')
+        .order_by('timestamp', 'subgroup_entry_id', 'parameter_group_entry_id')
+    )
+    if not rows:
+        return {
+            'timestamps': [], 'means': [], 'ranges': [], 'out_of_spec': [],
+            'xbar': None, 'rbar': None, 'limits': (low, high),
+        }
+
+    # One matrix row per entry, one column per reading number (NaN when missing)
+    entry_keys = {}
+    timestamps = []
+    for subgroup_id, param_entry_id, timestamp, _, _ in rows:
+        key = (subgroup_id, param_entry_id)
+        if key not in entry_keys:
+            entry_keys[key] = len(entry_keys)
+            timestamps.append(timestamp)
+
+    matrix = np.full((len(entry_keys), count), np.nan)
+    row_index = np.fromiter(
+        (entry_keys[(subgroup_id, param_entry_id)] for subgroup_id, param_entry_id, _, _, _ in rows),
+        dtype=np.intp, count=len(rows),
+    )
+    column_index = np.fromiter((index - 1 for _, _, _, index, _ in rows), dtype=np.intp, count=len(rows))
+    matrix[row_index, column_index] = np.fromiter((value for *_, value in rows), dtype=float, count=len(rows))
+
+    means = np.nanmean(matrix, axis=1)
+    ranges = np.nanmax(matrix, axis=1) - np.nanmin(matrix, axis=1)
+    out_of_spec = np.any((matrix < low) | (matrix > high), axis=1)
+
+    return {
+        'timestamps': timestamps,
+        'means': means.tolist(),
+        'ranges': ranges.tolist(),
+        'out_of_spec': out_of_spec.tolist(),
+        'xbar': float(means.mean()),
+        'rbar': float(ranges.mean()),
+        'limits': (low, high),
+    }
+
+
+def entries_needing_approval(checklist):
+    """
+    Ids of the checklist's parameter group entries with a reading of their
+    own group out of spec (out of range, NOK or No), in one query
+    """
+    return set(
+        EntryReading.objects.filter(
+            out_of_spec_q(),
+            checklist=checklist,
+            parameter_group_entry__isnull=False,
+            parameter=F('parameter_group_entry__parameter_group'),
+        ).values_list('parameter_group_entry_id', flat=True)
+    )
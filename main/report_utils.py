@@ -0,0 +1,260 @@
+# report_utils.py
+"""
+Report figures per period, served from ReportSnapshot for closed periods
+and computed live only for the period that is still open (today).
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .ftq_utils import rollup_breakdown, rollup_queryset
+from .models import (
+    ChecklistBase, DTPMChecklistFMA03New, ErrorPreventionCheck,
+    ParameterGroupEntry, ReportSnapshot,
+)
+from .stats_utils import (
+    DTPM_CHECKLIST_STATUS_BUCKETS, EP_CHECK_STATUS_BUCKETS, status_breakdown,
+)
+
+CHECKLIST_STATUS_BUCKETS = {
+    'total': None,
+    'pending': Q(status='pending'),
+    'supervisor_approved': Q(status='supervisor_approved'),
+    'quality_approved': Q(status='quality_approved'),
+    'rejected': Q(status='rejected'),
+}
+
+
+# Periods
+
+def period_bounds(period_type, day):
+    """(start, end) of the calendar day, Monday-Sunday week or month containing ``day``"""
+    if period_type == 'day':
+        return day, day
+    if period_type == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period_type == 'month':
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    raise ValueError(f"Unknown period type: {period_type}")
+
+
+def is_closed(period_end, today=None):
+    return period_end < (today or timezone.localdate())
+
+
+# Payloads
+
+def compute_payload(start_date, end_date):
+    """Report figures for every day from ``start_date`` to ``end_date``, as plain counts"""
+    checklists = ChecklistBase.objects.filter(verification_status__shift__date__range=[start_date, end_date])
+
+    by_model = checklists.order_by().values('selected_model').annotate(
+        total=Count('id'),
+        approved=Count('id', filter=Q(status='quality_approved')),
+        rejected=Count('id', filter=Q(status='rejected')),
+    )
+
+    parameter_entries = ParameterGroupEntry.objects.filter(
+        timestamp__date__range=[start_date, end_date]
+    ).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(is_completed=True)),
+    )
+
+    ftq = rollup_breakdown(rollup_queryset(start_date, end_date))
+
+    return {
+        'checklists': status_breakdown(checklists, CHECKLIST_STATUS_BUCKETS),
+        'checklists_by_model': {
+            row['selected_model']: {
+                'total': row['total'],
+                'approved': row['approved'],
+                'rejected': row['rejected'],
+            }
+            for row in by_model
+        },
+        'parameter_entries': parameter_entries,
+        'ftq': {
+            'total_inspected': ftq['total_inspected'],
+            'total_defects': ftq['total_defects'],
+            'record_count': ftq['record_count'],
+        },
+        'ep_checks': status_breakdown(
+            ErrorPreventionCheck.objects.filter(date__range=[start_date, end_date]),
+            EP_CHECK_STATUS_BUCKETS
+        ),
+        'dtpm_checklists': status_breakdown(
+            DTPMChecklistFMA03New.objects.filter(date__range=[start_date, end_date]),
+            DTPM_CHECKLIST_STATUS_BUCKETS
+        ),
+    }
+
+
+def combine_payloads(payloads):
+    """Sum payloads of adjacent periods into one (counts only, nested dicts)"""
+    def merge(target, source):
+        for key, value in source.items():
+            if isinstance(value, dict):
+                merge(target.setdefault(key, {}), value)
+            else:
+                target[key] = target.get(key, 0) + (value or 0)
+        return target
+
+    combined = {}
+    for payload in payloads:
+        merge(combined, payload)
+    return combined
+
+
+# Snapshots
+
+def save_snapshot(period_type, start_date, end_date):
+    payload = compute_payload(start_date, end_date)
+    ReportSnapshot.objects.update_or_create(
+        period_type=period_type,
+        period_start=start_date,
+        defaults={'period_end': end_date, 'payload': payload},
+    )
+    return payload
+
+
+def invalidate_snapshots(days):
+    """
+    Delete the snapshots of every period containing one of ``days``, after
+    a change to the rows they were computed from; the next read (or the
+    nightly build) computes them again. Returns the number deleted.
+    """
+    days = {day for day in days if day}
+    if not days:
+        return 0
+    covering = Q()
+    for day in days:
+        covering |= Q(period_start__lte=day, period_end__gte=day)
+    return ReportSnapshot.objects.filter(covering).delete()[0]
+
+
+def period_payload(period_type, day):
+    """
+    Payload for the day/week/month containing ``day``: the stored snapshot
+    when the period is closed (created on first use), live figures otherwise.
+    """
+    start_date, end_date = period_bounds(period_type, day)
+    if not is_closed(end_date):
+        return compute_payload(start_date, min(end_date, timezone.localdate()))
+
+    snapshot = ReportSnapshot.objects.filter(
+        period_type=period_type, period_start=start_date
+    ).values_list('payload', flat=True).first()
+    if snapshot is None:
+        snapshot = save_snapshot(period_type, start_date, end_date)
+    return snapshot
+
+
+def daily_payloads(start_date, end_date):
+    """
+    {day: payload} for every day in the range: closed days from snapshots
+    (one query, missing ones computed and stored), the open day live.
+    """
+    today = timezone.localdate()
+    stored = dict(ReportSnapshot.objects.filter(
+        period_type='day',
+        period_start__range=[start_date, end_date]
+    ).values_list('period_start', 'payload'))
+
+    payloads = {}
+    day = start_date
+    while day <= end_date:
+        if day in stored:
+            payloads[day] = stored[day]
+        elif is_closed(day, today):
+            payloads[day] = save_snapshot('day', day, day)
+        elif day == today:
+            payloads[day] = compute_payload(day, day)
+        day += timedelta(days=1)
+    return payloads
+
+
+def range_payload(start_date, end_date):
+    """
+    Payload for an arbitrary date range, assembled from the largest closed
+    snapshots that fit (months, then weeks, then days) plus live figures
+    for the open part of the range.
+    """
+    today = timezone.localdate()
+    stored = {
+        (period_type, period_start): payload
+        for period_type, period_start, payload in ReportSnapshot.objects.filter(
+            period_start__range=[start_date, end_date]
+        ).values_list('period_type', 'period_start', 'payload')
+    }
+
+    payloads = []
+    day = start_date
+    while day <= end_date:
+        if not is_closed(day, today):
+            payloads.append(compute_payload(day, min(end_date, today)))
+            break
+
+        for period_type in ('month', 'week', 'day'):
+            period_start, period_end = period_bounds(period_type, day)
+            if period_start == day and period_end <= end_date and is_closed(period_end, today):
+                break
+
+        payload = stored.get((period_type, period_start))
+        if payload is None:
+            payload = save_snapshot(period_type, period_start, period_end)
+        payloads.append(payload)
+        day = period_end + timedelta(days=1)
+
+    return combine_payloads(payloads)
+
+
+def build_snapshots(period_type, start_date, end_date, force=False):
+    """
+    Store snapshots for every closed ``period_type`` period overlapping
+    ``start_date`` - ``end_date``. Existing snapshots are kept unless
+    ``force`` is set. Returns the number of snapshots written.
+    """
+    today = timezone.localdate()
+    existing = set()
+    if not force:
+        existing = set(ReportSnapshot.objects.filter(
+            period_type=period_type,
+            period_end__gte=start_date,
+            period_start__lte=end_date
+        ).values_list('period_start', flat=True))
+
+    written = 0
+    period_start, period_end = period_bounds(period_type, start_date)
+    while period_start <= end_date and is_closed(period_end, today):
+        if period_start not in existing:
+            save_snapshot(period_type, period_start, period_end)
+            written += 1
+        period_start, period_end = period_bounds(period_type, period_end + timedelta(days=1))
+
+    return written
+
+
+def run_snapshot_job(job):
+    """Job handler: build_snapshots() for the payload's period types and date range"""
+    from datetime import date
+
+    start_date = date.fromisoformat(job.payload['start_date'])
+    end_date = date.fromisoformat(job.payload['end_date'])
+    force = job.payload.get('force', True)
+
+    written = {}
+    for period_type in job.payload.get('periods') or ['day', 'week', 'month']:
+        written[period_type] = build_snapshots(period_type, start_date, end_date, force=force)
+    return {'written': written}
+
+
+def approval_rate(stats):
+    """Approved share of verified (approved + rejected) items, as a whole percentage"""
+    approved = stats.get('approved', stats.get('quality_approved', 0))
+    verified = approved + stats.get('rejected', 0)
+    return round((approved / verified) * 100) if verified > 0 else 0
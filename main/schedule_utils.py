@@ -0,0 +1,195 @@
+# schedule_utils.py
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import shift_calendar
+from .models import ParameterGroupConfig, SubgroupFrequencyConfig
+
+DEFAULT_FREQUENCY_HOURS = 2
+DEFAULT_MAX_SUBGROUPS = 6
+
+# Bumped whenever a SubgroupFrequencyConfig changes, so every cached
+# schedule built from the old config is ignored
+CONFIG_VERSION_KEY = 'subgroup_schedule:config_version'
+# The cache is per process (no shared CACHES backend), so invalidation only
+# reaches the process that handled the write; this bounds how long another
+# process can serve a stale schedule
+SCHEDULE_TIMEOUT = 60
+
+
+# Same for ParameterGroupConfig changes and the cached parameter group configs
+PARAMETER_CONFIG_VERSION_KEY = 'parameter_configs:version'
+# Bounds how stale another process's copy can be after a config changes
+PARAMETER_CONFIG_TIMEOUT = 300
+
+
+def _cache_key(checklist_id):
+    version = cache.get(CONFIG_VERSION_KEY, 0)
+    return f'subgroup_schedule:{version}:{checklist_id}'
+
+
+class SubgroupSchedule:
+    """
+    Subgroup timing of one checklist: the expected slot times for its shift,
+    which slots are already filled, and the derived can-add / next-allowed
+    answers. Built once and cached so dashboard polling does not recompute
+    shift timings or hit the database per slot.
+    """
+
+    def __init__(self, checklist_id, shift_type, frequency_hours, max_subgroups,
+                 expected_times, completed):
+        self.checklist_id = checklist_id
+        self.shift_type = shift_type
+        self.frequency_hours = frequency_hours
+        self.max_subgroups = max_subgroups
+        self.expected_times = expected_times
+        # completed[i] is True when subgroup i + 1 has been entered
+        self.completed = completed
+
+    @property
+    def completed_count(self):
+        return sum(self.completed)
+
+    def is_completed(self, subgroup_number):
+        return 0 < subgroup_number <= len(self.completed) and self.completed[subgroup_number - 1]
+
+    def available_slots(self, now=None):
+        """Number of slots whose expected time has been reached"""
+        now = now or timezone.now()
+        return sum(1 for expected_time in self.expected_times if now >= expected_time)
+
+    def check_time_gap(self, now=None):
+        """Returns (can_add, next_allowed_time, available_slots)"""
+        if not self.expected_times:
+            return False, None, 0
+
+        existing = self.completed_count
+        if existing >= self.max_subgroups:
+            return False, None, 0
+
+        available = self.available_slots(now)
+        can_add = available > existing
+
+        next_allowed_time = None
+        if not can_add and existing < len(self.expected_times):
+            next_allowed_time = self.expected_times[existing]
+        elif available < len(self.expected_times):
+            next_allowed_time = self.expected_times[available]
+
+        return can_add, next_allowed_time, available
+
+    def slots(self, now=None):
+        """Expected schedule rows for templates"""
+        now = now or timezone.now()
+        return [
+            {
+                'subgroup_number': number,
+                'expected_time': expected_time,
+                'is_available': now >= expected_time,
+                'is_completed': self.is_completed(number),
+            }
+            for number, expected_time in enumerate(self.expected_times, 1)
+        ]
+
+
+def _frequency_settings(checklist):
+    """(frequency_hours, max_subgroups), linking the model's config to the checklist if needed"""
+    config = checklist.frequency_config
+    if not (config and config.is_active):
+        try:
+            config = SubgroupFrequencyConfig.objects.get(
+                model_name=checklist.selected_model,
+                is_active=True
+            )
+        except SubgroupFrequencyConfig.DoesNotExist:
+            return DEFAULT_FREQUENCY_HOURS, DEFAULT_MAX_SUBGROUPS
+
+        # Auto-link the config to the checklist for future use
+        if not checklist.frequency_config_id:
+            checklist.frequency_config = config
+            checklist.save(update_fields=['frequency_config'])
+
+    return config.frequency_hours, config.max_subgroups
+
+
+def build_subgroup_schedule(checklist):
+    verification_status = checklist.verification_status
+    shift = verification_status.shift if verification_status else None
+    shift_type = shift.shift_type if shift else None
+
+    frequency_hours, max_subgroups = _frequency_settings(checklist)
+
+    expected_times = ()
+    shift_start = shift_calendar.shift_start(shift_type)
+    if shift_start:
+        expected_times = tuple(
+            shift_start + timedelta(hours=frequency_hours * i)
+            for i in range(max_subgroups)
+        )
+
+    filled = set(checklist.subgroup_entries.values_list('subgroup_number', flat=True))
+    completed = tuple(number in filled for number in range(1, max_subgroups + 1))
+
+    return SubgroupSchedule(
+        checklist.id, shift_type, frequency_hours, max_subgroups,
+        expected_times, completed
+    )
+
+
+def _cache_timeout(schedule):
+    """SCHEDULE_TIMEOUT, cut short at the end of the shift so the next build picks up the next shift"""
+    if not schedule.shift_type:
+        return SCHEDULE_TIMEOUT
+    window = shift_calendar.latest_shift_window(schedule.shift_type)
+    if not window:
+        return SCHEDULE_TIMEOUT
+    return max(1, min(SCHEDULE_TIMEOUT, int((window[1] - timezone.now()).total_seconds())))
+
+
+def get_subgroup_schedule(checklist):
+    """Cached SubgroupSchedule for a checklist, built on first use"""
+    key = _cache_key(checklist.id)
+    schedule = cache.get(key)
+    if schedule is None:
+        schedule = build_subgroup_schedule(checklist)
+        cache.set(key, schedule, _cache_timeout(schedule))
+    return schedule
+
+
+def invalidate_subgroup_schedule(checklist_id):
+    cache.delete(_cache_key(checklist_id))
+
+
+def invalidate_subgroup_schedules(checklist_ids):
+    cache.delete_many([_cache_key(checklist_id) for checklist_id in checklist_ids])
+
+
+def invalidate_all_subgroup_schedules():
+    try:
+        cache.incr(CONFIG_VERSION_KEY)
+    except ValueError:
+        cache.set(CONFIG_VERSION_KEY, 1, None)
+
+
+def parameter_group_configs(model_name):
+    """{parameter_group: frequency_minutes} of the model's active ParameterGroupConfigs, cached"""
+    version = cache.get(PARAMETER_CONFIG_VERSION_KEY, 0)
+    key = f'parameter_configs:{version}:{model_name}'
+    configs = cache.get(key)
+    if configs is None:
+        configs = dict(
+            ParameterGroupConfig.objects.filter(model_name=model_name, is_active=True)
+            .order_by('display_order')
+            .values_list('parameter_group', 'frequency_minutes')
+        )
+        cache.set(key, configs, PARAMETER_CONFIG_TIMEOUT)
+    return configs
+
+
+def invalidate_parameter_group_configs():
+    try:
+        cache.incr(PARAMETER_CONFIG_VERSION_KEY)
+    except ValueError:
+        cache.set(PARAMETER_CONFIG_VERSION_KEY, 1, None)
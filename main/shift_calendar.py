@@ -0,0 +1,129 @@
+# shift_calendar.py
+"""
+Single source of truth for shift timings.
+
+Each day's shift intervals are precomputed once into a table sorted by start
+time (memoized per day), so "which shifts are running at t" and "when does
+shift X start/end" are answered with a bisect instead of chains of
+hand-ordered if/elif branches.
+"""
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+from django.utils import timezone
+
+# shift_type: (start time, duration)
+SHIFT_WINDOWS = {
+    'S1': (time(6, 30), timedelta(hours=12)),
+    'A': (time(6, 30), timedelta(hours=8, minutes=30)),
+    'G': (time(8, 30), timedelta(hours=8, minutes=30)),
+    'B': (time(15, 0), timedelta(hours=8, minutes=30)),
+    'C': (time(23, 30), timedelta(hours=7)),
+    'S2': (time(18, 30), timedelta(hours=12)),
+}
+
+# No shift is longer than a day, so shifts running on a day started on
+# that day or the day before
+_LOOKBACK_DAYS = 1
+
+ShiftInterval = namedtuple('ShiftInterval', ['start', 'end', 'shift_type'])
+
+
+def _local(value=None):
+    return timezone.localtime(value or timezone.now())
+
+
+def _window_on(shift_type, day):
+    start_time, duration = SHIFT_WINDOWS[shift_type]
+    start = timezone.make_aware(datetime.combine(day, start_time))
+    return ShiftInterval(start, start + duration, shift_type)
+
+
+@lru_cache(maxsize=64)
+def _day_table(day):
+    """
+    Sorted interval table for every shift that can be running on ``day``:
+    returns (starts, intervals) where ``starts`` is the bisect key list.
+
+    Ties on start time put the shorter shift last, so a walk backwards from
+    the bisect point sees the more specific shift (A before S1) first.
+    """
+    intervals = sorted(
+        (
+            _window_on(shift_type, day - timedelta(days=offset))
+            for offset in range(_LOOKBACK_DAYS, -1, -1)
+            for shift_type in SHIFT_WINDOWS
+        ),
+        key=lambda interval: (interval.start, -(interval.end - interval.start)),
+    )
+    return tuple(interval.start for interval in intervals), tuple(intervals)
+
+
+def shift_intervals(day):
+    """All shift intervals that start on ``day``, in start order"""
+    return [interval for interval in _day_table(day)[1] if interval.start.date() == day]
+
+
+def active_shifts(at=None):
+    """
+    Shift types running at ``at`` (default: now), most recently started
+    first. Overlapping shifts are all returned, e.g. ['G', 'A', 'S1'] at 9:00.
+    """
+    at = _local(at)
+    starts, intervals = _day_table(at.date())
+    index = bisect_right(starts, at)
+    return [
+        interval.shift_type
+        for interval in reversed(intervals[:index])
+        if interval.end > at
+    ]
+
+
+def current_shift_type(at=None):
+    """
+    The shift to assume for ``at`` (default: now): the most recently
+    started shift that is still running.
+    """
+    running = active_shifts(at)
+    return running[0] if running else None
+
+
+def shift_window(shift_type, day):
+    """(start, end) of ``shift_type`` starting on ``day``, None for unknown shifts"""
+    if shift_type not in SHIFT_WINDOWS:
+        return None
+    for interval in shift_intervals(day):
+        if interval.shift_type == shift_type:
+            return interval.start, interval.end
+    return None
+
+
+def latest_shift_window(shift_type, at=None):
+    """
+    (start, end) of the most recent ``shift_type`` that started at or before
+    ``at`` (default: now). For night shifts after midnight this is the one
+    that started the previous day.
+    """
+    if shift_type not in SHIFT_WINDOWS:
+        return None
+    at = _local(at)
+    starts, intervals = _day_table(at.date())
+    for interval in reversed(intervals[:bisect_right(starts, at)]):
+        if interval.shift_type == shift_type:
+            return interval.start, interval.end
+    return None
+
+
+def shift_start(shift_type, day=None):
+    """
+    Start of the ``shift_type`` shift worked on ``day``. For today (the
+    default) that is the latest start at or before now, otherwise the start
+    on that day. None for unknown shift types.
+    """
+    if day is None or day == _local().date():
+        window = latest_shift_window(shift_type)
+    else:
+        window = shift_window(shift_type, day)
+    return window[0] if window else None
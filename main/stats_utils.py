@@ -0,0 +1,171 @@
+# stats_utils.py
+from datetime import datetime, time, timedelta
+
+from django.db import models
+from django.db.models import Count, F, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+# Common status buckets, shared by the dashboards
+CHECK_RESULT_BUCKETS = {
+    'total': None,
+    'ok_count': Q(status='OK'),
+    'ng_count': Q(status='NG'),
+}
+
+MECHANISM_STATUS_BUCKETS = {
+    **CHECK_RESULT_BUCKETS,
+    'na_count': Q(is_not_applicable=True),
+}
+
+EP_CHECK_STATUS_BUCKETS = {
+    'total_checks': None,
+    'approved_count': Q(status='quality_approved'),
+    'rejected_count': Q(status='rejected'),
+    'pending_count': Q(status__in=['pending', 'supervisor_approved']),
+}
+
+DTPM_CHECKLIST_STATUS_BUCKETS = {
+    'total_checklists': None,
+    'verified_count': Q(status='quality_certified'),
+    'rejected_count': Q(status__in=['rejected', 'quality_rejected']),
+    'pending_count': Q(status__in=['pending', 'supervisor_approved']),
+}
+
+
+def status_breakdown(queryset, buckets, periods=None, group_by=None):
+    """
+    Count the rows of ``queryset`` falling in each status bucket with a
+    single ``aggregate(Count(filter=Q(...)))`` query.
+
+    ``buckets`` maps a bucket name to a Q filter (None counts every row).
+    ``periods`` optionally maps a period name to a Q filter (e.g. a date
+    range); the result is then ``{period: {bucket: count}}`` instead of
+    ``{bucket: count}``, still from one query. ``queryset`` must cover all
+    the periods.
+
+    With ``group_by`` the counts are computed per value of that field in one
+    grouped query and returned as ``{value: <result>}``; values without any
+    rows are simply missing.
+    """
+    period_filters = periods if periods is not None else {None: None}
+
+    aggregates = {}
+    layout = []
+    for period, period_filter in period_filters.items():
+        for bucket, bucket_filter in buckets.items():
+            conditions = [q for q in (period_filter, bucket_filter) if q is not None]
+            condition = None
+            for q in conditions:
+                condition = q if condition is None else condition & q
+
+            alias = f'bucket_{len(layout)}'
+            aggregates[alias] = Count('pk', filter=condition)
+            layout.append((period, bucket, alias))
+
+    def unpack(row):
+        if periods is None:
+            return {bucket: row[alias] or 0 for _, bucket, alias in layout}
+        result = {period: {} for period in periods}
+        for period, bucket, alias in layout:
+            result[period][bucket] = row[alias] or 0
+        return result
+
+    base = queryset.order_by()
+    if group_by is None:
+        return unpack(base.aggregate(**aggregates))
+
+    return {
+        row[group_by]: unpack(row)
+        for row in base.values(group_by).annotate(**aggregates)
+    }
+
+
+def empty_breakdown(buckets):
+    """Zero counts for every bucket, for groups with no rows"""
+    return {bucket: 0 for bucket in buckets}
+
+
+# Time series
+
+def _is_datetime_field(model, path):
+    """True when ``path`` (which may span relations) ends on a DateTimeField"""
+    field = None
+    for name in path.split(LOOKUP_SEP):
+        field = model._meta.get_field(name)
+        if field.is_relation:
+            model = field.related_model
+    return isinstance(field, models.DateTimeField)
+
+
+def series_points(start, end, step='day'):
+    """
+    Every day (or local hour) from ``start`` to ``end`` inclusive. For
+    hourly points, dates are widened to cover the whole day.
+    """
+    if step == 'hour':
+        if not isinstance(start, datetime):
+            start = timezone.make_aware(datetime.combine(start, time.min))
+        if not isinstance(end, datetime):
+            end = timezone.make_aware(datetime.combine(end, time(23)))
+        current = timezone.localtime(start).replace(minute=0, second=0, microsecond=0)
+        end = timezone.localtime(end)
+        delta = timedelta(hours=1)
+    else:
+        current = start.date() if isinstance(start, datetime) else start
+        end = end.date() if isinstance(end, datetime) else end
+        delta = timedelta(days=1)
+
+    points = []
+    while current <= end:
+        points.append(current)
+        current += delta
+    return points
+
+
+def time_series(queryset, field, start, end, buckets, step='day'):
+    """
+    Per-day (or per-hour with ``step='hour'``) status bucket counts from
+    ``start`` to ``end``, taken with one grouped TruncDate/TruncHour query
+    however long the range. Periods without rows are filled with zeros.
+
+    ``field`` is the date or datetime field to bucket on (relations allowed,
+    e.g. 'shift__date'); ``queryset`` should already be limited to the range.
+    Returns ``(points, {bucket: [count per point]})``.
+    """
+    points = series_points(start, end, step)
+
+    if step == 'hour':
+        period = TruncHour(field)
+    elif _is_datetime_field(queryset.model, field):
+        period = TruncDate(field)
+    else:
+        period = F(field)
+
+    counts = status_breakdown(
+        queryset.annotate(series_period=period), buckets, group_by='series_period'
+    )
+    if step == 'hour':
+        # Key on local wall-clock hour whatever tzinfo the database returns
+        counts = {
+            timezone.localtime(key).replace(tzinfo=None): value
+            for key, value in counts.items() if key is not None
+        }
+        lookup = [point.replace(tzinfo=None) for point in points]
+    else:
+        lookup = points
+
+    series = {
+        bucket: [counts.get(key, {}).get(bucket, 0) for key in lookup]
+        for bucket in buckets
+    }
+    return points, series
+
+
+def rate(part, total, digits=None):
+    """Percentage of ``part`` in ``total``, 0 when there is nothing to divide"""
+    if not total:
+        return 0
+    value = (part / total) * 100
+    return round(value, digits) if digits is not None else value
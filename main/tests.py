@@ -1,3 +1,866 @@
-from django.test import TestCase
+import importlib
+import io
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import date, datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+
+from .models import (
+    ChecklistBase, Checksheet, ChecksheetField, ChecksheetResponse, ChecksheetSection,
+    DailyVerificationStatus, DefectCategory, DefectType, DTPMChecklistFMA03, DTPMChecklistFMA03New,
+    DTPMCheckpoint, DTPMIssue,
+    EntryReading, ErrorPreventionCheck, ErrorPreventionMechanism, ErrorPreventionMechanismStatus,
+    FTQDailyRollup, FTQRecord, Job, OperationNumber, ParameterGroupConfig, ParameterGroupEntry,
+    ParameterGroupVerification, Shift, SubgroupCategoryTiming, SubgroupEntry,
+    SubgroupFrequencyConfig, TimeBasedDefectEntry, User,
+)
+
+
+def aware(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class ChecklistFixtureMixin:
+    """Users, a shift, its verification status and a checklist"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create_user('operator', password='x', user_type='operator')
+        cls.supervisor = User.objects.create_user('supervisor', password='x', user_type='shift_supervisor')
+        cls.quality = User.objects.create_user('quality', password='x', user_type='quality_supervisor')
+        cls.day = date(2026, 3, 2)
+        cls.shift = Shift.objects.create(
+            date=cls.day, shift_type='A', operator=cls.operator,
+            shift_supervisor=cls.supervisor, quality_supervisor=cls.quality,
+        )
+        cls.verification_status = DailyVerificationStatus.objects.create(
+            date=cls.day, shift=cls.shift, created_by=cls.operator
+        )
+        cls.checklist = cls.create_checklist()
+
+    @classmethod
+    def create_checklist(cls, verification_status=None, **fields):
+        fields = {
+            'selected_model': 'P703',
+            'line_pressure': 5.0,
+            'oring_condition': 'OK',
+            'uv_flow_input_pressure': 13.0,
+            'test_pressure_vacuum': 0.3,
+            'retainer_id_lubrication': 'OK',
+            **fields,
+        }
+        return ChecklistBase.objects.create(
+            verification_status=verification_status or cls.verification_status, **fields
+        )
+
+
+class FTQFixtureMixin(ChecklistFixtureMixin):
+    def create_record(self, shift_type='A', total_inspected=100, model_name='P703'):
+        return FTQRecord.objects.create(
+            date=self.day, shift_type=shift_type, model_name=model_name,
+            julian_date=self.day, total_inspected=total_inspected, created_by=self.operator,
+        )
+
+    def add_defect(self, record, count, name='Scratch'):
+        operation, _ = OperationNumber.objects.get_or_create(number='10', name='Assembly')
+        category, _ = DefectCategory.objects.get_or_create(name='Visual')
+        defect_type, _ = DefectType.objects.get_or_create(
+            name=name, operation_number=operation, category=category
+        )
+        return TimeBasedDefectEntry.objects.create(
+            ftq_record=record, defect_type=defect_type, count=count, recorded_at=timezone.now()
+        )
+
+
+class MediaRootMixin:
+    """Points MEDIA_ROOT at a temporary directory for the test"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class ChecksheetFixtureMixin(ChecklistFixtureMixin):
+    def setUp(self):
+        self.checksheet = Checksheet.objects.create(name='Start-up check')
+        section = ChecksheetSection.objects.create(checksheet=self.checksheet, name='Machine')
+        self.pressure = ChecksheetField.objects.create(
+            section=section, label='Air pressure', field_type='number', min_value=4, max_value=6,
+        )
+        self.guard = ChecksheetField.objects.create(
+            section=section, label='Guard fitted', field_type='ok_nok', requires_comment_if_nok=True,
+        )
+        ChecksheetField.objects.create(section=section, label='Remarks', is_required=False)
+        self.response = ChecksheetResponse.objects.create(checksheet=self.checksheet, filled_by=self.operator)
+
+
+class FTQBreakdownTests(FTQFixtureMixin, TestCase):
+    def test_calculate_ftq(self):
+        from .ftq_utils import calculate_ftq
+        self.assertEqual(calculate_ftq(200, 5), 97.5)
+        self.assertEqual(calculate_ftq(0, 0), 0)
+
+    def test_breakdown_does_not_multiply_inspected_by_defects(self):
+        from .ftq_utils import ftq_breakdown
+        record = self.create_record(total_inspected=100)
+        self.add_defect(record, 2)
+        self.add_defect(record, 3, name='Dent')
+        self.create_record(shift_type='B', total_inspected=50)
+
+        totals = ftq_breakdown(FTQRecord.objects.all())
+        self.assertEqual(totals['total_inspected'], 150)
+        self.assertEqual(totals['total_defects'], 5)
+
+        by_shift = ftq_breakdown(FTQRecord.objects.all(), 'shift_type')
+        self.assertEqual(by_shift['A']['total_inspected'], 100)
+        self.assertEqual(by_shift['A']['total_defects'], 5)
+        self.assertEqual(by_shift['B']['total_defects'], 0)
+
+
+class FTQRollupTests(FTQFixtureMixin, TestCase):
+    def test_rollup_follows_records_and_defects(self):
+        from .ftq_utils import rebuild_ftq_rollup, rollup_breakdown, rollup_defects, rollup_queryset
+        record = self.create_record(total_inspected=80)
+        defect = self.add_defect(record, 4)
+
+        rollups = rollup_queryset(self.day, self.day)
+        self.assertEqual(rollup_breakdown(rollups)['total_inspected'], 80)
+        self.assertEqual(rollup_breakdown(rollups)['total_defects'], 4)
+        self.assertEqual(rollup_defects(rollups)[0]['total_count'], 4)
+
+        defect.delete()
+        self.assertEqual(rollup_breakdown(rollup_queryset(self.day, self.day))['total_defects'], 0)
+
+        # Moving a record to another shift clears the bucket it left
+        record.shift_type = 'B'
+        record.save()
+        self.assertFalse(FTQDailyRollup.objects.filter(shift_type='A').exists())
+        self.assertEqual(rollup_breakdown(rollup_queryset(self.day, self.day, shift_type='B'))['total_inspected'], 80)
+
+        FTQDailyRollup.objects.all().delete()
+        self.assertEqual(rebuild_ftq_rollup(), 1)
+        self.assertEqual(rollup_breakdown(rollup_queryset(self.day, self.day))['record_count'], 1)
+
+
+class VerificationQueueTests(ChecklistFixtureMixin, TestCase):
+    def test_pending_queues(self):
+        from .verification_utils import (
+            pending_counts_by_group, pending_quality_entries, pending_supervisor_entries,
+        )
+        waiting = ParameterGroupEntry.objects.create(
+            checklist=self.checklist, parameter_group='uv_flow', is_completed=True
+        )
+        approved = ParameterGroupEntry.objects.create(
+            checklist=self.checklist, parameter_group='uv_vacuum', is_completed=True
+        )
+        ParameterGroupEntry.objects.create(checklist=self.checklist, parameter_group='uv_flow')
+        ParameterGroupVerification.objects.create(
+            parameter_entry=approved, verification_type='supervisor',
+            status='approved', verified_by=self.supervisor,
+        )
+
+        self.assertEqual(list(pending_supervisor_entries()), [waiting])
+        self.assertEqual(list(pending_quality_entries()), [approved])
+        self.assertEqual(pending_counts_by_group(pending_supervisor_entries()), {'uv_flow': 1})
+
+
+class ShiftCalendarTests(TestCase):
+    day = date(2026, 3, 2)
+
+    def test_overlapping_shifts(self):
+        from .shift_calendar import active_shifts, current_shift_type
+        self.assertEqual(active_shifts(aware(self.day, 9)), ['G', 'A', 'S1'])
+        self.assertEqual(current_shift_type(aware(self.day, 9)), 'G')
+        self.assertEqual(current_shift_type(aware(self.day, 2)), 'C')
+
+    def test_night_shift_window(self):
+        from .shift_calendar import latest_shift_window, shift_window
+        self.assertEqual(
+            shift_window('C', self.day),
+            (aware(self.day, 23, 30), aware(self.day + timedelta(days=1), 6, 30)),
+        )
+        # After midnight the running C shift is the one that started the day before
+        self.assertEqual(latest_shift_window('C', aware(self.day, 2))[0], aware(self.day - timedelta(days=1), 23, 30))
+        self.assertIsNone(shift_window('X', self.day))
+
+
+class ScheduleTests(ChecklistFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_schedule_cache_is_invalidated(self):
+        from .schedule_utils import get_subgroup_schedule
+        SubgroupFrequencyConfig.objects.update_or_create(
+            model_name='P703', defaults={'frequency_hours': 2, 'max_subgroups': 4}
+        )
+        schedule = get_subgroup_schedule(self.checklist)
+        self.assertEqual(schedule.max_subgroups, 4)
+        self.assertEqual(schedule.completed_count, 0)
+
+        SubgroupEntry.objects.create(checklist=self.checklist, subgroup_number=1)
+        schedule = get_subgroup_schedule(self.checklist)
+        self.assertTrue(schedule.is_completed(1))
+        self.assertEqual(schedule.completed_count, 1)
+
+        # Moving the shift to another shift type rebuilds the schedule
+        self.shift.shift_type = 'B'
+        self.shift.save()
+        self.assertEqual(get_subgroup_schedule(self.checklist).shift_type, 'B')
+
+
+class StatsTests(ChecklistFixtureMixin, TestCase):
+    def test_status_breakdown(self):
+        from django.db.models import Q
+        from .stats_utils import rate, status_breakdown
+        self.create_checklist(status='rejected')
+        self.create_checklist(status='rejected', selected_model='FD')
+        buckets = {'total': None, 'rejected': Q(status='rejected')}
+
+        self.assertEqual(status_breakdown(ChecklistBase.objects.all(), buckets), {'total': 3, 'rejected': 2})
+        by_model = status_breakdown(ChecklistBase.objects.all(), buckets, group_by='selected_model')
+        self.assertEqual(by_model['P703'], {'total': 2, 'rejected': 1})
+        self.assertEqual(by_model['FD'], {'total': 1, 'rejected': 1})
+        self.assertEqual(rate(1, 4), 25)
+        self.assertEqual(rate(1, 0), 0)
+
+    def test_series_points(self):
+        from .stats_utils import series_points
+        self.assertEqual(series_points(self.day, self.day + timedelta(days=2)), [
+            self.day, self.day + timedelta(days=1), self.day + timedelta(days=2),
+        ])
+        self.assertEqual(len(series_points(self.day, self.day, step='hour')), 24)
+
+
+class TrendTests(ChecklistFixtureMixin, TestCase):
+    def test_trend_is_grouped_by_shift_date(self):
+        from .views import calculate_trend_data
+        ChecklistBase.objects.filter(pk=self.checklist.pk).update(status='quality_approved')
+        self.create_checklist(status='quality_approved')
+        self.create_checklist(status='rejected')
+        self.create_checklist(status='pending')
+
+        trend = calculate_trend_data(self.day + timedelta(days=1))
+        self.assertEqual(len(trend['dates']), 8)
+        self.assertEqual(trend['dates'][6], self.day.isoformat())
+        self.assertEqual(trend['rates'][6], 67)
+        self.assertEqual(trend['rates'][7], 0)
+
+
+class ReportTests(ChecklistFixtureMixin, TestCase):
+    def test_period_bounds(self):
+        from .report_utils import period_bounds
+        self.assertEqual(period_bounds('week', date(2026, 3, 4)), (date(2026, 3, 2), date(2026, 3, 8)))
+        self.assertEqual(period_bounds('month', date(2026, 2, 14)), (date(2026, 2, 1), date(2026, 2, 28)))
+        with self.assertRaises(ValueError):
+            period_bounds('year', self.day)
+
+    def test_closed_period_uses_snapshot(self):
+        from .models import ReportSnapshot
+        from .report_utils import combine_payloads, period_payload
+        payload = period_payload('day', self.day)
+        self.assertEqual(payload['checklists']['total'], 1)
+        self.assertEqual(payload['checklists_by_model']['P703']['total'], 1)
+        self.assertTrue(ReportSnapshot.objects.filter(period_type='day', period_start=self.day).exists())
+
+        self.assertEqual(period_payload('day', self.day)['checklists']['total'], 1)
+
+        combined = combine_payloads([payload, payload])
+        self.assertEqual(combined['checklists']['total'], 2)
+
+    def test_changes_drop_the_covering_snapshots(self):
+        from .models import ReportSnapshot
+        from .report_utils import period_payload
+        period_payload('day', self.day)
+        period_payload('week', self.day)
+        period_payload('day', self.day + timedelta(days=1))
+
+        ChecklistBase.objects.filter(pk=self.checklist.pk).get().save()
+        self.assertEqual(
+            list(ReportSnapshot.objects.values_list('period_start', flat=True)),
+            [self.day + timedelta(days=1)],
+        )
+        self.create_checklist(status='rejected')
+        payload = period_payload('day', self.day)
+        self.assertEqual(payload['checklists']['total'], 2)
+        self.assertEqual(payload['checklists']['rejected'], 1)
+
+        ErrorPreventionCheck.objects.create(date=self.day, operator=self.operator)
+        self.assertEqual(period_payload('day', self.day)['ep_checks']['total_checks'], 1)
+
+        FTQRecord.objects.create(
+            date=self.day, model_name='P703', julian_date=self.day, total_inspected=40, created_by=self.operator
+        )
+        self.assertEqual(period_payload('day', self.day)['ftq']['total_inspected'], 40)
+
+        entry = ParameterGroupEntry.objects.create(checklist=self.checklist, parameter_group='uv_flow')
+        entry.timestamp = aware(self.day, 10)
+        entry.save()
+        self.assertEqual(period_payload('day', self.day)['parameter_entries']['total'], 1)
+
+    def test_daily_report_view(self):
+        self.client.force_login(self.operator)
+        response = self.client.get(reverse('daily_report'), {'date': self.day.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['checklists']), [self.checklist])
+        self.assertEqual(response.context['summary']['total'], 1)
+
+
+class ChecklistTemplateTests(ChecklistFixtureMixin, TestCase):
+    def test_template_is_parsed_once_and_copied(self):
+        from django.conf import settings
+        from .export_utils import CHECKLIST_TEMPLATE_PATH, render_checklist_workbook, template_cache
+        path = os.path.join(settings.STATIC_ROOT, CHECKLIST_TEMPLATE_PATH)
+        template = template_cache.get(path)
+        self.assertIs(template_cache.get(path), template)
+
+        anchor = template.anchors[template.workbook.active.title].get('B5', 'B5')
+        original = template.workbook.active[anchor].value
+        wb = render_checklist_workbook(template, self.checklist, [])
+        self.assertEqual(wb.active[anchor].value, '2026-03-02')
+        # Rendering writes to a copy, never to the cached workbook
+        self.assertEqual(template.workbook.active[anchor].value, original)
+
+
+class BulkExportTests(MediaRootMixin, ChecklistFixtureMixin, TestCase):
+    def test_queryset_filters(self):
+        from .bulk_export import checklist_export_queryset
+        night_shift = Shift.objects.create(
+            date=self.day, shift_type='C', operator=self.operator,
+            shift_supervisor=self.supervisor, quality_supervisor=self.quality,
+        )
+        night = self.create_checklist(
+            DailyVerificationStatus.objects.create(date=self.day, shift=night_shift, created_by=self.operator),
+            selected_model='FD',
+        )
+        filters = {'start_date': self.day.isoformat(), 'end_date': self.day.isoformat()}
+
+        self.assertEqual(list(checklist_export_queryset(filters)), [self.checklist, night])
+        self.assertEqual(list(checklist_export_queryset({**filters, 'model': 'FD'})), [night])
+        self.assertEqual(list(checklist_export_queryset({**filters, 'shift_type': 'A'})), [self.checklist])
+        self.assertEqual(list(checklist_export_queryset({
+            'start_date': '2026-03-03', 'end_date': '2026-03-04',
+        })), [])
+
+    def test_start_checklist_export_queues_a_job(self):
+        from .bulk_export import start_checklist_export
+        job = start_checklist_export({'start_date': '2026-03-02', 'end_date': '2026-03-02'}, self.operator)
+        self.assertEqual(job.kind, 'checklist_bulk_export')
+        self.assertEqual(job.created_by, self.operator)
+
+    def test_failed_export_removes_the_partial_archive(self):
+        from .bulk_export import job_dir, run_checklist_export, start_checklist_export
+        job = start_checklist_export({'start_date': '2026-03-02', 'end_date': '2026-03-02'}, self.operator)
+        with mock.patch('main.export_utils.template_cache.get', return_value=None), \
+                mock.patch('main.export_utils.render_checklist_workbook', side_effect=RuntimeError('render failed')):
+            with self.assertRaises(RuntimeError):
+                run_checklist_export(job)
+        self.assertEqual(os.listdir(job_dir(job.pk)), [])
+
+
+class FTQExportTests(FTQFixtureMixin, TestCase):
+    def test_streamed_export(self):
+        record = self.create_record(total_inspected=100)
+        self.add_defect(record, 5)
+        self.create_record(shift_type=None, total_inspected=10)
+        self.client.force_login(self.operator)
+
+        response = self.client.get(reverse('export_ftq_excel'), {
+            'start_date': '2026-03-01', 'end_date': '2026-03-03',
+        })
+        self.assertEqual(response.status_code, 200)
+        ws = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = {row[4]: row for row in ws.iter_rows(min_row=2, values_only=True)}
+        self.assertEqual(rows[100][1], record.get_shift_type_display())
+        self.assertEqual(rows[100][3], datetime(2026, 3, 2))
+        self.assertEqual(rows[100][5:7], (5, '95.00%'))
+        # A record without a shift is written with an empty shift cell
+        self.assertIn(rows[10][1], ('', None))
+
+
+class ReadingsExportTests(ChecklistFixtureMixin, TestCase):
+    def test_csv_export(self):
+        from .readings_utils import READING_COLUMNS
+        SubgroupEntry.objects.create(checklist=self.checklist, subgroup_number=1, uv_flow_value_1=35)
+        today = timezone.localdate().isoformat()
+        self.client.force_login(self.operator)
+
+        response = self.client.get(reverse('export_readings'), {
+            'start_date': today, 'end_date': today, 'parameter_group': 'uv_flow',
+        })
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(','), READING_COLUMNS)
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith(',35.0'))
+
+    def test_rejects_impossible_dates(self):
+        self.client.force_login(self.operator)
+        response = self.client.get(reverse('export_readings'), {'start_date': '2026-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ViewsImportTests(TestCase):
+    def test_views_import(self):
+        # Module-level errors (e.g. a missing model attribute) only show up on import
+        importlib.import_module('main.views')
+
+
+class EPExportTests(ChecklistFixtureMixin, TestCase):
+    def test_ep_workbook_reads_mechanism_descriptions(self):
+        from .export_utils import EP_EXPORT, render_workbook
+        mechanism = ErrorPreventionMechanism.objects.create(
+            mechanism_id='EP-01', description='Part presence sensor', applicable_models='P703',
+        )
+        ep_check = ErrorPreventionCheck.objects.create(
+            date=self.day, operator=self.operator, verification_status=self.verification_status
+        )
+        ErrorPreventionMechanismStatus.objects.create(
+            ep_check=ep_check, mechanism=mechanism, ep_mechanism_id='EP-01', status='OK'
+        )
+
+        ws = render_workbook(EP_EXPORT, EP_EXPORT.prefetch(ErrorPreventionCheck.objects.all())).active
+        values = [cell.value for row in ws.iter_rows() for cell in row]
+        self.assertIn('EP-01', values)
+        self.assertIn('Part presence sensor', values)
+
+
+class ExportCacheTests(MediaRootMixin, ChecklistFixtureMixin, TestCase):
+    def test_fingerprint_follows_related_rows(self):
+        from .export_cache import fingerprint
+        version = fingerprint(self.checklist, self.verification_status, self.shift)
+        self.assertEqual(version, fingerprint(self.checklist, self.verification_status, self.shift))
+
+        self.shift.quality_supervisor = self.supervisor
+        self.assertNotEqual(version, fingerprint(self.checklist, self.verification_status, self.shift))
+
+    def test_cached_response_and_etag(self):
+        from .export_cache import cached_export_response
+        renders = []
+
+        def render():
+            renders.append(1)
+            return Workbook()
+
+        request = RequestFactory().get('/export/')
+        response = cached_export_response(request, 'checklist', 1, 'v1', render, 'checklist.xlsx')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        etag = response['ETag']
+
+        response = cached_export_response(request, 'checklist', 1, 'v1', render, 'checklist.xlsx')
+        response.close()
+        self.assertEqual(len(renders), 1)
+
+        request = RequestFactory().get('/export/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached_export_response(request, 'checklist', 1, 'v1', render, 'checklist.xlsx').status_code, 304)
+        request = RequestFactory().get('/export/', HTTP_IF_NONE_MATCH=etag)
+        response = cached_export_response(request, 'checklist', 1, 'v2', render, 'checklist.xlsx')
+        response.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(renders), 2)
+
+    def test_dtpm_export_follows_issues(self):
+        checklist = DTPMChecklistFMA03.objects.create(
+            date=self.day, shift=self.shift, operator=self.operator, status='verified'
+        )
+        check = checklist.check_results.first()
+        issue = DTPMIssue.objects.create(check_result=check, description='Loose bolt', reported_by=self.operator)
+        self.client.force_login(self.operator)
+        url = reverse('export_dtpm_excel', args=[checklist.pk])
+
+        response = self.client.get(url)
+        response.close()
+        etag = response['ETag']
+
+        # Neither the issue nor the check result touches the checklist's updated_at
+        issue.priority = 'critical'
+        issue.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        response.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class JobTests(TestCase):
+    def test_claim_and_requeue(self):
+        from .job_utils import claim_jobs, enqueue, heartbeat, requeue_jobs, requeue_stale_jobs
+        with self.assertRaises(ValueError):
+            enqueue('unknown')
+        job = enqueue('report_snapshots', {'period_type': 'day'}, max_attempts=2)
+
+        self.assertEqual(claim_jobs(5), [job.pk])
+        self.assertEqual(claim_jobs(5), [])
+
+        # A long-running job is left alone while its heartbeat keeps coming
+        long_ago = timezone.now() - timedelta(hours=2)
+        Job.objects.filter(pk=job.pk).update(started_at=long_ago, heartbeat_at=long_ago)
+        heartbeat([job.pk])
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+        # Only stale jobs outside ``exclude`` are requeued
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+        self.assertEqual(requeue_stale_jobs(exclude=[job.pk]), 0)
+        self.assertEqual(requeue_stale_jobs(), 1)
+
+        self.assertEqual(claim_jobs(1), [job.pk])
+        # The second attempt was the last one: a lost worker now fails the job
+        self.assertEqual(requeue_jobs([job.pk], error='Worker process died'), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, 'Worker process died')
+
+    def test_run_job_retries_then_fails(self):
+        from .job_utils import claim_jobs, run_job
+        job = Job.objects.create(kind='missing_handler', max_attempts=2)
+        claim_jobs(1)
+        with self.assertLogs('main.job_utils', 'ERROR'):
+            self.assertFalse(run_job(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(status='running', attempts=2)
+        with self.assertLogs('main.job_utils', 'ERROR'):
+            self.assertFalse(run_job(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_run_job_records_result(self):
+        from .job_utils import claim_jobs, enqueue, run_job
+        day = timezone.localdate() - timedelta(days=3)
+        job = enqueue('report_snapshots', {
+            'period_type': 'day', 'start_date': day.isoformat(), 'end_date': day.isoformat(),
+        })
+        claim_jobs(1)
+        self.assertTrue(run_job(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+
+
+class ChangeTrackingTests(ChecklistFixtureMixin, TestCase):
+    def test_edits_are_diffed_against_the_loaded_row(self):
+        entry = SubgroupEntry.objects.create(checklist=self.checklist, subgroup_number=1, uv_flow_value_1=35)
+        entry = SubgroupEntry.objects.get(pk=entry.pk)
+        self.assertEqual(entry.tracked_changes(), [])
+
+        entry.uv_flow_value_1 = 38.0
+        entry._editing_user = self.supervisor
+        with CaptureQueriesContext(connection) as queries:
+            entry.save()
+        # The old values come from the load-time snapshot, not a SELECT
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT')])
+        self.assertEqual(entry.saved_changes, [('uv_flow_value_1', 35, 38)])
+        history = entry.edit_history.get()
+        self.assertEqual((history.field_name, history.old_value, history.new_value), ('uv_flow_value_1', '35.0', '38.0'))
+
+        # update_fields limits the recorded changes to the fields written
+        entry.uv_flow_value_1 = 39
+        entry.save(update_fields=['subgroup_number'])
+        self.assertEqual(entry.saved_changes, [])
+
+
+class HistoryRecorderTests(ChecklistFixtureMixin, TestCase):
+    def test_history_is_written_on_commit(self):
+        from .history_utils import history_recorder, track_ep_check_changes
+        from .models import ErrorPreventionCheckHistory
+        ep_check = ErrorPreventionCheck.objects.create(date=self.day, operator=self.operator)
+        updated = ErrorPreventionCheck.objects.get(pk=ep_check.pk)
+        updated.status = 'rejected'
+        updated.comments = 'Sensor loose'
+        before = ErrorPreventionCheckHistory.objects.count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with history_recorder():
+                track_ep_check_changes(ep_check, updated, self.supervisor)
+                self.assertEqual(ErrorPreventionCheckHistory.objects.count(), before)
+        self.assertEqual(ErrorPreventionCheckHistory.objects.count(), before + 2)
+
+
+class DTPMCheckResultTests(ChecklistFixtureMixin, TestCase):
+    def create_dtpm_checklist(self):
+        return DTPMChecklistFMA03New.objects.create(
+            date=self.day, shift=self.shift, operator=self.operator,
+            verification_status=self.verification_status,
+        )
+
+    def test_one_result_per_active_checkpoint(self):
+        DTPMCheckpoint.objects.create(checkpoint_number=1, title_english='Clean the fixture')
+        DTPMCheckpoint.objects.create(checkpoint_number=2, title_english='Check air leaks')
+        DTPMCheckpoint.objects.create(checkpoint_number=3, title_english='Retired', is_active=False)
+        self.assertEqual(self.create_dtpm_checklist().check_results.count(), 2)
+
+        # A checkpoint added later is picked up by the next checklist
+        DTPMCheckpoint.objects.create(checkpoint_number=4, title_english='Lubricate slides')
+        self.assertEqual(self.create_dtpm_checklist().check_results.count(), 3)
+
+
+class ChecklistSetupTests(ChecklistFixtureMixin, TestCase):
+    def test_initialize_checklist(self):
+        from .checklist_utils import initialize_checklist
+        from .models import SubgroupCategoryFrequencyConfig
+        initialize_checklist(self.checklist)
+        initialize_checklist(self.checklist)
+
+        categories = len(SubgroupCategoryFrequencyConfig.CATEGORY_CHOICES)
+        self.assertEqual(SubgroupCategoryTiming.objects.filter(checklist=self.checklist).count(), categories)
+        self.assertTrue(SubgroupFrequencyConfig.objects.filter(model_name='P703').exists())
+        self.verification_status.refresh_from_db()
+        self.assertEqual(self.verification_status.status, 'in_progress')
+
+    def test_new_checklist_invalidates_sibling_schedules(self):
+        from .schedule_utils import _cache_key, get_subgroup_schedule
+        cache.clear()
+        get_subgroup_schedule(self.checklist)
+        self.assertIsNotNone(cache.get(_cache_key(self.checklist.pk)))
+
+        # The model's config is created even when the checklist comes with one
+        other_config = SubgroupFrequencyConfig.objects.get(model_name='P703')
+        self.create_checklist(selected_model='FD', frequency_config=other_config)
+        self.assertTrue(SubgroupFrequencyConfig.objects.filter(model_name='FD').exists())
+        self.assertIsNone(cache.get(_cache_key(self.checklist.pk)))
+
+
+class WatchedFieldTests(ChecklistFixtureMixin, TestCase):
+    def test_watched_fields_are_reported_separately(self):
+        entry = ParameterGroupEntry.objects.create(
+            checklist=self.checklist, parameter_group='uv_flow', uv_flow_value_1=35
+        )
+        entry = ParameterGroupEntry.objects.get(pk=entry.pk)
+        entry.uv_flow_value_1 = 38
+        entry.save()
+        self.assertEqual(entry.saved_changes, [('uv_flow_value_1', 35, 38)])
+        self.assertEqual(entry.saved_watched_changes, set())
+
+        entry.timestamp = entry.timestamp - timedelta(hours=1)
+        entry.save(update_fields=['timestamp'])
+        self.assertEqual(entry.saved_changes, [])
+        self.assertEqual(entry.saved_watched_changes, {'timestamp'})
+
+
+class ReadingsTests(ChecklistFixtureMixin, TestCase):
+    def readings(self, entry):
+        return dict(
+            EntryReading.objects.filter(parameter_group_entry=entry)
+            .values_list('index', 'numeric_value')
+        )
+
+    def test_readings_follow_entry_saves(self):
+        entry = ParameterGroupEntry.objects.create(
+            checklist=self.checklist, parameter_group='uv_flow',
+            uv_flow_value_1=35, uv_flow_value_2=36,
+        )
+        self.assertEqual(self.readings(entry), {1: 35, 2: 36})
+
+        entry.uv_flow_value_2 = None
+        entry.uv_flow_value_3 = 37
+        entry.save()
+        self.assertEqual(self.readings(entry), {1: 35, 3: 37})
+
+        # A change copied onto every reading rewrites them all
+        other = self.create_checklist()
+        entry.checklist = other
+        entry.save()
+        self.assertEqual(
+            set(EntryReading.objects.filter(parameter_group_entry=entry).values_list('checklist_id', flat=True)),
+            {other.pk},
+        )
+
+    def test_entries_needing_approval(self):
+        from .readings_utils import entries_needing_approval
+        in_spec = ParameterGroupEntry.objects.create(
+            checklist=self.checklist, parameter_group='uv_flow', uv_flow_value_1=35
+        )
+        out_of_spec = ParameterGroupEntry.objects.create(
+            checklist=self.checklist, parameter_group='uv_flow', uv_flow_value_1=45
+        )
+        self.assertEqual(entries_needing_approval(self.checklist), {out_of_spec.pk})
+        self.assertNotIn(in_spec.pk, entries_needing_approval(self.checklist))
+
+    def test_reading_statistics(self):
+        from .readings_utils import reading_statistics
+        SubgroupEntry.objects.create(
+            checklist=self.checklist, subgroup_number=1, uv_flow_value_1=30, uv_flow_value_2=40,
+        )
+        today = timezone.localdate()
+        stats = reading_statistics(today, today)['uv_flow']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['mean'], 35)
+        self.assertEqual(stats['out_of_spec'], 0)
+
+
+class ParameterGroupConfigCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_configs_follow_config_saves(self):
+        from .schedule_utils import parameter_group_configs
+        ParameterGroupConfig.objects.create(model_name='P703', parameter_group='uv_flow', frequency_minutes=30)
+        self.assertEqual(parameter_group_configs('P703'), {'uv_flow': 30})
+
+        ParameterGroupConfig.objects.create(model_name='P703', parameter_group='uv_vacuum', frequency_minutes=60)
+        self.assertEqual(parameter_group_configs('P703'), {'uv_flow': 30, 'uv_vacuum': 60})
+
+
+class IngestTests(ChecklistFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        ParameterGroupConfig.objects.create(model_name='P703', parameter_group='uv_flow', frequency_minutes=60)
+        # Without a verification status the schedule starts when the checklist was created
+        self.unscheduled = self.create_checklist(verification_status=None)
+        ChecklistBase.objects.filter(pk=self.unscheduled.pk).update(verification_status=None)
+        self.unscheduled.refresh_from_db()
+
+    def test_resent_entries_are_not_stored_twice(self):
+        from .ingest_utils import ingest_parameter_entries
+        client_id = str(uuid.uuid4())
+        item = {
+            'parameter_group': 'uv_flow',
+            'client_id': client_id,
+            'readings': {f'uv_flow_value_{n}': 35 for n in range(1, 6)},
+        }
+
+        first = ingest_parameter_entries(self.unscheduled, [item])
+        self.assertEqual(first[0]['status'], 'created', first)
+        again = ingest_parameter_entries(self.unscheduled, [item])
+        self.assertEqual(again[0]['status'], 'duplicate')
+        self.assertEqual(again[0]['entry_id'], first[0]['entry_id'])
+        self.assertEqual(ParameterGroupEntry.objects.filter(checklist=self.unscheduled).count(), 1)
+        self.assertEqual(EntryReading.objects.filter(parameter_group_entry_id=first[0]['entry_id']).count(), 5)
+
+    def test_concurrent_resend_is_a_duplicate(self):
+        from . import ingest_utils
+        ParameterGroupConfig.objects.create(model_name='P703', parameter_group='uv_vacuum', frequency_minutes=60)
+        cache.clear()
+        client_id = uuid.uuid4()
+        items = [
+            {
+                'parameter_group': 'uv_flow',
+                'client_id': str(client_id),
+                'readings': {f'uv_flow_value_{n}': 35 for n in range(1, 6)},
+            },
+            {
+                'parameter_group': 'uv_vacuum',
+                'client_id': str(uuid.uuid4()),
+                'readings': {f'uv_vacuum_test_{n}': -40 for n in range(1, 6)},
+            },
+        ]
+        expected_fills = ingest_utils._expected_fills
+        concurrent = []
+
+        def store_concurrently(*args):
+            # The other request stores the first entry after the client id check
+            if not concurrent:
+                concurrent.append(ParameterGroupEntry.objects.create(
+                    checklist=self.unscheduled, parameter_group='uv_flow', is_completed=True, client_id=client_id
+                ))
+            return expected_fills(*args)
+
+        with mock.patch.object(ingest_utils, '_expected_fills', side_effect=store_concurrently):
+            results = ingest_utils.ingest_parameter_entries(self.unscheduled, items)
+
+        self.assertEqual([result['status'] for result in results], ['duplicate', 'created'])
+        self.assertEqual(results[0]['entry_id'], concurrent[0].pk)
+        self.assertTrue(ParameterGroupEntry.objects.filter(pk=results[1]['entry_id']).exists())
+        self.assertEqual(ParameterGroupEntry.objects.filter(checklist=self.unscheduled).count(), 2)
+
+    def test_invalid_items_are_reported(self):
+        from .ingest_utils import ingest_parameter_entries
+        results = ingest_parameter_entries(self.unscheduled, [
+            {'parameter_group': 'bin_contamination'},
+            {'parameter_group': 'uv_flow', 'client_id': 'not-a-uuid'},
+            'nonsense',
+        ])
+        self.assertEqual([result['status'] for result in results], ['error'] * 3)
+        self.assertFalse(ParameterGroupEntry.objects.filter(checklist=self.unscheduled).exists())
+
+
+class ChecksheetSchemaTests(ChecksheetFixtureMixin, TestCase):
+    def test_read_field_values_validates(self):
+        from .checksheet_utils import read_field_values, schema_cache
+        schema_cache.invalidate()
+        schema = schema_cache.get(self.checksheet.pk)
+        rows, errors = read_field_values(
+            schema, {f'field_{self.pressure.pk}': '9', f'field_{self.guard.pk}': 'NOK'}
+        )
+        self.assertEqual(len(rows), 3)
+        self.assertIn('Air pressure must be at most 6.0 ', errors)
+        self.assertIn("Comment is required for 'Guard fitted' when NOK", errors)
+
+    def test_schema_is_rebuilt_when_a_field_changes(self):
+        from .checksheet_utils import schema_cache
+        schema_cache.invalidate()
+        self.assertEqual(len(schema_cache.get(self.checksheet.pk).fields), 3)
+        self.pressure.is_active = False
+        self.pressure.save()
+        self.assertEqual(len(schema_cache.get(self.checksheet.pk).fields), 2)
+
+    def test_program_field_is_marked_explicitly(self):
+        from .checksheet_utils import read_field_values, schema_cache
+        section = self.pressure.section
+        # A label mentioning "program" no longer makes a field the selector
+        ChecksheetField.objects.create(section=section, label='Program version', is_required=False, order=1)
+        program = ChecksheetField.objects.create(
+            section=section, label='Model', field_type='dropdown', is_program_selector=True, order=2,
+        )
+        self.guard.auto_fill_based_on_model = True
+        self.guard.model_value_mapping = {'P703': 'OK'}
+        self.guard.save()
+        schema_cache.invalidate()
+        schema = schema_cache.get(self.checksheet.pk)
+        self.assertEqual(schema.program_field.id, program.pk)
+
+        rows, errors = read_field_values(schema, {f'field_{program.pk}': 'P703', f'field_{self.pressure.pk}': '5'})
+        self.assertEqual(errors, [])
+        self.assertIn((self.guard, 'OK', '', ''), rows)
+
+
+class ChecksheetResponseUpsertTests(ChecksheetFixtureMixin, TestCase):
+    def test_save_field_responses_upserts_and_counts(self):
+        from .checksheet_utils import save_field_responses
+        rows = [(self.pressure, '5', '', ''), (self.guard, 'NOK', '', 'loose')]
+        self.assertEqual(save_field_responses(self.response, rows, self.operator), 2)
+        self.assertEqual(self.response.completion_pct, 100)
+        self.assertEqual(self.response.nok_count, 1)
+
+        # Unchanged rows are not written again; changed ones update in place
+        rows[1] = (self.guard, 'OK', '', '')
+        self.assertEqual(save_field_responses(self.response, rows, self.operator), 1)
+        self.assertEqual(self.response.field_responses.count(), 2)
+        self.response.refresh_from_db()
+        self.assertEqual(self.response.nok_count, 0)
+
+
+class ChecksheetCounterTests(ChecksheetFixtureMixin, TestCase):
+    def test_refresh_counters(self):
+        self.response.field_responses.create(field=self.pressure, value='5', filled_by=self.operator)
+        self.response.field_responses.create(field=self.guard, value='NOK', filled_by=self.operator)
+        self.response.refresh_counters()
+        self.response.refresh_from_db()
+        self.assertEqual(self.response.required_total, 2)
+        self.assertEqual(self.response.completion_pct, 100)
+        self.assertEqual(self.response.get_nok_count(), 1)
+        self.assertTrue(self.response.has_nok_items())
+
+
+class WorkflowStateTests(ChecklistFixtureMixin, TestCase):
+    def test_with_workflow_state(self):
+        self.create_checklist(selected_model='FD')
+        status = DailyVerificationStatus.objects.with_workflow_state().get(pk=self.verification_status.pk)
+        self.assertTrue(status.checklist_exists)
+        self.assertFalse(status.ep_check_exists)
+        self.assertFalse(status.dtpm_checklist_exists)
+        self.assertEqual(status.checklist_model, 'FD')
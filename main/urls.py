@@ -19,6 +19,9 @@ urlpatterns = [
     path('history/supervisor/', views.supervisor_history, name='supervisor_history'),
     path('history/quality/', views.quality_history, name='quality_history'),
     path('checklist/<int:checklist_id>/export/', views.export_checklist_excel, name='export_checklist_excel'),
+    path('checklists/bulk-export/', views.bulk_export_checklists, name='bulk_export_checklists'),
+    path('checklists/bulk-export/<int:job_id>/download/', views.bulk_export_download, name='bulk_export_download'),
+    path('jobs/<int:job_id>/', views.job_status_api, name='job_status'),
     # Checklist URLs
     path('checklist/create/', views.create_checklist, name='create_checklist'),
     path('checklist/<int:checklist_id>/', views.checklist_detail, name='checklist_detail'),
@@ -93,6 +96,8 @@ path('verify-subgroup-ajax/', views.verify_subgroup_ajax, name='verify_subgroup_
     path('ftq-report/weekly/', views.ftq_report, {'report_type': 'weekly'}, name='ftq_report_weekly'),
     path('ftq-report/monthly/', views.ftq_report, {'report_type': 'monthly'}, name='ftq_report_monthly'),
     path('ftq-export/', views.export_ftq_excel, name='export_ftq_excel'),
+    path('readings-export/', views.export_readings, name='export_readings'),
+    path('readings-stats/', views.reading_stats_api, name='reading_stats_api'),
     
     # API Routes for AJAX
     path('api/defect-types/', views.get_defect_types_by_operation, name='api_defect_types'),
@@ -116,6 +121,7 @@ path('verify-subgroup-ajax/', views.verify_subgroup_ajax, name='verify_subgroup_
     # DTPM Dashboard and exports
     path('dtpm/dashboard/', views.dtpm_dashboard, name='dtpm_dashboard'),
     path('dtpm/<int:pk>/export-excel/', views.export_dtpm_excel, name='export_dtpm_excel'),
+    path('dtpm/export-excel/', views.export_dtpm_excel_batch, name='export_dtpm_excel_batch'),
 
     path('dtpm/<int:pk>/manage-images/', views.dtpm_manage_images, name='dtpm_manage_images'),
 
@@ -134,6 +140,7 @@ path('verify-subgroup-ajax/', views.verify_subgroup_ajax, name='verify_subgroup_
     path('ep-checks/<int:pk>/delete/', views.ep_check_delete, name='ep_check_delete'),
     path('ep-checks/dashboard/', views.ep_check_dashboard, name='ep_check_dashboard'),
     path('ep-checks/<int:pk>/export-excel/', views.export_ep_excel, name='export_ep_excel'),
+    path('ep-checks/export-excel/', views.export_ep_excel_batch, name='export_ep_excel_batch'),
     path('ep-mechanism-status/<int:status_id>/update/', views.ep_mechanism_status_update, name='ep_mechanism_status_update'),
     
     
@@ -185,6 +192,9 @@ path('verify-subgroup-ajax/', views.verify_subgroup_ajax, name='verify_subgroup_
     path('checklist/<int:checklist_id>/fill-parameters/', 
          views.fill_parameter_group, 
          name='fill_parameter_group'),
+    path('api/checklist/<int:checklist_id>/parameter-entries/',
+         views.ingest_parameter_entries_api,
+         name='ingest_parameter_entries_api'),
     
      path('parameter-entry/<int:entry_id>/verify/', views.verify_parameter_entry, name='verify_parameter_entry'),
 
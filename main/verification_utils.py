@@ -0,0 +1,49 @@
+# verification_utils.py
+from django.db.models import Count, Exists, OuterRef
+
+from .models import ParameterGroupEntry, ParameterGroupVerification
+
+
+def _verification_exists(verification_type, status=None):
+    """Correlated EXISTS on ParameterGroupVerification for the outer entry"""
+    verifications = ParameterGroupVerification.objects.filter(
+        parameter_entry=OuterRef('pk'),
+        verification_type=verification_type,
+    )
+    if status:
+        verifications = verifications.filter(status=status)
+    return Exists(verifications)
+
+
+def _completed_entries():
+    return ParameterGroupEntry.objects.filter(
+        is_completed=True
+    ).select_related(
+        'checklist',
+        'checklist__verification_status',
+        'checklist__verification_status__shift',
+        'checklist__verification_status__created_by',
+    ).order_by('-timestamp')
+
+
+def pending_supervisor_entries():
+    """Completed parameter entries with no supervisor verification yet"""
+    return _completed_entries().filter(
+        ~_verification_exists('supervisor')
+    )
+
+
+def pending_quality_entries():
+    """Supervisor approved parameter entries still waiting for quality"""
+    return _completed_entries().filter(
+        _verification_exists('supervisor', status='approved'),
+        ~_verification_exists('quality'),
+    )
+
+
+def pending_counts_by_group(pending_entries):
+    """{parameter_group: count} for a pending queue, in one grouped query"""
+    rows = pending_entries.order_by().values('parameter_group').annotate(
+        count=Count('id')
+    ).order_by('parameter_group')
+    return {row['parameter_group']: row['count'] for row in rows}
@@ -27,6 +27,15 @@ from django.db import transaction
 
 from django.utils import timezone
 from datetime import timedelta, datetime, time
+from . import shift_calendar
+from .export_utils import streamed_xlsx_response
+from .report_utils import approval_rate, daily_payloads, period_payload, range_payload
+from .schedule_utils import get_subgroup_schedule
+from .stats_utils import (
+    CHECK_RESULT_BUCKETS, DTPM_CHECKLIST_STATUS_BUCKETS, EP_CHECK_STATUS_BUCKETS,
+    MECHANISM_STATUS_BUCKETS, empty_breakdown, rate, status_breakdown, time_series,
+)
+from .verification_utils import pending_counts_by_group, pending_quality_entries, pending_supervisor_entries
 
 
 # Authentication Views
@@ -61,35 +70,10 @@ def user_login(request):
 
 
 # Updated utility functions for views.py
-def get_current_shift_type():
-    """Get current shift type based on time with proper priority"""
-    current_datetime = timezone.localtime(timezone.now())
-    current_hour = current_datetime.hour
-    current_minute = current_datetime.minute
-    current_time_minutes = current_hour * 60 + current_minute
-    
-    # Define shift time ranges - ORDER MATTERS!
-    # More specific shifts first, then broader ones
-    
-    if current_time_minutes >= (23 * 60 + 30) or current_time_minutes < (6 * 60 + 30):  # 11:30 PM to 6:30 AM
-        return 'C'
-    elif (18 * 60 + 30) <= current_time_minutes < (23 * 60 + 30):  # 6:30 PM to 11:30 PM
-        return 'S2'  # S2 evening portion
-    elif (15 * 60) <= current_time_minutes < (23 * 60 + 30):  # 3:00 PM to 11:30 PM
-        return 'B'
-    elif (8 * 60 + 30) <= current_time_minutes < (17 * 60):  # 8:30 AM to 5:00 PM
-        return 'G'
-    elif (6 * 60 + 30) <= current_time_minutes < (15 * 60):  # 6:30 AM to 3:00 PM
-        return 'A'
-    elif (6 * 60 + 30) <= current_time_minutes < (18 * 60 + 30):  # 6:30 AM to 6:30 PM
-        return 'S1'
-    else:  # 6:30 PM to 6:30 AM (next day)
-        return 'S2'
-    
 def get_current_shift(user):
     """Get or create the current shift based on date and time"""
     current_date = timezone.now().date()
-    shift_type = get_current_shift_type()
+    shift_type = shift_calendar.current_shift_type()
     
     # Try to find an existing shift for today and this shift type
     try:
@@ -112,52 +96,6 @@ def get_current_shift(user):
     
     return shift
 
-def get_shift_start_time(shift_type, date):
-    """Get the start time for a given shift type and date"""
-    from django.utils import timezone
-    import datetime
-    
-    # Define shift start times
-    shift_start_times = {
-        'S1': datetime.time(6, 30),   # 6:30 AM
-        'A': datetime.time(6, 30),    # 6:30 AM  
-        'G': datetime.time(8, 30),    # 8:30 AM
-        'B': datetime.time(15, 0),    # 3:00 PM
-        'C': datetime.time(23, 30),   # 11:30 PM
-        'S2': datetime.time(18, 30),  # 6:30 PM
-    }
-    
-    start_time = shift_start_times.get(shift_type)
-    if not start_time:
-        return None
-    
-    # For night shifts that cross midnight, adjust the date
-    if shift_type == 'C' and timezone.localtime(timezone.now()).time() < datetime.time(12, 0):
-        # If it's before noon and C shift, the shift started yesterday
-        date = date - datetime.timedelta(days=1)
-    
-    # Combine date and time and make it timezone aware
-    shift_start_datetime = timezone.make_aware(
-        datetime.datetime.combine(date, start_time),
-        timezone.get_current_timezone()
-    )
-    
-    return shift_start_datetime
-
-def get_expected_subgroup_times(shift_type, date_param, max_subgroups=6):
-    """Get list of expected subgroup times for a shift"""
-    shift_start = get_shift_start_time(shift_type, date_param)
-    if not shift_start:
-        return []
-    
-    expected_times = []
-    for i in range(max_subgroups):
-        expected_time = shift_start + timedelta(hours=2 * i)
-        expected_times.append(expected_time)
-    
-    return expected_times
-
-
 def check_time_gap_shift_based(checklist):
     """
     Check if operator can add a new subgroup based on shift timing and frequency config
@@ -166,102 +104,7 @@ def check_time_gap_shift_based(checklist):
     if not checklist or not checklist.verification_status or not checklist.verification_status.shift:
         return False, None, 0
     
-    current_time = timezone.localtime(timezone.now())
-    current_date = current_time.date()
-    shift_type = checklist.verification_status.shift.shift_type
-    
-    # Get frequency configuration - UPDATED
-    frequency_hours = 2  # Default fallback
-    max_subgroups = 6    # Default fallback
-    
-    if checklist.frequency_config and checklist.frequency_config.is_active:
-        frequency_hours = checklist.frequency_config.frequency_hours
-        max_subgroups = checklist.frequency_config.max_subgroups
-    else:
-        # Try to get config based on model if not linked
-        try:
-            config = SubgroupFrequencyConfig.objects.get(
-                model_name=checklist.selected_model,
-                is_active=True
-            )
-            frequency_hours = config.frequency_hours
-            max_subgroups = config.max_subgroups
-            
-            # Auto-link the config to the checklist for future use
-            if not checklist.frequency_config:
-                checklist.frequency_config = config
-                checklist.save(update_fields=['frequency_config'])
-        except SubgroupFrequencyConfig.DoesNotExist:
-            pass  # Use defaults
-    
-    # Get expected subgroup times with dynamic frequency - UPDATED
-    expected_times = get_expected_subgroup_times(shift_type, current_date, checklist)
-    
-    if not expected_times:
-        return False, None, 0
-    
-    # Get existing subgroups
-    existing_subgroups = checklist.subgroup_entries.count()
-    
-    # Check if we've reached maximum subgroups - UPDATED to use config
-    if existing_subgroups >= max_subgroups:
-        return False, None, 0
-    
-    # Find how many subgroups the operator should be able to add based on current time
-    available_slots = 0
-    next_allowed_time = None
-    
-    for i, expected_time in enumerate(expected_times):
-        if current_time >= expected_time:
-            available_slots = i + 1
-        else:
-            if next_allowed_time is None:
-                next_allowed_time = expected_time
-            break
-    
-    # Operator can add subgroups if they have available slots
-    can_add = available_slots > existing_subgroups
-    
-    # If they can't add now, find the next time they can - UPDATED
-    if not can_add and existing_subgroups < max_subgroups:
-        if existing_subgroups < len(expected_times):
-            next_allowed_time = expected_times[existing_subgroups]
-    
-    return can_add, next_allowed_time, available_slots
-
-
-def get_expected_subgroup_times(shift_type, date_param, checklist=None):
-    """Get list of expected subgroup times for a shift based on frequency config"""
-    shift_start = get_shift_start_time(shift_type, date_param)
-    if not shift_start:
-        return []
-    
-    # Get frequency configuration - UPDATED
-    frequency_hours = 2  # Default
-    max_subgroups = 6    # Default
-    
-    if checklist:
-        if checklist.frequency_config and checklist.frequency_config.is_active:
-            frequency_hours = checklist.frequency_config.frequency_hours
-            max_subgroups = checklist.frequency_config.max_subgroups
-        else:
-            # Try to get config based on model
-            try:
-                config = SubgroupFrequencyConfig.objects.get(
-                    model_name=checklist.selected_model,
-                    is_active=True
-                )
-                frequency_hours = config.frequency_hours
-                max_subgroups = config.max_subgroups
-            except SubgroupFrequencyConfig.DoesNotExist:
-                pass
-    
-    expected_times = []
-    for i in range(max_subgroups):
-        expected_time = shift_start + timedelta(hours=frequency_hours * i)
-        expected_times.append(expected_time)
-    
-    return expected_times
+    return get_subgroup_schedule(checklist).check_time_gap()
 
 
 # Keep this for backward compatibility, but it's deprecated
@@ -356,27 +199,17 @@ def operator_dashboard(request):
     if active_verification:
         active_checklist = ChecklistBase.objects.filter(
             verification_status=active_verification
-        ).select_related('frequency_config').prefetch_related('subgroup_entries').first()
+        ).select_related('frequency_config').first()
 
-
-    # Get frequency configuration
+    # Cached subgroup schedule (expected times, filled slots, frequency config)
+    subgroup_schedule = None
     frequency_hours = 2  # Default
     max_subgroups = 6    # Default
     
     if active_checklist:
-        if active_checklist.frequency_config and active_checklist.frequency_config.is_active:
-            frequency_hours = active_checklist.frequency_config.frequency_hours
-            max_subgroups = active_checklist.frequency_config.max_subgroups
-        else:
-            try:
-                config = SubgroupFrequencyConfig.objects.get(
-                    model_name=active_checklist.selected_model,
-                    is_active=True
-                )
-                frequency_hours = config.frequency_hours
-                max_subgroups = config.max_subgroups
-            except SubgroupFrequencyConfig.DoesNotExist:
-                pass
+        subgroup_schedule = get_subgroup_schedule(active_checklist)
+        frequency_hours = subgroup_schedule.frequency_hours
+        max_subgroups = subgroup_schedule.max_subgroups
 
     # Calculate next subgroup time
     next_subgroup_time = None
@@ -387,7 +220,7 @@ def operator_dashboard(request):
     expected_schedule = []
     
     if active_checklist:
-        can_add_subgroup, next_allowed_time, available_slots = check_time_gap_shift_based(active_checklist)
+        can_add_subgroup, next_allowed_time, available_slots = subgroup_schedule.check_time_gap(current_datetime)
         
         if next_allowed_time and not can_add_subgroup:
             next_subgroup_time = next_allowed_time
@@ -406,18 +239,7 @@ def operator_dashboard(request):
                 time_remaining_formatted = " ".join(time_parts)
         
         if active_verification and active_verification.shift:
-            expected_times = get_expected_subgroup_times(
-                active_verification.shift.shift_type, 
-                current_date,
-                active_checklist
-            )
-            for i, expected_time in enumerate(expected_times, 1):
-                expected_schedule.append({
-                    'subgroup_number': i,
-                    'expected_time': expected_time,
-                    'is_available': current_datetime >= expected_time,
-                    'is_completed': active_checklist.subgroup_entries.filter(subgroup_number=i).exists()
-                })
+            expected_schedule = subgroup_schedule.slots(current_datetime)
 
     # ============ CHECKSHEET INTEGRATION ============
     
@@ -479,7 +301,7 @@ def operator_dashboard(request):
         'checklist_exists': bool(active_checklist),
         'checklist_status': active_checklist.status if active_checklist else 'None',
         'checklist_shift': active_checklist.shift if active_checklist else 'None',
-        'subgroup_count': active_checklist.subgroup_entries.count() if active_checklist else 0,
+        'subgroup_count': subgroup_schedule.completed_count if subgroup_schedule else 0,
         'user': request.user.username,
         'current_date': current_date,
         'can_add_subgroup': can_add_subgroup,
@@ -491,17 +313,12 @@ def operator_dashboard(request):
     }
     
     if active_checklist and active_verification and active_verification.shift:
-        expected_times = get_expected_subgroup_times(
-            active_verification.shift.shift_type, 
-            current_date,
-            active_checklist
-        )
         debug_info['expected_subgroup_times'] = [
-            t.strftime('%H:%M') for t in expected_times
+            timezone.localtime(t).strftime('%H:%M') for t in subgroup_schedule.expected_times
         ]
     
     # Current shift determination
-    current_shift_type = get_current_shift_type()
+    current_shift_type = shift_calendar.current_shift_type()
     SHIFT_CHOICES = [
         ('S1', 'S1 - 6:30 AM to 6:30 PM'),
         ('A', 'A - 6:30 AM to 3:00 PM'),
@@ -568,11 +385,11 @@ def operator_dashboard(request):
     }
     
     if today_ep_check:
-        mechanism_statuses = today_ep_check.mechanism_statuses.all()
-        ep_check_stats['total_mechanisms'] = mechanism_statuses.count()
-        ep_check_stats['ok_count'] = mechanism_statuses.filter(status='OK').count()
-        ep_check_stats['ng_count'] = mechanism_statuses.filter(status='NG').count()
-        ep_check_stats['na_count'] = mechanism_statuses.filter(is_not_applicable=True).count()
+        counts = status_breakdown(today_ep_check.mechanism_statuses.all(), MECHANISM_STATUS_BUCKETS)
+        ep_check_stats['total_mechanisms'] = counts['total']
+        ep_check_stats['ok_count'] = counts['ok_count']
+        ep_check_stats['ng_count'] = counts['ng_count']
+        ep_check_stats['na_count'] = counts['na_count']
         ep_check_stats['current_model'] = today_ep_check.current_model
         ep_check_stats['shift'] = today_ep_check.shift
     
@@ -600,10 +417,10 @@ def operator_dashboard(request):
     }
     
     if today_dtpm_checklist:
-        checkpoint_results = today_dtpm_checklist.check_results.all()
-        dtpm_checklist_stats['total_checkpoints'] = checkpoint_results.count()
-        dtpm_checklist_stats['ok_count'] = checkpoint_results.filter(status='OK').count()
-        dtpm_checklist_stats['ng_count'] = checkpoint_results.filter(status='NG').count()
+        counts = status_breakdown(today_dtpm_checklist.check_results.all(), CHECK_RESULT_BUCKETS)
+        dtpm_checklist_stats['total_checkpoints'] = counts['total']
+        dtpm_checklist_stats['ok_count'] = counts['ok_count']
+        dtpm_checklist_stats['ng_count'] = counts['ng_count']
         dtpm_checklist_stats['current_model'] = today_dtpm_checklist.current_model
         dtpm_checklist_stats['shift'] = today_dtpm_checklist.checklist_shift
     
@@ -628,29 +445,10 @@ def operator_dashboard(request):
     }
 
     if active_checklist:
-        # Define shift start times
-        SHIFT_START_TIMES = {
-            'A': time(6, 30),
-            'B': time(14, 30),
-            'C': time(22, 30),
-            'S1': time(6, 30),
-            'S2': time(18, 30),
-            'S3': time(22, 30),
-        }
-        
         shift_type = active_verification.shift.shift_type if active_verification and active_verification.shift else None
         
-        if shift_type and shift_type in SHIFT_START_TIMES:
-            shift_start_time = SHIFT_START_TIMES[shift_type]
-            shift_start = timezone.make_aware(
-                datetime.combine(current_date, shift_start_time)
-            )
-            
-            # For night shifts - if current time is before shift start, shift started yesterday
-            if shift_start > current_datetime:
-                shift_start = shift_start - timedelta(days=1)
-        else:
-            shift_start = active_checklist.created_at
+        # Latest start of this shift (yesterday's for night shifts after midnight)
+        shift_start = shift_calendar.shift_start(shift_type) or active_checklist.created_at
         
         # Get parameter configurations for this model
         parameter_configs = ParameterGroupConfig.objects.filter(
@@ -732,7 +530,7 @@ def operator_dashboard(request):
         'debug_info': debug_info,
         'frequency_hours': frequency_hours,
         'max_subgroups': max_subgroups,
-        'current_subgroup_count': active_checklist.subgroup_entries.count() if active_checklist else 0,
+        'current_subgroup_count': subgroup_schedule.completed_count if subgroup_schedule else 0,
         
         # Checksheet context
         'active_checksheets': active_checksheets,
@@ -820,7 +618,7 @@ def create_checklist(request):
     """
     current_datetime = timezone.now()
     current_date = current_datetime.date()
-    suggested_shift_type = get_current_shift_type()
+    suggested_shift_type = shift_calendar.current_shift_type()
 
     # Prevent creating a new checklist if one is already in progress for the day
     existing_verification = DailyVerificationStatus.objects.filter(
@@ -998,34 +796,13 @@ def fill_parameter_group(request, checklist_id):
     shift = checklist.verification_status.shift
     shift_type = shift.shift_type if shift else None
     
-    # Define shift start times (adjust these according to your actual shift timings)
-    SHIFT_START_TIMES = {
-        'A': time(6, 30),    # 6:30 AM
-        'B': time(14, 30),   # 2:30 PM  
-        'C': time(22, 30),   # 10:30 PM
-        'S1': time(6, 30),   # 6:30 AM to 6:30 PM
-        'S2': time(18, 30),  # 6:30 PM to 6:30 AM (next day)
-        'S3': time(22, 30),  # 10:30 PM to 10:30 AM (next day)
-    }
-    
     # Get current time
     now = timezone.now()
-    today = now.date()
     
-    # Determine shift start time
-    if shift_type and shift_type in SHIFT_START_TIMES:
-        shift_start_time = SHIFT_START_TIMES[shift_type]
-        
-        # Create datetime for today with shift start time
-        shift_start = timezone.make_aware(
-            datetime.combine(today, shift_start_time)
-        )
-        
-        # For night shifts (S2, C, etc.) - if current time is before shift start,
-        # the shift actually started yesterday
-        if shift_start > now:
-            shift_start = shift_start - timedelta(days=1)
-    else:
+    # Latest start of this shift - for night shifts (S2, C) after midnight
+    # the shift actually started yesterday
+    shift_start = shift_calendar.shift_start(shift_type)
+    if shift_start is None:
         # Fallback: use checklist creation time if shift type unknown
         shift_start = checklist.created_at
         messages.warning(request, f'Unknown shift type: {shift_type}. Using checklist creation time.')
@@ -1163,6 +940,42 @@ def fill_parameter_group(request, checklist_id):
     }
     
     return render(request, 'subgroup/fill_parameter_multiple.html', context)
+
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'operator')
+@require_POST
+def ingest_parameter_entries_api(request, checklist_id):
+    """
+    Batch version of fill_parameter_group for the tablets: a JSON body of
+    {"entries": [{"parameter_group", "readings": {field: value}, "recorded_at", "client_id"}]}
+    is validated and inserted in one transaction, with a result per entry
+    """
+    from .ingest_utils import MAX_BATCH_ENTRIES, ingest_parameter_entries
+
+    checklist = get_object_or_404(
+        ChecklistBase.objects.select_related('verification_status__shift'), id=checklist_id
+    )
+    if not checklist.verification_status or checklist.verification_status.created_by_id != request.user.id:
+        return JsonResponse({'status': 'error', 'message': 'You do not have permission to modify this checklist'}, status=403)
+    if checklist.status != 'pending':
+        return JsonResponse({'status': 'error', 'message': 'Cannot add entries to a verified checklist'}, status=400)
+
+    try:
+        entries = json.loads(request.body).get('entries')
+    except (ValueError, AttributeError):
+        entries = None
+    if not isinstance(entries, list) or not entries:
+        return JsonResponse({'status': 'error', 'message': 'Body must be a JSON object with a non-empty "entries" list'}, status=400)
+    if len(entries) > MAX_BATCH_ENTRIES:
+        return JsonResponse({'status': 'error', 'message': f'At most {MAX_BATCH_ENTRIES} entries per batch'}, status=400)
+
+    results = ingest_parameter_entries(checklist, entries)
+    return JsonResponse({
+        'status': 'success',
+        'created': sum(1 for result in results if result['status'] == 'created'),
+        'results': results,
+    })
  
  
  
@@ -1220,12 +1033,7 @@ def add_subgroup(request, checklist_id):
         timing_info = f'You can add {slots_available} more subgroup(s) based on shift timing'
         
         if checklist.verification_status and checklist.verification_status.shift:
-            current_date = timezone.localtime(timezone.now()).date()
-            expected_times = get_expected_subgroup_times(
-                checklist.verification_status.shift.shift_type, 
-                current_date,
-                checklist
-            )
+            expected_times = get_subgroup_schedule(checklist).expected_times
             time_schedule = []
             for i, expected_time in enumerate(expected_times[:max_subgroups], 1):
                 time_schedule.append(f"Subgroup {i}: {timezone.localtime(expected_time).strftime('%H:%M')}")
@@ -1413,19 +1221,14 @@ def add_subgroup(request, checklist_id):
             messages.info(request, timing_info)
             
         if checklist.verification_status and checklist.verification_status.shift:
-            current_date = timezone.localtime(timezone.now()).date()
-            expected_times = get_expected_subgroup_times(
-                checklist.verification_status.shift.shift_type, 
-                current_date,
-                checklist
-            )
+            subgroup_schedule = get_subgroup_schedule(checklist)
             schedule_info = []
             current_time = timezone.localtime(timezone.now())
             
-            for i, expected_time in enumerate(expected_times[:max_subgroups], 1):
+            for i, expected_time in enumerate(subgroup_schedule.expected_times[:max_subgroups], 1):
                 time_str = timezone.localtime(expected_time).strftime('%H:%M')
                 status = ""
-                if checklist.subgroup_entries.filter(subgroup_number=i).exists():
+                if subgroup_schedule.is_completed(i):
                     status = " ✓"
                 elif current_time >= expected_time:
                     status = " (available)"
@@ -1711,27 +1514,7 @@ def supervisor_dashboard(request):
     current_date = current_datetime.date()
     current_time = current_datetime.time()
     
-    # Updated shift determination to match your new shift system
-    def get_current_shift_type():
-        current_hour = current_datetime.hour
-        current_minute = current_datetime.minute
-        current_time_minutes = current_hour * 60 + current_minute
-        
-        if (6 * 60 + 30) <= current_time_minutes < (15 * 60):  # 6:30 AM to 3:00 PM
-            return 'A'
-        elif (8 * 60 + 30) <= current_time_minutes < (17 * 60):  # 8:30 AM to 5:00 PM
-            return 'G'
-        elif (15 * 60) <= current_time_minutes < (23 * 60 + 30):  # 3:00 PM to 11:30 PM
-            return 'B'
-        elif current_time_minutes >= (23 * 60 + 30) or current_time_minutes < (6 * 60 + 30):  # 11:30 PM to 6:30 AM
-            return 'C'
-        else:
-            if 6 <= current_hour < 18:  # 6 AM to 6 PM
-                return 'S1'
-            else:  # 6 PM to 6 AM
-                return 'S2'
-    
-    current_shift_type = get_current_shift_type()
+    current_shift_type = shift_calendar.current_shift_type(current_datetime)
     
     # Get shift choices for display
     SHIFT_CHOICES = [
@@ -1748,33 +1531,13 @@ def supervisor_dashboard(request):
     # PARAMETER GROUP VERIFICATIONS - Pending
     # ============================================================================
     
-    # Get all completed parameter entries
-    all_completed_entries = ParameterGroupEntry.objects.filter(
-        is_completed=True
-    ).select_related(
-        'checklist',
-        'checklist__verification_status',
-        'checklist__verification_status__shift'
-    ).prefetch_related('verifications').order_by('-timestamp')
-    
-    # Filter to get only those without supervisor verification
-    pending_parameter_entries = []
-    for entry in all_completed_entries[:50]:  # Check last 50 entries
-        # Check if entry has supervisor verification
-        has_supervisor_verification = entry.verifications.filter(
-            verification_type='supervisor'
-        ).exists()
-        
-        if not has_supervisor_verification:
-            pending_parameter_entries.append(entry)
-            
-        if len(pending_parameter_entries) >= 20:  # Limit to 20
-            break
+    # Completed entries without a supervisor verification (whole queue, one query)
+    pending_parameter_queue = pending_supervisor_entries()
+    pending_by_group = pending_counts_by_group(pending_parameter_queue)
+    parameter_pending_count = sum(pending_by_group.values())
     
-    # Count pending by parameter group
-    pending_by_group = defaultdict(int)
-    for entry in pending_parameter_entries:
-        pending_by_group[entry.parameter_group] += 1
+    # Show the 20 most recent
+    pending_parameter_entries = list(pending_parameter_queue[:20])
     
     # ============================================================================
     # PARAMETER GROUP VERIFICATIONS - Recent
@@ -1835,7 +1598,7 @@ def supervisor_dashboard(request):
     # ============================================================================
     
     total_pending_verifications = (
-        len(pending_parameter_entries) + 
+        parameter_pending_count + 
         pending_checksheet_responses.count()
     )
     
@@ -1882,10 +1645,10 @@ def supervisor_dashboard(request):
     }
     
     if today_dtpm_checklist:
-        checkpoint_results = today_dtpm_checklist.check_results.all()
-        dtpm_checklist_stats['total_checkpoints'] = checkpoint_results.count()
-        dtpm_checklist_stats['ok_count'] = checkpoint_results.filter(status='OK').count()
-        dtpm_checklist_stats['ng_count'] = checkpoint_results.filter(status='NG').count()
+        counts = status_breakdown(today_dtpm_checklist.check_results.all(), CHECK_RESULT_BUCKETS)
+        dtpm_checklist_stats['total_checkpoints'] = counts['total']
+        dtpm_checklist_stats['ok_count'] = counts['ok_count']
+        dtpm_checklist_stats['ng_count'] = counts['ng_count']
         dtpm_checklist_stats['current_model'] = today_dtpm_checklist.current_model
         dtpm_checklist_stats['shift'] = today_dtpm_checklist.checklist_shift
     
@@ -1911,11 +1674,11 @@ def supervisor_dashboard(request):
     }
     
     if today_ep_check:
-        mechanism_statuses = today_ep_check.mechanism_statuses.all()
-        ep_check_stats['total_mechanisms'] = mechanism_statuses.count()
-        ep_check_stats['ok_count'] = mechanism_statuses.filter(status='OK').count()
-        ep_check_stats['ng_count'] = mechanism_statuses.filter(status='NG').count()
-        ep_check_stats['na_count'] = mechanism_statuses.filter(is_not_applicable=True).count()
+        counts = status_breakdown(today_ep_check.mechanism_statuses.all(), MECHANISM_STATUS_BUCKETS)
+        ep_check_stats['total_mechanisms'] = counts['total']
+        ep_check_stats['ok_count'] = counts['ok_count']
+        ep_check_stats['ng_count'] = counts['ng_count']
+        ep_check_stats['na_count'] = counts['na_count']
         ep_check_stats['current_model'] = today_ep_check.current_model
         ep_check_stats['shift'] = today_ep_check.shift
     
@@ -1928,12 +1691,14 @@ def supervisor_dashboard(request):
     ).order_by('-date', '-created_at')[:10]
     
     # Workflow completion summary for today
-    today_workflows = DailyVerificationStatus.objects.filter(
-        date=current_date
-    ).select_related('shift')
+    today_workflows = list(
+        DailyVerificationStatus.objects.filter(
+            date=current_date
+        ).select_related('shift').with_workflow_state()
+    )
     
     workflow_summary = {
-        'total_workflows': today_workflows.count(),
+        'total_workflows': len(today_workflows),
         'completed_workflows': 0,
         'pending_workflows': 0,
         'models_in_use': set(),
@@ -1963,7 +1728,7 @@ def supervisor_dashboard(request):
         
         # Parameter Group Verifications
         'pending_parameter_entries': pending_parameter_entries,
-        'pending_by_group': dict(pending_by_group),
+        'pending_by_group': pending_by_group,
         'recent_parameter_verifications': recent_parameter_verifications,
         'parameter_verified_today': parameter_verified_today,
         
@@ -1976,7 +1741,7 @@ def supervisor_dashboard(request):
         'verification_summary': {
             'pending_count': total_pending_verifications,
             'verified_today': total_verified_today,
-            'parameter_pending': len(pending_parameter_entries),
+            'parameter_pending': parameter_pending_count,
             'checksheet_pending': pending_checksheet_responses.count(),
         },
         
@@ -2080,27 +1845,22 @@ def calculate_model_stats(entries):
 
 def calculate_trend_data(current_date):
     """Calculate 7-day trend data"""
-    trend_dates = []
-    trend_rates = []
-    
-    for i in range(7, -1, -1):
-        date = current_date - timedelta(days=i)
-        entries = ChecklistBase.objects.filter(
-            shift__date=date,
-            status__in=['quality_approved', 'rejected']
-        )
-        total = entries.count()
-        if total > 0:
-            approved = entries.filter(status='quality_approved').count()
-            rate = round((approved / total) * 100)
-        else:
-            rate = 0
-        trend_dates.append(date.strftime('%Y-%m-%d'))
-        trend_rates.append(rate)
+    start_date = current_date - timedelta(days=7)
+    entries = ChecklistBase.objects.filter(
+        verification_status__shift__date__range=[start_date, current_date],
+        status__in=['quality_approved', 'rejected']
+    )
+    dates, series = time_series(
+        entries, 'verification_status__shift__date', start_date, current_date,
+        {'total': None, 'approved': Q(status='quality_approved')}
+    )
     
     return {
-        'dates': trend_dates,
-        'rates': trend_rates
+        'dates': [date.strftime('%Y-%m-%d') for date in dates],
+        'rates': [
+            round(rate(approved, total))
+            for approved, total in zip(series['approved'], series['total'])
+        ]
     }
 
 def calculate_average_verification_time(verifications):
@@ -2123,11 +1883,11 @@ def calculate_average_verification_time(verifications):
 
 def calculate_quality_stats(entries):
     """Calculate quality statistics"""
-    stats = {
-        'approved': entries.filter(status='quality_approved').count(),
-        'rejected': entries.filter(status='rejected').count(),
-        'pending': entries.filter(status__in=['pending', 'supervisor_approved']).count()
-    }
+    stats = status_breakdown(entries, {
+        'approved': Q(status='quality_approved'),
+        'rejected': Q(status='rejected'),
+        'pending': Q(status__in=['pending', 'supervisor_approved']),
+    })
     
     total_processed = stats['approved'] + stats['rejected']
     stats['approval_rate'] = round((stats['approved'] / total_processed * 100) if total_processed > 0 else 0)
@@ -2281,27 +2041,7 @@ def quality_dashboard(request):
     current_date = current_datetime.date()
     current_time = current_datetime.time()
     
-    # Updated shift determination
-    def get_current_shift_type():
-        current_hour = current_datetime.hour
-        current_minute = current_datetime.minute
-        current_time_minutes = current_hour * 60 + current_minute
-        
-        if (6 * 60 + 30) <= current_time_minutes < (15 * 60):
-            return 'A'
-        elif (8 * 60 + 30) <= current_time_minutes < (17 * 60):
-            return 'G'
-        elif (15 * 60) <= current_time_minutes < (23 * 60 + 30):
-            return 'B'
-        elif current_time_minutes >= (23 * 60 + 30) or current_time_minutes < (6 * 60 + 30):
-            return 'C'
-        else:
-            if 6 <= current_hour < 18:
-                return 'S1'
-            else:
-                return 'S2'
-    
-    current_shift_type = get_current_shift_type()
+    current_shift_type = shift_calendar.current_shift_type(current_datetime)
     
     SHIFT_CHOICES = [
         ('S1', 'S1 - 6:30 AM to 6:30 PM'),
@@ -2317,42 +2057,16 @@ def quality_dashboard(request):
     # PARAMETER GROUP VERIFICATIONS - Pending Quality Approval
     # ============================================================================
     
-    # Get all completed parameter entries from last 7 days
-    all_completed_entries = ParameterGroupEntry.objects.filter(
-        is_completed=True,
+    # Entries from the last 7 days with supervisor approval but no quality verification
+    pending_parameter_queue = pending_quality_entries().filter(
         timestamp__date__gte=current_date - timedelta(days=7),
         timestamp__date__lte=current_date
-    ).select_related(
-        'checklist',
-        'checklist__verification_status',
-        'checklist__verification_status__shift'
-    ).prefetch_related('verifications').order_by('-timestamp')
-    
-    # Filter to get entries that have supervisor approval but not quality approval
-    pending_parameter_entries = []
-    for entry in all_completed_entries[:100]:  # Check last 100 entries
-        # Check if entry has supervisor verification
-        has_supervisor_verification = entry.verifications.filter(
-            verification_type='supervisor',
-            status='approved'
-        ).exists()
-        
-        # Check if entry has quality verification
-        has_quality_verification = entry.verifications.filter(
-            verification_type='quality'
-        ).exists()
-        
-        # Include if supervisor approved but quality not yet done
-        if has_supervisor_verification and not has_quality_verification:
-            pending_parameter_entries.append(entry)
-            
-        if len(pending_parameter_entries) >= 20:  # Limit to 20
-            break
+    )
+    pending_by_group = pending_counts_by_group(pending_parameter_queue)
+    parameter_pending_count = sum(pending_by_group.values())
     
-    # Count pending by parameter group
-    pending_by_group = defaultdict(int)
-    for entry in pending_parameter_entries:
-        pending_by_group[entry.parameter_group] += 1
+    # Show the 20 most recent
+    pending_parameter_entries = list(pending_parameter_queue[:20])
     
     # ============================================================================
     # PARAMETER GROUP VERIFICATIONS - Recent Quality Verifications
@@ -2436,7 +2150,7 @@ def quality_dashboard(request):
     # ============================================================================
     
     total_pending_verifications = (
-        len(pending_parameter_entries) + 
+        parameter_pending_count + 
         pending_checksheet_responses.count()
     )
     
@@ -2481,10 +2195,11 @@ def quality_dashboard(request):
                 ep_check=today_ep_check
             )
             
+            counts = status_breakdown(mechanism_statuses, MECHANISM_STATUS_BUCKETS)
             ep_check_stats = {
-                'ok_count': mechanism_statuses.filter(status='OK').count(),
-                'ng_count': mechanism_statuses.filter(status='NG').count(),
-                'na_count': mechanism_statuses.filter(is_not_applicable=True).count(),
+                'ok_count': counts['ok_count'],
+                'ng_count': counts['ng_count'],
+                'na_count': counts['na_count'],
             }
         
         recent_ep_checks = ErrorPreventionCheck.objects.filter(
@@ -2509,10 +2224,11 @@ def quality_dashboard(request):
                 checklist=today_dtpm_checklist
             )
             
+            counts = status_breakdown(checkpoint_results, CHECK_RESULT_BUCKETS)
             dtpm_checklist_stats = {
-                'ok_count': checkpoint_results.filter(status='OK').count(),
-                'ng_count': checkpoint_results.filter(status='NG').count(),
-                'total_checkpoints': checkpoint_results.count(),
+                'ok_count': counts['ok_count'],
+                'ng_count': counts['ng_count'],
+                'total_checkpoints': counts['total'],
             }
         
         recent_dtpm_checklists = DTPMChecklistFMA03New.objects.filter(
@@ -2530,7 +2246,7 @@ def quality_dashboard(request):
         
         # Parameter Group Verifications
         'pending_parameter_entries': pending_parameter_entries,
-        'pending_by_group': dict(pending_by_group),
+        'pending_by_group': pending_by_group,
         'recent_parameter_verifications': recent_parameter_verifications,
         'parameter_approved_today': parameter_approved_today,
         'parameter_rejected_today': parameter_rejected_today,
@@ -2546,7 +2262,7 @@ def quality_dashboard(request):
             'pending_count': total_pending_verifications,
             'approved_today': total_approved_today,
             'rejected_today': total_rejected_today,
-            'parameter_pending': len(pending_parameter_entries),
+            'parameter_pending': parameter_pending_count,
             'checksheet_pending': pending_checksheet_responses.count(),
         },
         'verification_summary': {  # For template compatibility
@@ -2575,37 +2291,27 @@ def quality_dashboard(request):
 
 @login_required
 def reports_dashboard(request):
-    current_date = timezone.now().date()
+    current_date = timezone.localdate()
     start_of_week = current_date - timedelta(days=current_date.weekday())
     start_of_month = current_date.replace(day=1)
 
-    # Get statistics
-    daily_stats = ChecklistBase.objects.filter(
-        shift__date=current_date
-    ).aggregate(
-        total=Count('id'),
-        approved=Count('id', filter=Q(status='quality_approved')),
-        rejected=Count('id', filter=Q(status='rejected')),
-        pending=Count('id', filter=Q(status='pending'))
-    )
+    # Closed days come from report snapshots, only today is computed live
+    daily_payload = period_payload('day', current_date)
+    weekly_payload = range_payload(start_of_week, current_date)
+    monthly_payload = range_payload(start_of_month, current_date)
 
-    weekly_stats = ChecklistBase.objects.filter(
-        shift__date__gte=start_of_week,
-        shift__date__lte=current_date
-    ).aggregate(
-        total=Count('id'),
-        approved=Count('id', filter=Q(status='quality_approved')),
-        rejected=Count('id', filter=Q(status='rejected'))
-    )
+    def checklist_stats(payload):
+        checklists = payload.get('checklists', {})
+        return {
+            'total': checklists.get('total', 0),
+            'approved': checklists.get('quality_approved', 0),
+            'rejected': checklists.get('rejected', 0),
+            'pending': checklists.get('pending', 0),
+        }
 
-    monthly_stats = ChecklistBase.objects.filter(
-        shift__date__gte=start_of_month,
-        shift__date__lte=current_date
-    ).aggregate(
-        total=Count('id'),
-        approved=Count('id', filter=Q(status='quality_approved')),
-        rejected=Count('id', filter=Q(status='rejected'))
-    )
+    daily_stats = checklist_stats(daily_payload)
+    weekly_stats = checklist_stats(weekly_payload)
+    monthly_stats = checklist_stats(monthly_payload)
 
     # Get model-wise statistics
     model_stats = ChecklistBase.objects.values('selected_model').annotate(
@@ -2616,11 +2322,7 @@ def reports_dashboard(request):
 
     # Calculate approval rates
     for stats in [daily_stats, weekly_stats, monthly_stats]:
-        total_verified = stats['approved'] + stats['rejected']
-        stats['approval_rate'] = (
-            round((stats['approved'] / total_verified) * 100)
-            if total_verified > 0 else 0
-        )
+        stats['approval_rate'] = approval_rate(stats)
 
     # Get recent activity
     recent_activity = ChecklistBase.objects.filter(
@@ -2633,7 +2335,9 @@ def reports_dashboard(request):
         'monthly_stats': monthly_stats,
         'model_stats': model_stats,
         'recent_activity': recent_activity,
-        'current_date': current_date
+        'current_date': current_date,
+        'model_choices': ChecklistBase.MODEL_CHOICES,
+        'shift_choices': Shift.SHIFT_CHOICES,
     }
 
     return render(request, 'main/reports/reports_dashboard.html', context)
@@ -2649,256 +2353,52 @@ from datetime import datetime
 def export_checklist_excel(request, checklist_id):
     import os
     from django.conf import settings
-    from openpyxl import load_workbook
-    from openpyxl.cell.cell import MergedCell
-    from openpyxl.styles import PatternFill, Font, Alignment
-    from openpyxl.utils import get_column_letter
     from django.http import HttpResponse
     from datetime import datetime
-    import logging
-    
-    # Set up logging to debug missing values
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
-    
-    # Add stream handler if not already present
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        logger.addHandler(handler)
-    
-    checklist = get_object_or_404(
-        ChecklistBase.objects.select_related(
-            'shift__operator',
-            'shift__shift_supervisor',
-            'shift__quality_supervisor'
-        ).prefetch_related(
-            'subgroup_entries__verifications',
-        ), 
-        id=checklist_id
+    from .export_utils import (
+        CHECKLIST_TEMPLATE_PATH, checklist_export_prefetch, logger,
+        render_checklist_workbook, template_cache,
     )
-    
-    # Path to your template file - adjust this to the actual location
-    template_path = os.path.join(settings.STATIC_ROOT, 'templates', 'new demo.xlsx')
-    
-    # Load the template workbook instead of creating a new one
-    wb = load_workbook(template_path)
-    
-    # Clean external links to prevent validation warnings
-    if hasattr(wb, 'external_links') and wb.external_links:
-        wb.external_links = []
-        logger.info("Removed external links from workbook")
-    
-    ws = wb.active  # Or use wb["Sheet Name"] if you know the exact sheet name
-    
-    # Define styles for pass/fail values
-    pass_style = {
-        'fill': PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid'),
-        'font': Font(color='006100'),
-        'alignment': Alignment(horizontal='center', vertical='center')
-    }
-    
-    fail_style = {
-        'fill': PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid'),
-        'font': Font(color='9C0006'),
-        'alignment': Alignment(horizontal='center', vertical='center')
-    }
-    
-    # Helper function to safely set cell value with additional debugging
-    def safe_set_cell_value(ws, coord, value, field_name=None):
-        try:
-            cell = ws[coord]
-            original_value = cell.value
-            if isinstance(cell, MergedCell):
-                # Find the merged range that contains this cell
-                for merged_range in ws.merged_cells.ranges:
-                    if coord in merged_range:
-                        # Set the value on the top-left cell of the merged range
-                        anchor_cell = merged_range.start_cell
-                        anchor_coord = anchor_cell.coordinate
-                        original_value = ws[anchor_coord].value  # Store original for debug
-                        ws[anchor_coord] = value
-                        logger.info(f"SET MERGED CELL {anchor_coord} (from {coord}) for {field_name}: '{original_value}' → '{value}'")
-                        return anchor_cell
-                logger.warning(f"MERGED CELL {coord} for {field_name} not found in any range")
-                return None
-            else:
-                cell.value = value
-                logger.info(f"SET CELL {coord} for {field_name}: '{original_value}' → '{value}'")
-                return cell
-        except Exception as e:
-            logger.error(f"ERROR SETTING {coord} for {field_name}: {e}")
-            return None
-    
-    # Get ordered subgroups
-    subgroups = list(checklist.subgroup_entries.all().order_by('subgroup_number'))
-    logger.info(f"SUBGROUPS: {len(subgroups)}")
-    
-    # HEADER INFO
-    safe_set_cell_value(ws, 'B5', checklist.shift.date.strftime('%Y-%m-%d'), "Date")
-    safe_set_cell_value(ws, 'E5', checklist.shift.get_shift_type_display(), "Shift")
-    
-    # RECORD TIME - Row 16
-    for sg_index, sg in enumerate(subgroups):
-        col_start = 2 + sg_index * 5  # Adjust column calculation (0-based index)
-        time_str = sg.timestamp.strftime('%H:%M')
-        for i in range(5):
-            col = get_column_letter(col_start + i)
-            safe_set_cell_value(ws, f'{col}16', time_str, "Record Time")
-    
-    # DIRECT ROW ASSIGNMENTS FOR ALL FIELDS
-    
-    # MACHINE SETTINGS section - single values
-    row_mapping = {
-        'Program selection on HMI': {'row': 20, 'field': 'selected_model', 'pass_fail': False},
-        'Line pressure': {'row': 21, 'field': 'line_pressure', 'pass_fail': False},
-        'O-ring conditon': {'row': 22, 'field': 'oring_condition', 'pass_fail': True},
-        'UV Flow input Test Pressure': {'row': 23, 'field': 'uv_flow_input_pressure', 'pass_fail': False},
-        'Master Verification for LVDT': {'row': 26, 'field': 'master_verification_lvdt', 'pass_fail': True},
-        'Good and Bad master verification': {'row': 27, 'field': 'good_bad_master_verification', 'pass_fail': True},
-        'Test Pressure for Vacumm generation': {'row': 28, 'field': 'test_pressure_vacuum', 'pass_fail': False},
-        'Tool Alignmnet': {'row': 30, 'field': 'tool_alignment', 'pass_fail': True},
-        'Top Tool': {'row': 31, 'field': 'top_tool_id', 'pass_fail': False},
-        'Bottom Tool': {'row': 32, 'field': 'bottom_tool_id', 'pass_fail': False},
-        'UV Assy Stage': {'row': 33, 'field': 'uv_assy_stage_id', 'pass_fail': False},
-        'Retainer Part no': {'row': 35, 'field': 'retainer_part_no', 'pass_fail': False},
-        'UV Clip Part No': {'row': 36, 'field': 'uv_clip_part_no', 'pass_fail': False},
-        'Umbrella Part No': {'row': 37, 'field': 'umbrella_part_no', 'pass_fail': False},
-        'Retainer ID lubrication': {'row': 38, 'field': 'retainer_id_lubrication', 'pass_fail': True},
-    }
-    
-    # Set all single-value fields with pass/fail styling where needed
-    for field_name, config in row_mapping.items():
-        row = config['row']
-        field = config['field']
-        is_pass_fail = config['pass_fail']
-        
-        value = getattr(checklist, field, 'N/A')
-        
-        # Special handling for None or null values
-        if value is None:
-            value = 'N/A'
-        
-        # Set the value
-        cell = safe_set_cell_value(ws, f'B{row}', value, field_name)
-        
-        # Apply pass/fail styling if needed
-        if cell and is_pass_fail and value in ['OK', 'NG']:
-            try:
-                style = pass_style if value == 'OK' else fail_style
-                cell.fill = style['fill']
-                cell.font = style['font']
-                cell.alignment = style['alignment']
-            except Exception as e:
-                logger.warning(f"Error styling {field_name}: {e}")
-    
-    # MEASUREMENT FIELDS - per subgroup with validation
-    measurement_fields = {
-        'UV Vacuum Test': {'row': 24, 'field': 'uv_vacuum_test', 'validation': lambda x: -43 <= x <= -35},
-        'UV Flow Value': {'row': 25, 'field': 'uv_flow_value', 'validation': lambda x: 30 <= x <= 40},
-    }
-    
-    for field_name, config in measurement_fields.items():
-        row = config['row']
-        field = config['field']
-        validation = config['validation']
-        
-        for sg_index, sg in enumerate(subgroups):
-            col_start = 2 + sg_index * 5
-            value = getattr(sg, field, 0)
-            
-            # Ensure value is numeric
-            if value is None:
-                value = 0
-                
-            for i in range(6):
-                col = get_column_letter(col_start + i)
-                cell = safe_set_cell_value(ws, f'{col}{row}', value, f"{field_name} sample {i+1}")
-                
-                if cell:
-                    try:
-                        style = pass_style if validation(value) else fail_style
-                        cell.fill = style['fill']
-                        cell.font = style['font']
-                        cell.alignment = style['alignment']
-                    except Exception as e:
-                        logger.warning(f"Error styling {field_name}: {e}")
-    
-    # REPEATED CHECKS - per subgroup
-    repeated_fields = {
-        'Umbrella Valve Assembly in Retainer': {'row': 29, 'field': 'umbrella_valve_assembly'},
-        'UV Clip pressing': {'row': 39, 'field': 'uv_clip_pressing'},
-        'All workstations are clean': {'row': 41, 'field': 'workstation_clean'},
-        'All Error proofing verification': {'row': 42, 'field': 'error_proofing_verification'},
-        'Station Operator confirmation': {'row': 43, 'field': 'bin_contamination_check'},
-    }
-    
-    for field_name, config in repeated_fields.items():
-        row = config['row']
-        field = config['field']
-        
-        for sg_index, sg in enumerate(subgroups):
-            col_start = 2 + sg_index * 6
-            value = getattr(sg, field, 'N/A')
-            
-            # Handle None values
-            if value is None:
-                value = 'N/A'
-                
-            for i in range(5):
-                col = get_column_letter(col_start + i)
-                cell = safe_set_cell_value(ws, f'{col}{row}', value, f"{field_name} sample {i+1}")
-                
-                if cell:
-                    try:
-                        style = pass_style if value in ['OK', 'Yes'] else fail_style
-                        cell.fill = style['fill']
-                        cell.font = style['font']
-                        cell.alignment = style['alignment']
-                    except Exception as e:
-                        logger.warning(f"Error styling {field_name}: {e}")
-    
-    # SIGNATURES
-    signature_rows = {
-        'Team Leader': {'row': 44, 'field': 'operator'},
-        'Shift Supervisor': {'row': 45, 'field': 'shift_supervisor'},
-        'Quality Supervisor': {'row': 46, 'field': 'quality_supervisor'},
-    }
-    
-    for field_name, config in signature_rows.items():
-        row = config['row']
-        field = config['field']
-        
-        for sg_index, sg in enumerate(subgroups):
-            col_start = 2 + sg_index * 6
-            role_obj = getattr(checklist.shift, field, None)
-            
-            # Get name with fallbacks
-            name = 'N/A'
-            if role_obj:
-                try:
-                    name = role_obj.get_full_name()
-                    if not name or name.strip() == '':
-                        name = role_obj.username
-                except:
-                    name = getattr(role_obj, 'username', 'N/A')
-            
-            for i in range(5):
-                col = get_column_letter(col_start + i)
-                safe_set_cell_value(ws, f'{col}{row}', name, f"{field_name} signature")
-    
+
+    from .export_cache import cached_export_response, fingerprint
+
+    checklist = get_object_or_404(checklist_export_prefetch(ChecklistBase.objects.all()), id=checklist_id)
+    filename = f'quality_control_{checklist.id}_{datetime.now().strftime("%Y%m%d")}.xlsx'
+
+    # Parsed once per process and re-read only when the file changes
+    template = template_cache.get(os.path.join(settings.STATIC_ROOT, CHECKLIST_TEMPLATE_PATH))
+
+    subgroups = list(checklist.subgroup_entries.all())
+
+    def render():
+        return render_checklist_workbook(template, checklist, subgroups)
+
+    # Quality approved checklists are served from the file cache; the version
+    # covers the template file and every (prefetched) row the workbook shows
+    if checklist.status == 'quality_approved':
+        verification_status = checklist.verification_status
+        shift = verification_status.shift if verification_status else None
+        version = fingerprint(
+            template.path, template.mtime, checklist, verification_status, shift,
+            shift and shift.operator, shift and shift.shift_supervisor, shift and shift.quality_supervisor,
+            *subgroups
+        )
+        return cached_export_response(
+            request, 'checklist', checklist.id, version, render, filename
+        )
+
+    wb = render()
+
     # Generate response
     response = HttpResponse(
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
-    response['Content-Disposition'] = f'attachment; filename=quality_control_{checklist.id}_{datetime.now().strftime("%Y%m%d")}.xlsx'
-    
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+
     try:
-        # Log all changes before saving
-        logger.info("SAVING WORKBOOK TO RESPONSE")
         wb.save(response)
-        logger.info("WORKBOOK SAVED SUCCESSFULLY")
     except Exception as e:
-        logger.error(f"ERROR SAVING WORKBOOK: {e}")
+        logger.error("Error saving checklist %s workbook: %s", checklist.id, e)
         # Fallback to a simpler workbook if the template has issues
         from openpyxl import Workbook
         fallback_wb = Workbook()
@@ -2906,10 +2406,83 @@ def export_checklist_excel(request, checklist_id):
         fallback_ws['A1'] = "Error generating Excel from template"
         fallback_ws['A2'] = f"Please check logs: {str(e)}"
         fallback_wb.save(response)
-    
+
     return response
 
 
+import os
+from django.http import FileResponse, Http404
+from django.urls import reverse
+
+
+@login_required
+@require_POST
+def bulk_export_checklists(request):
+    """Queue an export of every checklist in a date range as one zip of workbooks"""
+    from django.utils.dateparse import parse_date
+    from .bulk_export import MAX_RANGE_DAYS, start_checklist_export
+
+    try:
+        start_date = parse_date(request.POST.get('start_date') or '')
+        end_date = parse_date(request.POST.get('end_date') or '')
+    except ValueError:
+        # Well formed but impossible, e.g. 2026-02-30
+        start_date = end_date = None
+    if not start_date or not end_date or start_date > end_date:
+        return JsonResponse({'status': 'error', 'message': 'A valid start and end date are required'}, status=400)
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        return JsonResponse({'status': 'error', 'message': f'The date range cannot exceed {MAX_RANGE_DAYS} days'}, status=400)
+
+    filters = {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'model': request.POST.get('model') or None,
+        'shift_type': request.POST.get('shift_type') or None,
+    }
+    job = start_checklist_export(filters, request.user)
+
+    return JsonResponse({
+        'status': 'queued',
+        'job_id': job.pk,
+        'status_url': reverse('job_status', args=[job.pk]),
+    }, status=202)
+
+
+def _user_job(request, job_id):
+    from .models import Job
+
+    job = get_object_or_404(Job, pk=job_id)
+    if job.created_by_id != request.user.id and not request.user.is_superuser:
+        raise Http404("Job not found")
+    return job
+
+
+@login_required
+def job_status_api(request, job_id):
+    """Status and progress of a background job started by the user"""
+    from .job_utils import job_status
+
+    job = _user_job(request, job_id)
+    data = job_status(job)
+    if job.kind == 'checklist_bulk_export' and job.status == 'done':
+        data['download_url'] = reverse('bulk_export_download', args=[job.pk])
+    return JsonResponse(data)
+
+
+@login_required
+def bulk_export_download(request, job_id):
+    from .bulk_export import job_dir
+
+    job = _user_job(request, job_id)
+    if job.kind != 'checklist_bulk_export' or job.status != 'done':
+        raise Http404("Export is not ready")
+    file_name = job.result['file_name']
+    path = os.path.join(job_dir(job.pk), file_name)
+    if not os.path.exists(path):
+        raise Http404("Export has expired")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=file_name)
+
+
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
@@ -3132,60 +2705,23 @@ def checklist_detail(request, checklist_id):
     # NOK Approval Entries: Entries with out-of-range or NOK values
     # ============================================================================
     
+    # Out-of-spec readings come from the EntryReading store in one query
+    # instead of scanning every entry's reading columns
+    from .readings_utils import entries_needing_approval
+
+    failing_entry_ids = entries_needing_approval(checklist)
     nok_approval_entries = []
     
     for entry in all_entries:
-        needs_approval = False
-        
-        # UV Vacuum: Check out of range (-43 to -35 kPa)
-        if entry.parameter_group == 'uv_vacuum':
-            for i in range(1, 6):
-                value = getattr(entry, f'uv_vacuum_test_{i}', None)
-                if value is not None and (value < -43 or value > -35):
-                    needs_approval = True
-                    entry.has_out_of_range_values = True
-                    break
-        
-        # UV Flow: Check out of range (30-40 LPM)
-        elif entry.parameter_group == 'uv_flow':
-            for i in range(1, 6):
-                value = getattr(entry, f'uv_flow_value_{i}', None)
-                if value is not None and (value < 30 or value > 40):
-                    needs_approval = True
-                    entry.has_out_of_range_values = True
-                    break
-        
-        # Umbrella Valve: Check for NOK
-        elif entry.parameter_group == 'umbrella_valve':
-            for i in range(1, 6):
-                if getattr(entry, f'umbrella_valve_assembly_{i}', None) == 'NOK':
-                    needs_approval = True
-                    entry.has_nok_values = True
-                    break
-        
-        # UV Clip: Check for NOK
-        elif entry.parameter_group == 'uv_clip':
-            for i in range(1, 6):
-                if getattr(entry, f'uv_clip_pressing_{i}', None) == 'NOK':
-                    needs_approval = True
-                    entry.has_nok_values = True
-                    break
-        
-        # Workstation: Check if not clean
-        elif entry.parameter_group == 'workstation':
-            if entry.workstation_clean == 'No':
-                needs_approval = True
-        
-        # Bin Contamination: Check for No (contaminated)
+        if entry.pk not in failing_entry_ids:
+            continue
+        if entry.parameter_group in ('uv_vacuum', 'uv_flow'):
+            entry.has_out_of_range_values = True
+        elif entry.parameter_group in ('umbrella_valve', 'uv_clip'):
+            entry.has_nok_values = True
         elif entry.parameter_group == 'bin_contamination':
-            for i in range(1, 6):
-                if getattr(entry, f'bin_contamination_check_{i}', None) == 'No':
-                    needs_approval = True
-                    entry.has_no_values = True
-                    break
-        
-        if needs_approval:
-            nok_approval_entries.append(entry)
+            entry.has_no_values = True
+        nok_approval_entries.append(entry)
     
     # ============================================================================
     # Get availability info
@@ -4014,15 +3550,10 @@ def daily_report(request):
     if isinstance(date, str):
         date = datetime.strptime(date, '%Y-%m-%d').date()
     
-    checklists = ChecklistBase.objects.filter(shift__date=date)
+    checklists = ChecklistBase.objects.filter(verification_status__shift__date=date)
     
-    summary = {
-        'total': checklists.count(),
-        'pending': checklists.filter(status='pending').count(),
-        'supervisor_approved': checklists.filter(status='supervisor_approved').count(),
-        'quality_approved': checklists.filter(status='quality_approved').count(),
-        'rejected': checklists.filter(status='rejected').count(),
-    }
+    # Served from the day's snapshot once the day is closed
+    summary = period_payload('day', date)['checklists']
     
     return render(request, 'main/reports/daily_report.html', {
         'date': date,
@@ -4032,22 +3563,16 @@ def daily_report(request):
 
 @login_required
 def weekly_report(request):
-    end_date = timezone.now().date()
+    end_date = timezone.localdate()
     start_date = end_date - timedelta(days=7)
     
-    checklists = ChecklistBase.objects.filter(
-        shift__date__range=[start_date, end_date]
-    ).order_by('shift__date')
-    
+    # Every day in the window is closed, so this is read from day snapshots
     daily_stats = {}
-    for i in range(7):
-        current_date = start_date + timedelta(days=i)
-        daily_checklists = checklists.filter(shift__date=current_date)
-        
+    for current_date, payload in daily_payloads(start_date, end_date - timedelta(days=1)).items():
         daily_stats[current_date] = {
-            'total': daily_checklists.count(),
-            'approved': daily_checklists.filter(status='quality_approved').count(),
-            'rejected': daily_checklists.filter(status='rejected').count(),
+            'total': payload['checklists']['total'],
+            'approved': payload['checklists']['quality_approved'],
+            'rejected': payload['checklists']['rejected'],
         }
     
     return render(request, 'main/reports/weekly_report.html', {
@@ -4058,22 +3583,16 @@ def weekly_report(request):
 
 @login_required
 def monthly_report(request):
-    end_date = timezone.now().date()
+    end_date = timezone.localdate()
     start_date = end_date - timedelta(days=30)
     
-    checklists = ChecklistBase.objects.filter(
-        shift__date__range=[start_date, end_date]
-    )
+    # Closed part of the window comes from snapshots, today is computed live
+    by_model = range_payload(start_date, end_date).get('checklists_by_model', {})
     
     # Calculate statistics by model
     model_stats = {}
     for model in ChecklistBase.MODEL_CHOICES:
-        model_checklists = checklists.filter(selected_model=model[0])
-        model_stats[model[0]] = {
-            'total': model_checklists.count(),
-            'approved': model_checklists.filter(status='quality_approved').count(),
-            'rejected': model_checklists.filter(status='rejected').count(),
-        }
+        model_stats[model[0]] = by_model.get(model[0], {'total': 0, 'approved': 0, 'rejected': 0})
     
     return render(request, 'main/reports/monthly_report.html', {
         'start_date': start_date,
@@ -4755,6 +4274,10 @@ from .models import (
     OperationNumber, DailyVerificationStatus, ChecklistBase
 )
 from .forms import FTQRecordForm
+from .ftq_utils import (
+    MODEL_LABELS, calculate_ftq, defect_breakdown, ftq_breakdown, rollup_breakdown,
+    rollup_defects, rollup_queryset, shift_label, with_defect_totals
+)
 
 # FTQ Record Views
 @login_required
@@ -5398,139 +4921,75 @@ def ftq_dashboard(request):
     # Get FTQ records in range
     ftq_records = FTQRecord.objects.filter(
         date__range=[start_date, end_date]
-    ).prefetch_related('time_based_defects').order_by('date')
-    
-    # Calculate summary statistics manually (since total_defects is a property)
-    total_inspected = 0
-    total_defects = 0
+    )
     
-    for record in ftq_records:
-        total_inspected += record.total_inspected
-        total_defects += record.total_defects
+    # Summary statistics from grouped queries (total_defects is a property)
+    totals = ftq_breakdown(ftq_records)
     
     stats = {
-        'total_records': ftq_records.count(),
-        'total_inspected': total_inspected,
-        'total_defects': total_defects,
+        'total_records': totals['record_count'],
+        'total_inspected': totals['total_inspected'],
+        'total_defects': totals['total_defects'],
+        'ftq_percentage': totals['ftq_percentage'],
     }
     
-    if stats['total_inspected'] > 0:
-        stats['ftq_percentage'] = round(((stats['total_inspected'] - stats['total_defects']) / stats['total_inspected']) * 100, 2)
-    else:
-        stats['ftq_percentage'] = 0
-    
     # Get model-wise statistics
-    model_data = {}
-    for record in ftq_records:
-        model = record.model_name
-        if model not in model_data:
-            model_data[model] = {'total_inspected': 0, 'total_defects': 0}
-        model_data[model]['total_inspected'] += record.total_inspected
-        model_data[model]['total_defects'] += record.total_defects
-    
     model_stats = []
-    for model, data in model_data.items():
-        if data['total_inspected'] > 0:
-            ftq_pct = round(((data['total_inspected'] - data['total_defects']) / data['total_inspected']) * 100, 2)
-        else:
-            ftq_pct = 0
-        
+    for model, data in sorted(ftq_breakdown(ftq_records, 'model_name').items()):
         model_stats.append({
             'model_name': model,
             'total_inspected': data['total_inspected'],
             'total_defects': data['total_defects'],
-            'ftq_percentage': ftq_pct
+            'ftq_percentage': data['ftq_percentage']
         })
     
     # Get shift-wise statistics
     shift_data = {}
-    for record in ftq_records:
-        shift = record.get_shift_type_display() if record.shift_type else 'Unknown'
+    for shift_type, data in ftq_breakdown(ftq_records, 'shift_type').items():
+        shift = shift_label(shift_type)
         if shift not in shift_data:
             shift_data[shift] = {'total_inspected': 0, 'total_defects': 0}
-        shift_data[shift]['total_inspected'] += record.total_inspected
-        shift_data[shift]['total_defects'] += record.total_defects
+        shift_data[shift]['total_inspected'] += data['total_inspected']
+        shift_data[shift]['total_defects'] += data['total_defects']
     
     shift_stats = []
     for shift, data in shift_data.items():
-        if data['total_inspected'] > 0:
-            ftq_pct = round(((data['total_inspected'] - data['total_defects']) / data['total_inspected']) * 100, 2)
-        else:
-            ftq_pct = 0
-        
         shift_stats.append({
             'shift_type': shift,
             'total_inspected': data['total_inspected'],
             'total_defects': data['total_defects'],
-            'ftq_percentage': ftq_pct
+            'ftq_percentage': calculate_ftq(data['total_inspected'], data['total_defects'])
         })
     
-    # Get top defects from time-based entries
-    defect_counts = {}
-    
-    for record in ftq_records:
-        for entry in record.time_based_defects.all():
-            if entry.defect_type:
-                defect_name = entry.defect_type.name
-            else:
-                defect_name = entry.defect_type_custom.name
-            
-            if defect_name not in defect_counts:
-                defect_counts[defect_name] = 0
-            defect_counts[defect_name] += entry.count
-    
-    # Sort and get top 10
+    # Get top 10 defects from time-based entries
     top_defects = [
-        {'defect_type__name': name, 'total_count': count}
-        for name, count in sorted(defect_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        {'defect_type__name': row['name'], 'total_count': row['total_count']}
+        for row in defect_breakdown(ftq_records, limit=10)
     ]
+    top_defect_names = [defect['defect_type__name'] for defect in top_defects]
     
     # Prepare chart data for daily FTQ trend
-    daily_data = {}
-    for record in ftq_records:
-        date_str = record.date.strftime('%Y-%m-%d')
-        if date_str not in daily_data:
-            daily_data[date_str] = {'total_inspected': 0, 'total_defects': 0}
-        daily_data[date_str]['total_inspected'] += record.total_inspected
-        daily_data[date_str]['total_defects'] += record.total_defects
-    
-    # Calculate daily FTQ percentages
     chart_dates = []
     chart_ftq = []
     total_inspected_daily = []
     total_defects_daily = []
     
-    for date_str, data in sorted(daily_data.items()):
-        chart_dates.append(date_str)
-        if data['total_inspected'] > 0:
-            ftq = round(((data['total_inspected'] - data['total_defects']) / data['total_inspected']) * 100, 2)
-        else:
-            ftq = 0
-        chart_ftq.append(ftq)
+    for record_date, data in sorted(ftq_breakdown(ftq_records, 'date').items()):
+        chart_dates.append(record_date.strftime('%Y-%m-%d'))
+        chart_ftq.append(data['ftq_percentage'])
         total_inspected_daily.append(data['total_inspected'])
         total_defects_daily.append(data['total_defects'])
     
     # Prepare daily defect data for top defects
     daily_defect_data = {}
-    for defect in top_defects:
-        defect_name = defect['defect_type__name']
-        daily_defect_data[defect_name] = {}
-        
-        # Initialize with zeros
-        for date_str in chart_dates:
-            daily_defect_data[defect_name][date_str] = 0
+    for defect_name in top_defect_names:
+        daily_defect_data[defect_name] = {date_str: 0 for date_str in chart_dates}
     
-    # Populate daily defect data
-    for record in ftq_records:
-        date_str = record.date.strftime('%Y-%m-%d')
-        for entry in record.time_based_defects.all():
-            if entry.defect_type:
-                defect_name = entry.defect_type.name
-            else:
-                defect_name = entry.defect_type_custom.name
-            
-            if defect_name in daily_defect_data and date_str in daily_defect_data[defect_name]:
-                daily_defect_data[defect_name][date_str] += entry.count
+    if top_defect_names:
+        for row in defect_breakdown(ftq_records, 'date'):
+            date_str = row['date'].strftime('%Y-%m-%d')
+            if row['name'] in daily_defect_data and date_str in daily_defect_data[row['name']]:
+                daily_defect_data[row['name']][date_str] += row['total_count']
     
     # Calculate defect trends
     defect_trends = {}
@@ -5554,40 +5013,24 @@ def ftq_dashboard(request):
             defect_trends[defect_name] = {'percent_change': 0, 'direction': 'stable'}
     
     # Find most common model and shift for each defect
-    defect_common_models = {}
-    defect_common_shifts = {}
+    defect_common_models = {name: 'N/A' for name in top_defect_names}
+    defect_common_shifts = {name: 'N/A' for name in top_defect_names}
     
-    for defect in top_defects:
-        defect_name = defect['defect_type__name']
-        model_defect_counts = {}
+    if top_defect_names:
+        # Rows come back ordered by count, so the first hit per defect is the most common
+        for row in defect_breakdown(ftq_records, 'model_name'):
+            if defect_common_models.get(row['name']) == 'N/A':
+                defect_common_models[row['name']] = row['model_name']
+        
         shift_defect_counts = {}
+        for row in defect_breakdown(ftq_records, 'shift_type'):
+            if row['name'] in defect_common_shifts:
+                counts = shift_defect_counts.setdefault(row['name'], {})
+                shift = shift_label(row['shift_type'])
+                counts[shift] = counts.get(shift, 0) + row['total_count']
         
-        for record in ftq_records:
-            for entry in record.time_based_defects.all():
-                entry_name = entry.defect_type.name if entry.defect_type else entry.defect_type_custom.name
-                
-                if entry_name == defect_name:
-                    # Count by model
-                    if record.model_name not in model_defect_counts:
-                        model_defect_counts[record.model_name] = 0
-                    model_defect_counts[record.model_name] += entry.count
-                    
-                    # Count by shift
-                    shift = record.get_shift_type_display() if record.shift_type else 'Unknown'
-                    if shift not in shift_defect_counts:
-                        shift_defect_counts[shift] = 0
-                    shift_defect_counts[shift] += entry.count
-        
-        # Find most common
-        if model_defect_counts:
-            defect_common_models[defect_name] = max(model_defect_counts, key=model_defect_counts.get)
-        else:
-            defect_common_models[defect_name] = 'N/A'
-            
-        if shift_defect_counts:
-            defect_common_shifts[defect_name] = max(shift_defect_counts, key=shift_defect_counts.get)
-        else:
-            defect_common_shifts[defect_name] = 'N/A'
+        for defect_name, counts in shift_defect_counts.items():
+            defect_common_shifts[defect_name] = max(counts, key=counts.get)
     
     # Prepare chart data
     chart_data = {
@@ -5639,8 +5082,10 @@ def ftq_report(request, report_type='daily'):
             except ValueError:
                 report_date = today
         
-        # Get records for the date
-        ftq_records = FTQRecord.objects.filter(date=report_date).order_by('shift_type')
+        # Get records for the date, with defect totals annotated in the same query
+        ftq_records = with_defect_totals(
+            FTQRecord.objects.filter(date=report_date)
+        ).order_by('shift_type')
         
         # Group by shift and model
         shifts = {}
@@ -5735,10 +5180,10 @@ def ftq_report(request, report_type='daily'):
         weekday = end_date.weekday()
         start_date = end_date - timedelta(days=weekday + 6)  # Go to Monday of the week
         
-        # Get records for the week
-        ftq_records = FTQRecord.objects.filter(
+        # Get records for the week, with defect totals annotated in the same query
+        ftq_records = with_defect_totals(FTQRecord.objects.filter(
             date__range=[start_date, end_date]
-        ).order_by('date', 'shift_type')
+        )).order_by('date', 'shift_type')
         
         # Group by day
         days = {}
@@ -5826,24 +5271,17 @@ def ftq_report(request, report_type='daily'):
         else:
             last_day = datetime(year, month + 1, 1).date() - timedelta(days=1)
         
-        # Get records for the month
-        ftq_records = FTQRecord.objects.filter(
-            date__range=[first_day, last_day]
-        ).order_by('date')
+        # Read the month from the daily rollup instead of scanning every defect entry
+        rollups = rollup_queryset(first_day, last_day)
         
         # Group by model
         models = {}
-        for record in ftq_records:
-            model_key = record.model_name
-            if model_key not in models:
-                models[model_key] = {
-                    'model_name': record.get_model_name_display(),
-                    'total_inspected': 0,
-                    'total_defects': 0
-                }
-            
-            models[model_key]['total_inspected'] += record.total_inspected
-            models[model_key]['total_defects'] += record.total_defects
+        for model_key, data in rollup_breakdown(rollups, 'model_name').items():
+            models[model_key] = {
+                'model_name': MODEL_LABELS.get(model_key, model_key),
+                'total_inspected': data['total_inspected'],
+                'total_defects': data['total_defects']
+            }
         
         # Calculate FTQ percentage for each model
         monthly_total_inspected = 0
@@ -5865,15 +5303,13 @@ def ftq_report(request, report_type='daily'):
             monthly_ftq = 0
         
         # Get top defects for the month
-        top_defects = DefectRecord.objects.filter(
-            ftq_record__date__range=[first_day, last_day]
-        ).values(
-            'defect_type__name'
-        ).annotate(
-            total_count=Sum('count')
-        ).order_by('-total_count')[:15]
+        top_defects = [
+            {'defect_type__name': row['name'], 'total_count': row['total_count']}
+            for row in rollup_defects(rollups, limit=15)
+        ]
         
-        # Weekly trend within the month
+        # Weekly trend within the month, built from one per-day breakdown
+        daily_totals = rollup_breakdown(rollups, 'date')
         weekly_trend = []
         current_date = first_day
         while current_date <= last_day:
@@ -5886,20 +5322,16 @@ def ftq_report(request, report_type='daily'):
             if end_of_week > last_day:
                 end_of_week = last_day
             
-            # Get records for this week
-            week_records = ftq_records.filter(
-                date__range=[current_date, end_of_week]
-            )
-            
             # Calculate weekly totals
-            week_inspected = week_records.aggregate(total=Sum('total_inspected'))['total'] or 0
-            week_defects = week_records.aggregate(total=Sum('total_defects'))['total'] or 0
+            week_days = [
+                data for record_date, data in daily_totals.items()
+                if current_date <= record_date <= end_of_week
+            ]
+            week_inspected = sum(data['total_inspected'] for data in week_days)
+            week_defects = sum(data['total_defects'] for data in week_days)
             
             # Calculate FTQ
-            if week_inspected > 0:
-                week_ftq = round(((week_inspected - week_defects) / week_inspected) * 100, 2)
-            else:
-                week_ftq = 0
+            week_ftq = calculate_ftq(week_inspected, week_defects)
             
             weekly_trend.append({
                 'start_date': current_date,
@@ -5964,8 +5396,8 @@ def export_ftq_excel(request):
         start_date = timezone.now().date() - timedelta(days=30)
         end_date = timezone.now().date()
     
-    # Query FTQ records
-    ftq_records = FTQRecord.objects.select_related('shift', 'created_by', 'verified_by')
+    # Query FTQ records with their defect totals annotated
+    ftq_records = with_defect_totals(FTQRecord.objects.select_related('created_by', 'verified_by'))
     
     # Apply filters
     ftq_records = ftq_records.filter(date__range=[start_date, end_date])
@@ -5978,167 +5410,142 @@ def export_ftq_excel(request):
     
     # Order by date
     ftq_records = ftq_records.order_by('date', 'shift_type')
-    
-    # Create Excel workbook
-    from openpyxl import Workbook
-    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "FTQ Report"
-    
-    # Define styles
-    header_style = {
-        'fill': PatternFill(start_color='1F4E78', end_color='1F4E78', fill_type='solid'),
-        'font': Font(color='FFFFFF', bold=True),
-        'alignment': Alignment(horizontal='center', vertical='center')
-    }
-    
-    date_style = {
-        'alignment': Alignment(horizontal='center')
-    }
-    
-    number_style = {
-        'alignment': Alignment(horizontal='right')
-    }
-    
-    # Create header row
-    headers = [
-        'Date', 'Shift', 'Model', 'Julian Date', 'Production/Day', 
-        'Total Reject', 'FTQ %', 'Created By', 'Verified By'
-    ]
-    
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.fill = header_style['fill']
-        cell.font = header_style['font']
-        cell.alignment = header_style['alignment']
-    
-    # Add data rows
-    for row_num, record in enumerate(ftq_records, 2):
-        # Calculate FTQ percentage
-        if record.total_inspected > 0:
-            ftq_percentage = ((record.total_inspected - record.total_defects) / record.total_inspected) * 100
-        else:
-            ftq_percentage = 0
-        
-        # Format verified_by
-        verified_by = record.verified_by.get_full_name() if record.verified_by else 'Not Verified'
-        
-        # Add row data
-        row_data = [
-            record.date,
-            record.get_shift_type_display(),
-            record.get_model_name_display(),
-            record.julian_date,
-            record.total_inspected,
-            record.total_defects,
-            f"{ftq_percentage:.2f}%",
-            record.created_by.get_full_name(),
-            verified_by
+
+    # Summary statistics and defect totals from the daily rollup
+    rollups = rollup_queryset(start_date, end_date, model_name, shift_type)
+    summary = rollup_breakdown(rollups)
+    total_inspected = summary['total_inspected']
+    total_defects = summary['total_defects']
+    overall_ftq = rate(total_inspected - total_defects, total_inspected)
+
+    def build(wb):
+        header_format = wb.add_format({
+            'bg_color': '#1F4E78', 'font_color': '#FFFFFF', 'bold': True,
+            'align': 'center', 'valign': 'vcenter',
+        })
+        date_format = wb.add_format({'num_format': 'yyyy-mm-dd', 'align': 'center'})
+        number_format = wb.add_format({'align': 'right'})
+
+        # Records sheet, streamed straight from the database
+        ws = wb.add_worksheet("FTQ Report")
+        headers = [
+            'Date', 'Shift', 'Model', 'Julian Date', 'Production/Day',
+            'Total Reject', 'FTQ %', 'Created By', 'Verified By'
         ]
-        
-        for col_num, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_num, column=col_num, value=value)
-            
-            # Apply styles
-            if col_num == 1:  # Date column
-                cell.alignment = date_style['alignment']
-            elif col_num in [5, 6, 7]:  # Numeric columns
-                cell.alignment = number_style['alignment']
-    
-    # Auto adjust column widths
-    for col_num, _ in enumerate(headers, 1):
-        col_letter = get_column_letter(col_num)
-        ws.column_dimensions[col_letter].width = 15
-    
-    # Add summary sheet
-    ws_summary = wb.create_sheet(title="Summary")
-    
-    # Add summary headers
-    summary_headers = ['Metric', 'Value']
-    for col_num, header in enumerate(summary_headers, 1):
-        cell = ws_summary.cell(row=1, column=col_num, value=header)
-        cell.fill = header_style['fill']
-        cell.font = header_style['font']
-        cell.alignment = header_style['alignment']
-    
-    # Calculate summary statistics
-    total_inspected = ftq_records.aggregate(total=Sum('total_inspected'))['total'] or 0
-    total_defects = ftq_records.aggregate(total=Sum('total_defects'))['total'] or 0
-    
-    if total_inspected > 0:
-        overall_ftq = ((total_inspected - total_defects) / total_inspected) * 100
+        ws.set_column(0, len(headers) - 1, 15)
+        ws.write_row(0, 0, headers, header_format)
+
+        for row_num, record in enumerate(ftq_records.iterator(chunk_size=2000), 1):
+            defects = record.total_defects
+            ftq_percentage = rate(record.total_inspected - defects, record.total_inspected)
+            verified_by = record.verified_by.get_full_name() if record.verified_by else 'Not Verified'
+
+            ws.write_datetime(row_num, 0, datetime.combine(record.date, time()), date_format)
+            # shift_type is nullable and write_string rejects None
+            ws.write_string(row_num, 1, record.get_shift_type_display() or '')
+            ws.write_string(row_num, 2, record.get_model_name_display())
+            ws.write_datetime(row_num, 3, datetime.combine(record.julian_date, time()), date_format)
+            ws.write_number(row_num, 4, record.total_inspected, number_format)
+            ws.write_number(row_num, 5, defects, number_format)
+            ws.write_string(row_num, 6, f"{ftq_percentage:.2f}%", number_format)
+            ws.write_string(row_num, 7, record.created_by.get_full_name())
+            ws.write_string(row_num, 8, verified_by)
+
+        # Summary sheet
+        ws_summary = wb.add_worksheet("Summary")
+        ws_summary.set_column(0, 1, 20)
+        ws_summary.write_row(0, 0, ['Metric', 'Value'], header_format)
+        summary_data = [
+            ['Date Range', f"{start_date} to {end_date}"],
+            ['Total FTQ Records', summary['record_count']],
+            ['Total Production', total_inspected],
+            ['Total Rejects', total_defects],
+            ['Overall FTQ', f"{overall_ftq:.2f}%"]
+        ]
+        for row_num, row in enumerate(summary_data, 1):
+            ws_summary.write_row(row_num, 0, row)
+
+        # Defects sheet, already sorted by count
+        ws_defects = wb.add_worksheet("Defects")
+        ws_defects.set_column(0, 2, 20)
+        ws_defects.write_row(0, 0, ['Defect Type', 'Count', '% of Total'], header_format)
+        for row_num, row in enumerate(rollup_defects(rollups), 1):
+            percentage = rate(row['total_count'], total_defects)
+            ws_defects.write_row(row_num, 0, [row['name'], row['total_count'], f"{percentage:.2f}%"])
+
+    return streamed_xlsx_response(build, f'ftq_report_{start_date}_to_{end_date}.xlsx')
+
+
+@login_required
+def export_readings(request):
+    """
+    Stream individual readings as CSV (default) or JSON lines (?format=jsonl)
+    for a date range, optionally narrowed to a model and parameter group
+    """
+    from django.http import StreamingHttpResponse
+    from django.utils.dateparse import parse_date
+    from .readings_utils import READING_GROUPS, csv_stream, jsonl_stream, reading_rows
+
+    today = timezone.localdate()
+    try:
+        start_date = parse_date(request.GET.get('start_date') or '') or today - timedelta(days=30)
+        end_date = parse_date(request.GET.get('end_date') or '') or today
+    except ValueError:
+        # Well formed but impossible, e.g. 2026-02-30
+        return JsonResponse({'status': 'error', 'message': 'Dates must be valid YYYY-MM-DD dates'}, status=400)
+    model_name = request.GET.get('model_name') or None
+    parameter_group = request.GET.get('parameter_group') or None
+    output_format = request.GET.get('format', 'csv')
+
+    if parameter_group and parameter_group not in READING_GROUPS:
+        return JsonResponse({'status': 'error', 'message': f'Unknown parameter group: {parameter_group}'}, status=400)
+    if output_format not in ('csv', 'jsonl'):
+        return JsonResponse({'status': 'error', 'message': 'Format must be csv or jsonl'}, status=400)
+
+    rows = reading_rows(start_date, end_date, model_name, parameter_group)
+    if output_format == 'jsonl':
+        response = StreamingHttpResponse(jsonl_stream(rows), content_type='application/x-ndjson')
     else:
-        overall_ftq = 0
-    
-    # Add summary data
-    summary_data = [
-        ['Date Range', f"{start_date} to {end_date}"],
-        ['Total FTQ Records', ftq_records.count()],
-        ['Total Production', total_inspected],
-        ['Total Rejects', total_defects],
-        ['Overall FTQ', f"{overall_ftq:.2f}%"]
-    ]
-    
-    for row_num, (metric, value) in enumerate(summary_data, 2):
-        ws_summary.cell(row=row_num, column=1, value=metric)
-        ws_summary.cell(row=row_num, column=2, value=value)
-    
-    # Auto adjust column widths
-    for col_num, _ in enumerate(summary_headers, 1):
-        col_letter = get_column_letter(col_num)
-        ws_summary.column_dimensions[col_letter].width = 20
-    
-    # Add defects sheet
-    ws_defects = wb.create_sheet(title="Defects")
-    
-    # Get defect records
-    defect_records = DefectRecord.objects.filter(
-        ftq_record__in=ftq_records
-    ).select_related('defect_type', 'defect_type_custom', 'ftq_record')
-    
-    # Group defects by type
-    defects_by_type = {}
-    for record in defect_records:
-        defect_name = record.defect_type.name if record.defect_type else record.defect_type_custom.name
-        if defect_name not in defects_by_type:
-            defects_by_type[defect_name] = 0
-        defects_by_type[defect_name] += record.count
-    
-    # Sort defects by count
-    sorted_defects = sorted(defects_by_type.items(), key=lambda x: x[1], reverse=True)
-    
-    # Add defect headers
-    defect_headers = ['Defect Type', 'Count', '% of Total']
-    for col_num, header in enumerate(defect_headers, 1):
-        cell = ws_defects.cell(row=1, column=col_num, value=header)
-        cell.fill = header_style['fill']
-        cell.font = header_style['font']
-        cell.alignment = header_style['alignment']
-    
-    # Add defect data
-    for row_num, (defect_name, count) in enumerate(sorted_defects, 2):
-        percentage = (count / total_defects * 100) if total_defects > 0 else 0
-        
-        ws_defects.cell(row=row_num, column=1, value=defect_name)
-        ws_defects.cell(row=row_num, column=2, value=count)
-        ws_defects.cell(row=row_num, column=3, value=f"{percentage:.2f}%")
-    
-    # Auto adjust column widths
-    for col_num, _ in enumerate(defect_headers, 1):
-        col_letter = get_column_letter(col_num)
-        ws_defects.column_dimensions[col_letter].width = 20
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename=ftq_report_{start_date}_to_{end_date}.xlsx'
-    
-    wb.save(response)
-    return response 
+        response = StreamingHttpResponse(csv_stream(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename=readings_{start_date}_to_{end_date}.{output_format}'
+    return response
+
+
+@login_required
+def reading_stats_api(request):
+    """
+    Reading statistics per parameter group for a date range (optionally one
+    model), plus X-bar/R series when a numeric ?parameter_group= is given
+    """
+    from django.utils.dateparse import parse_date
+    from .readings_utils import SPEC_LIMITS, reading_statistics, xbar_r
+
+    today = timezone.localdate()
+    try:
+        start_date = parse_date(request.GET.get('start_date') or '') or today - timedelta(days=30)
+        end_date = parse_date(request.GET.get('end_date') or '') or today
+    except ValueError:
+        # Well formed but impossible, e.g. 2026-02-30
+        return JsonResponse({'status': 'error', 'message': 'Dates must be valid YYYY-MM-DD dates'}, status=400)
+    model_name = request.GET.get('model_name') or None
+    parameter_group = request.GET.get('parameter_group') or None
+
+    if parameter_group and parameter_group not in SPEC_LIMITS:
+        return JsonResponse(
+            {'status': 'error', 'message': f'No X-bar/R for parameter group: {parameter_group}'}, status=400
+        )
+
+    data = {
+        'status': 'success',
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'statistics': reading_statistics(start_date, end_date, model_name),
+    }
+    if parameter_group:
+        series = xbar_r(start_date, end_date, parameter_group, model_name)
+        series['timestamps'] = [timezone.localtime(t).isoformat() for t in series['timestamps']]
+        data['xbar_r'] = series
+    return JsonResponse(data)
 
 
 
@@ -6272,7 +5679,7 @@ def dtpm_create(request):
     context = {
         'form': form,
         'title': 'Create DTPM Checklist',
-        'current_shift': f"{'Day' if 8 <= timezone.now().hour < 20 else 'Night'} Shift",
+        'current_shift': dict(Shift.SHIFT_CHOICES).get(shift_calendar.current_shift_type(), ''),
         'is_supervisor': is_supervisor
     }
     
@@ -6583,140 +5990,69 @@ def dtpm_dashboard(request):
 @login_required
 def export_dtpm_excel(request, pk):
     """Export a DTPM checklist to Excel"""
-    from openpyxl import Workbook
-    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    
-    checklist = get_object_or_404(
-        DTPMChecklistFMA03.objects.select_related('shift', 'operator', 'supervisor'),
-        pk=pk
-    )
-    
-    # Get all check results for this checklist
-    check_results = DTPMCheckResult.objects.filter(checklist=checklist).order_by('item_number')
-    
-    # Create Excel workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "DTPM Checklist"
-    
-    # Define styles
-    header_style = {
-        'fill': PatternFill(start_color='1F4E78', end_color='1F4E78', fill_type='solid'),
-        'font': Font(color='FFFFFF', bold=True),
-        'alignment': Alignment(horizontal='center', vertical='center')
-    }
-    
-    ok_style = {
-        'fill': PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid'),
-        'font': Font(color='006100'),
-        'alignment': Alignment(horizontal='center')
-    }
-    
-    ng_style = {
-        'fill': PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid'),
-        'font': Font(color='9C0006'),
-        'alignment': Alignment(horizontal='center')
-    }
-    
-    # Add title
-    ws.merge_cells('A1:G1')
-    title_cell = ws['A1']
-    title_cell.value = "DTPM FMA03 Operation 35 Checklist"
-    title_cell.font = Font(size=14, bold=True)
-    title_cell.alignment = Alignment(horizontal='center')
-    
-    # Add basic info
-    ws['A3'] = "Date:"
-    ws['B3'] = checklist.date
-    
-    ws['D3'] = "Shift:"
-    ws['E3'] = checklist.shift.get_shift_type_display()
-    
-    ws['A4'] = "Operator:"
-    ws['B4'] = checklist.operator.username
-    
-    ws['D4'] = "Status:"
-    ws['E4'] = checklist.get_status_display()
-    
-    # Add headers for check items
-    headers = ['Item #', 'Description', 'Result', 'Comments', 'Checked By', 'Checked At']
-    
-    for col_idx, header in enumerate(headers, 1):
-        cell = ws.cell(row=6, column=col_idx, value=header)
-        cell.fill = header_style['fill']
-        cell.font = header_style['font']
-        cell.alignment = header_style['alignment']
-    
-    # Add check results
-    for row_idx, check in enumerate(check_results, 7):
-        ws.cell(row=row_idx, column=1, value=check.item_number)
-        
-        # Get description from the CHECK_ITEMS choices
-        description = next((desc for code, desc in DTPMCheckResult.CHECK_ITEMS if code == check.item_number), '')
-        ws.cell(row=row_idx, column=2, value=description)
-        
-        # Add result with color-coding
-        result_cell = ws.cell(row=row_idx, column=3, value=check.result)
-        if check.result == 'OK':
-            result_cell.fill = ok_style['fill']
-            result_cell.font = ok_style['font']
-            result_cell.alignment = ok_style['alignment']
-        elif check.result == 'NG':
-            result_cell.fill = ng_style['fill']
-            result_cell.font = ng_style['font']
-            result_cell.alignment = ng_style['alignment']
-        
-        ws.cell(row=row_idx, column=4, value=check.comments)
-        ws.cell(row=row_idx, column=5, value=check.checked_by.username if check.checked_by else '')
-        ws.cell(row=row_idx, column=6, value=check.checked_at)
-    
-    # Add issues section if there are any
-    issues = DTPMIssue.objects.filter(check_result__checklist=checklist).select_related('check_result', 'reported_by')
-    
-    if issues.exists():
-        # Add header for issues section
-        row_idx = len(check_results) + 9  # Leave a gap after check results
-        
-        ws.merge_cells(f'A{row_idx}:G{row_idx}')
-        issues_header = ws[f'A{row_idx}']
-        issues_header.value = "Issues"
-        issues_header.font = Font(size=12, bold=True)
-        
-        # Add issue headers
-        issue_headers = ['Check Item', 'Description', 'Priority', 'Status', 'Reported By', 'Created At']
-        row_idx += 1
-        
-        for col_idx, header in enumerate(issue_headers, 1):
-            cell = ws.cell(row=row_idx, column=col_idx, value=header)
-            cell.fill = header_style['fill']
-            cell.font = header_style['font']
-            cell.alignment = header_style['alignment']
-        
-        # Add issues
-        for issue_idx, issue in enumerate(issues, 1):
-            row_idx += 1
-            
-            ws.cell(row=row_idx, column=1, value=issue.check_result.item_number)
-            ws.cell(row=row_idx, column=2, value=issue.description)
-            ws.cell(row=row_idx, column=3, value=issue.get_priority_display())
-            ws.cell(row=row_idx, column=4, value=issue.get_status_display())
-            ws.cell(row=row_idx, column=5, value=issue.reported_by.username if issue.reported_by else '')
-            ws.cell(row=row_idx, column=6, value=issue.created_at)
-    
-    # Adjust column widths
-    col_widths = [10, 50, 10, 30, 15, 20]
-    for i, width in enumerate(col_widths, 1):
-        ws.column_dimensions[get_column_letter(i)].width = width
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    from .export_utils import DTPM_EXPORT, render_workbook, workbook_response
+
+    from .export_cache import cached_export_response, fingerprint
+
+    checklist = get_object_or_404(DTPM_EXPORT.prefetch(DTPMChecklistFMA03.objects.all()), pk=pk)
+
+    def render():
+        return render_workbook(DTPM_EXPORT, [checklist])
+
+    if checklist.status != 'verified':
+        return workbook_response(render(), DTPM_EXPORT.filename(checklist))
+
+    # Issues are still worked on after verification, and neither they nor
+    # the check results bump the checklist's updated_at
+    check_results = list(checklist.check_results.all())
+    issues = [issue for check in check_results for issue in check.issues.all()]
+    version = fingerprint(
+        checklist, checklist.shift, checklist.operator,
+        *check_results, *(check.checked_by for check in check_results),
+        *issues, *(issue.reported_by for issue in issues)
     )
-    response['Content-Disposition'] = f'attachment; filename=dtpm_checklist_{checklist.date}.xlsx'
-    
-    wb.save(response)
-    return response
+    return cached_export_response(request, 'dtpm', pk, version, render, DTPM_EXPORT.filename(checklist))
+
+
+@login_required
+def export_dtpm_excel_batch(request):
+    """Export several DTPM checklists (?ids= or a date range) as one workbook, one sheet each"""
+    from .export_utils import DTPM_EXPORT
+    return _batch_excel_export(request, DTPM_EXPORT, DTPMChecklistFMA03.objects.all(), 'dtpm_checklists')
+
+
+def _batch_excel_export(request, spec, queryset, filename_prefix):
+    """
+    Shared batch mode of the generated exports: selects objects by ``ids``
+    (repeated or comma-separated) or by ``start_date``/``end_date``, loads
+    them with the export's prefetch plan and renders them in one pass.
+    """
+    from django.utils.dateparse import parse_date
+    from .export_utils import render_workbook, workbook_response
+
+    ids = [
+        int(value) for param in request.GET.getlist('ids')
+        for value in param.split(',') if value.strip().isdigit()
+    ]
+    try:
+        start_date = parse_date(request.GET.get('start_date') or '')
+        end_date = parse_date(request.GET.get('end_date') or '')
+    except ValueError:
+        # Well formed but impossible, e.g. 2026-02-30
+        return JsonResponse({'status': 'error', 'message': 'Dates must be valid YYYY-MM-DD dates'}, status=400)
+
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+        label = f'{len(ids)}_items'
+    elif start_date and end_date:
+        queryset = queryset.filter(date__range=[start_date, end_date])
+        label = f'{start_date}_to_{end_date}'
+    else:
+        return JsonResponse({'status': 'error', 'message': 'Pass ids or a start_date and end_date'}, status=400)
+
+    objects = spec.prefetch(queryset.order_by('date', 'pk'))
+    wb = render_workbook(spec, objects)
+    return workbook_response(wb, f'{filename_prefix}_{label}.xlsx')
 
 
 @login_required
@@ -6810,8 +6146,12 @@ def ep_check_list(request):
     return render(request, 'main/operations/ep_check_list.html', context)
 
 
+import copy
+
 from .models import ErrorPreventionCheck, ErrorPreventionMechanismStatus
-from .history_utils import create_initial_history, get_ep_check_timeline
+from .history_utils import (
+    create_initial_history, get_ep_check_timeline, history_recorder, record_history, track_mechanism_changes,
+)
 
 
 @login_required
@@ -6904,7 +6244,7 @@ def ep_check_edit(request, pk):
         
         if form.is_valid():
             try:
-                with transaction.atomic():
+                with transaction.atomic(), history_recorder():
                     # Save the main EP check
                     ep_check = form.save()
                     
@@ -6927,32 +6267,32 @@ def ep_check_edit(request, pk):
                         
                         # Track changes
                         if status.status != new_status and not new_is_na:
-                            ErrorPreventionMechanismHistory.objects.create(
+                            record_history(ErrorPreventionMechanismHistory(
                                 mechanism_status=status,
                                 changed_by=request.user,
                                 field_name='status',
                                 old_value=status.status,
                                 new_value=new_status
-                            )
+                            ))
                             changes_made.append(f"{status.mechanism.mechanism_id}: {status.status} → {new_status}")
                         
                         if status.is_not_applicable != new_is_na:
-                            ErrorPreventionMechanismHistory.objects.create(
+                            record_history(ErrorPreventionMechanismHistory(
                                 mechanism_status=status,
                                 changed_by=request.user,
                                 field_name='is_not_applicable',
                                 old_value=str(status.is_not_applicable),
                                 new_value=str(new_is_na)
-                            )
+                            ))
                         
                         if status.comments != new_comments:
-                            ErrorPreventionMechanismHistory.objects.create(
+                            record_history(ErrorPreventionMechanismHistory(
                                 mechanism_status=status,
                                 changed_by=request.user,
                                 field_name='comments',
                                 old_value=status.comments,
                                 new_value=new_comments
-                            )
+                            ))
                         
                         # Update the status
                         status.status = '' if new_is_na else new_status
@@ -6966,13 +6306,13 @@ def ep_check_edit(request, pk):
                         status.save()
                     
                     # Create EP check history entry
-                    ErrorPreventionCheckHistory.objects.create(
+                    record_history(ErrorPreventionCheckHistory(
                         ep_check=ep_check,
                         changed_by=request.user,
                         action='updated',
                         description=f'EP check updated. Changes: {", ".join(changes_made) if changes_made else "No mechanism changes"}',
                         additional_data={'changes': changes_made}
-                    )
+                    ))
                     
                     messages.success(request, 'EP check updated successfully!')
                     return redirect('ep_check_detail', pk=ep_check.pk)
@@ -7129,8 +6469,12 @@ def ep_check_edit_statuses(request, pk):
     
     if request.method == 'POST':
         formset = ErrorPreventionStatusFormSet(request.POST, instance=ep_check)
+        # Forms edit these instances in place during validation; keep the originals for history
+        originals = {status.pk: copy.copy(status) for status in formset.get_queryset()}
         if formset.is_valid():
-            formset.save()
+            with transaction.atomic(), history_recorder():
+                for status in formset.save():
+                    track_mechanism_changes(originals.get(status.pk), status, request.user)
             messages.success(request, 'Mechanism statuses updated successfully.')
             return redirect('ep_check_detail', pk=ep_check.pk)
         else:
@@ -7139,7 +6483,9 @@ def ep_check_edit_statuses(request, pk):
         formset = ErrorPreventionStatusFormSet(instance=ep_check)
     
     # Get mechanism details for displaying names
-    mechanism_choices = dict(ErrorPreventionCheck.EP_MECHANISM_CHOICES)
+    mechanism_choices = dict(
+        ErrorPreventionMechanism.objects.filter(is_active=True).values_list('mechanism_id', 'description')
+    )
     
     context = {
         'ep_check': ep_check,
@@ -7389,15 +6735,20 @@ def start_ep_workflow(request):
                         comments=form.cleaned_data['comments']
                     )
                     
-                    # Create mechanism statuses
-                    for i, mech_id in enumerate(dict(ErrorPreventionCheck.EP_MECHANISM_CHOICES).keys(), 1):
+                    # Create mechanism statuses from the master list
+                    mechanisms = ErrorPreventionMechanism.objects.filter(
+                        is_active=True,
+                        applicable_models__icontains=ep_check.current_model
+                    ).order_by('display_order')
+                    for mechanism in mechanisms:
                         ErrorPreventionMechanismStatus.objects.create(
                             ep_check=ep_check,
-                            ep_mechanism_id=mech_id,
-                            is_working=True,
+                            mechanism=mechanism,
+                            ep_mechanism_id=mechanism.mechanism_id,
+                            is_working=mechanism.is_currently_working,
                             is_not_applicable=False,
                             status='OK',  # Default to OK
-                            alternative_method='100% Inspection By Operator',
+                            alternative_method=mechanism.default_alternative_method,
                             comments=''
                         )
                     
@@ -7448,12 +6799,7 @@ def ep_check_dashboard(request):
     ).select_related('verification_status__shift', 'operator')
     
     # Calculate summary statistics
-    stats = {
-        'total_checks': ep_checks.count(),
-        'approved_count': ep_checks.filter(status='quality_approved').count(),
-        'rejected_count': ep_checks.filter(status='rejected').count(),
-        'pending_count': ep_checks.filter(status__in=['pending', 'supervisor_approved']).count(),
-    }
+    stats = status_breakdown(ep_checks, EP_CHECK_STATUS_BUCKETS)
     
     # Add derived statistics
     if stats['total_checks'] > 0:
@@ -7477,16 +6823,20 @@ def ep_check_dashboard(request):
         is_active=True
     ).order_by('display_order', 'mechanism_id')
     
+    # Status counts for every mechanism in one grouped query
+    counts_by_mechanism = status_breakdown(
+        mechanism_statuses, MECHANISM_STATUS_BUCKETS, group_by='mechanism'
+    )
+    
     # Calculate statistics by mechanism using the master mechanism list
     mechanism_stats = {}
     for mechanism in active_mechanisms:
-        # Get all statuses for this mechanism
-        statuses = mechanism_statuses.filter(mechanism=mechanism)
+        counts = counts_by_mechanism.get(mechanism.id) or empty_breakdown(MECHANISM_STATUS_BUCKETS)
         
-        total = statuses.count()
-        ok_count = statuses.filter(status='OK').count()
-        ng_count = statuses.filter(status='NG').count()
-        na_count = statuses.filter(is_not_applicable=True).count()
+        total = counts['total']
+        ok_count = counts['ok_count']
+        ng_count = counts['ng_count']
+        na_count = counts['na_count']
         
         applicable_count = total - na_count
         
@@ -7516,12 +6866,19 @@ def ep_check_dashboard(request):
         'ng_counts': [m_stats['ng_count'] for m_id, m_stats in mechanism_stats.items()]
     }
     
+    # Daily counts for the whole range in one grouped query
+    all_dates, daily_series = time_series(ep_checks, 'date', start_date, end_date, {
+        'total': None,
+        'approved': Q(status='quality_approved'),
+        'rejected': Q(status='rejected'),
+    })
+    daily_counts = {
+        day: (daily_series['total'][i], daily_series['approved'][i], daily_series['rejected'][i])
+        for i, day in enumerate(all_dates)
+    }
+    
     # Generate time series data for trend chart
-    date_range = []
-    current_date = start_date
-    while current_date <= end_date:
-        date_range.append(current_date)
-        current_date += timedelta(days=1)
+    date_range = list(all_dates)
     
     # Format date range based on total days
     if days <= 14:
@@ -7559,18 +6916,20 @@ def ep_check_dashboard(request):
     
     for date in date_range:
         if days <= 14:
-            day_checks = ep_checks.filter(date=date)
+            period_end = date
         elif days <= 90:
-            week_end = date + timedelta(days=6)
-            day_checks = ep_checks.filter(date__range=[date, min(week_end, end_date)])
+            period_end = min(date + timedelta(days=6), end_date)
         else:
             month_end = date.replace(day=28) + timedelta(days=4)
-            month_end = month_end.replace(day=1) - timedelta(days=1)
-            day_checks = ep_checks.filter(date__range=[date, min(month_end, end_date)])
+            period_end = min(month_end.replace(day=1) - timedelta(days=1), end_date)
         
-        total_counts.append(day_checks.count())
-        approved_counts.append(day_checks.filter(status='quality_approved').count())
-        rejected_counts.append(day_checks.filter(status='rejected').count())
+        # Sum the daily counts falling in this period
+        period_counts = [
+            counts for day, counts in daily_counts.items() if date <= day <= period_end
+        ]
+        total_counts.append(sum(counts[0] for counts in period_counts))
+        approved_counts.append(sum(counts[1] for counts in period_counts))
+        rejected_counts.append(sum(counts[2] for counts in period_counts))
     
     # Package trend data for the template
     trends_data = {
@@ -7599,166 +6958,35 @@ def ep_check_dashboard(request):
 @login_required
 def export_ep_excel(request, pk):
     """Export an EP check to Excel"""
-    from openpyxl import Workbook
-    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    
-    ep_check = get_object_or_404(
-        ErrorPreventionCheck.objects.select_related(
-            'verification_status__shift', 'operator', 'supervisor', 'quality_supervisor'
-        ),
-        pk=pk
-    )
-    
-    # Get all mechanism statuses
-    mechanism_statuses = ErrorPreventionMechanismStatus.objects.filter(
-        ep_check=ep_check
-    ).order_by('ep_mechanism_id')
-    
-    # Create Excel workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "EP Check"
-    
-    # Define styles
-    header_style = {
-        'fill': PatternFill(start_color='1F4E78', end_color='1F4E78', fill_type='solid'),
-        'font': Font(color='FFFFFF', bold=True),
-        'alignment': Alignment(horizontal='center', vertical='center')
-    }
-    
-    ok_style = {
-        'fill': PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid'),
-        'font': Font(color='006100'),
-        'alignment': Alignment(horizontal='center')
-    }
-    
-    ng_style = {
-        'fill': PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid'),
-        'font': Font(color='9C0006'),
-        'alignment': Alignment(horizontal='center')
-    }
-    
-    na_style = {
-        'fill': PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid'),
-        'font': Font(color='9C6500'),
-        'alignment': Alignment(horizontal='center')
-    }
-    
-    # Add title
-    ws.merge_cells('A1:G1')
-    title_cell = ws['A1']
-    title_cell.value = "Error Prevention Check Master List"
-    title_cell.font = Font(size=14, bold=True)
-    title_cell.alignment = Alignment(horizontal='center')
-    
-    # Add basic info
-    ws['A3'] = "Date:"
-    ws['B3'] = ep_check.date
-    
-    ws['D3'] = "Shift:"
-    ws['E3'] = ep_check.verification_status.shift.get_shift_type_display()
-    
-    ws['A4'] = "Operator:"
-    ws['B4'] = ep_check.operator.username
-    
-    ws['D4'] = "Model:"
-    ws['E4'] = ep_check.current_model
-    
-    ws['A5'] = "Status:"
-    ws['B5'] = ep_check.get_status_display()
-    
-    # Add headers for mechanisms
-    headers = ['Mechanism ID', 'Description', 'Status', 'N/A', 'Working', 'Alternative Method', 'Comments']
-    
-    for col_idx, header in enumerate(headers, 1):
-        cell = ws.cell(row=7, column=col_idx, value=header)
-        cell.fill = header_style['fill']
-        cell.font = header_style['font']
-        cell.alignment = header_style['alignment']
-    
-    # Add mechanism statuses
-    mechanism_choices = dict(ErrorPreventionCheck.EP_MECHANISM_CHOICES)
-    
-    for row_idx, status in enumerate(mechanism_statuses, 8):
-        # Mechanism ID
-        ws.cell(row=row_idx, column=1, value=status.ep_mechanism_id)
-        
-        # Description
-        description = mechanism_choices.get(status.ep_mechanism_id, 'Unknown')
-        ws.cell(row=row_idx, column=2, value=description)
-        
-        # Status with color-coding
-        result_cell = ws.cell(row=row_idx, column=3, value=status.status)
-        if status.is_not_applicable:
-            result_cell.value = 'N/A'
-            result_cell.fill = na_style['fill']
-            result_cell.font = na_style['font']
-            result_cell.alignment = na_style['alignment']
-        elif status.status == 'OK':
-            result_cell.fill = ok_style['fill']
-            result_cell.font = ok_style['font']
-            result_cell.alignment = ok_style['alignment']
-        elif status.status == 'NG':
-            result_cell.fill = ng_style['fill']
-            result_cell.font = ng_style['font']
-            result_cell.alignment = ng_style['alignment']
-        
-        # N/A indicator
-        ws.cell(row=row_idx, column=4, value='Yes' if status.is_not_applicable else 'No')
-        
-        # Working
-        ws.cell(row=row_idx, column=5, value='Yes' if status.is_working else 'No')
-        
-        # Alternative Method
-        ws.cell(row=row_idx, column=6, value=status.alternative_method)
-        
-        # Comments
-        ws.cell(row=row_idx, column=7, value=status.comments)
-    
-    # Add verification section
-    row_idx = len(mechanism_statuses) + 10  # Leave a gap after mechanisms
-    
-    ws.merge_cells(f'A{row_idx}:G{row_idx}')
-    verification_header = ws[f'A{row_idx}']
-    verification_header.value = "Verification Details"
-    verification_header.font = Font(size=12, bold=True)
-    
-    row_idx += 2
-    ws.cell(row=row_idx, column=1, value="Operator:")
-    ws.cell(row=row_idx, column=2, value=ep_check.operator.username)
-    
-    row_idx += 1
-    ws.cell(row=row_idx, column=1, value="Supervisor:")
-    ws.cell(row=row_idx, column=2, value=ep_check.supervisor.username if ep_check.supervisor else 'Not verified')
-    
-    row_idx += 1
-    ws.cell(row=row_idx, column=1, value="Quality Supervisor:")
-    ws.cell(row=row_idx, column=2, value=ep_check.quality_supervisor.username if ep_check.quality_supervisor else 'Not verified')
-    
-    row_idx += 2
-    ws.cell(row=row_idx, column=1, value="Comments:")
-    ws.cell(row=row_idx, column=2, value=ep_check.comments)
-    ws.merge_cells(f'B{row_idx}:G{row_idx}')
-    
-    # Add verification status info
-    row_idx += 2
-    ws.cell(row=row_idx, column=1, value="Verification Status:")
-    ws.cell(row=row_idx, column=2, value=ep_check.verification_status.get_status_display())
-    
-    # Adjust column widths
-    col_widths = [15, 40, 10, 10, 10, 25, 30]
-    for i, width in enumerate(col_widths, 1):
-        ws.column_dimensions[get_column_letter(i)].width = width
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    from .export_utils import EP_EXPORT, render_workbook, workbook_response
+
+    from .export_cache import cached_export_response, fingerprint
+
+    ep_check = get_object_or_404(EP_EXPORT.prefetch(ErrorPreventionCheck.objects.all()), pk=pk)
+
+    def render():
+        return render_workbook(EP_EXPORT, [ep_check])
+
+    if ep_check.status != 'quality_approved':
+        return workbook_response(render(), EP_EXPORT.filename(ep_check))
+
+    # The mechanism statuses, their master mechanisms and the verification
+    # status are separate rows that change without bumping updated_at
+    statuses = list(ep_check.mechanism_statuses.all())
+    verification_status = ep_check.verification_status
+    version = fingerprint(
+        ep_check, verification_status, verification_status and verification_status.shift,
+        ep_check.operator, ep_check.supervisor, ep_check.quality_supervisor,
+        *statuses, *(status.mechanism for status in statuses)
     )
-    response['Content-Disposition'] = f'attachment; filename=ep_check_{ep_check.date}.xlsx'
-    
-    wb.save(response)
-    return response
+    return cached_export_response(request, 'ep', pk, version, render, EP_EXPORT.filename(ep_check))
+
+
+@login_required
+def export_ep_excel_batch(request):
+    """Export several EP checks (?ids= or a date range) as one workbook, one sheet each"""
+    from .export_utils import EP_EXPORT
+    return _batch_excel_export(request, EP_EXPORT, ErrorPreventionCheck.objects.all(), 'ep_checks')
 
 
 
@@ -7879,15 +7107,20 @@ def ep_check_from_verification(request, verification_id):
                     # Create the EP check
                     ep_check = form.save()
                     
-                    # Create default mechanism statuses
-                    for mech_id, _ in ErrorPreventionCheck.EP_MECHANISM_CHOICES:
+                    # Create default mechanism statuses from the master list
+                    mechanisms = ErrorPreventionMechanism.objects.filter(
+                        is_active=True,
+                        applicable_models__icontains=ep_check.current_model
+                    ).order_by('display_order')
+                    for mechanism in mechanisms:
                         ErrorPreventionMechanismStatus.objects.create(
                             ep_check=ep_check,
-                            ep_mechanism_id=mech_id,
-                            is_working=True,
+                            mechanism=mechanism,
+                            ep_mechanism_id=mechanism.mechanism_id,
+                            is_working=mechanism.is_currently_working,
                             is_not_applicable=False,
                             status='OK',  # Default value
-                            alternative_method='100% Inspection By Operator'
+                            alternative_method=mechanism.default_alternative_method
                         )
                     
                     messages.success(request, 'Error Prevention check created successfully.')
@@ -8236,9 +7469,10 @@ def get_dtpm_dashboard_stats(verification_status):
         }
     
     # Calculate checkpoint statistics
-    total_checkpoints = dtpm_checklist.check_results.count()
-    ok_count = dtpm_checklist.check_results.filter(status='OK').count()
-    ng_count = dtpm_checklist.check_results.filter(status='NG').count()
+    counts = status_breakdown(dtpm_checklist.check_results.all(), CHECK_RESULT_BUCKETS)
+    total_checkpoints = counts['total']
+    ok_count = counts['ok_count']
+    ng_count = counts['ng_count']
     
     return {
         'exists': True,
@@ -8248,7 +7482,7 @@ def get_dtpm_dashboard_stats(verification_status):
         'ng_count': ng_count,
         'completion_percentage': (ok_count / total_checkpoints * 100) if total_checkpoints > 0 else 0,
         'current_model': dtpm_checklist.current_model,
-        'shift': dtmp_checklist.checklist_shift,
+        'shift': dtpm_checklist.checklist_shift,
         'can_create': False
     }
 
@@ -8736,26 +7970,18 @@ def dtpm_new_dashboard(request):
         date__range=[start_date, end_date]
     ).select_related('shift', 'operator', 'verification_status')
     
-    # Get checklists from previous period for trend calculation
-    prev_checklists = DTPMChecklistFMA03New.objects.filter(
-        date__range=[prev_start_date, prev_end_date]
-    )
-    
-    # Calculate summary statistics
-    stats = {
-        'total_checklists': checklists.count(),
-        'verified_count': checklists.filter(status='quality_certified').count(),
-        'rejected_count': checklists.filter(status__in=['rejected', 'quality_rejected']).count(),
-        'pending_count': checklists.filter(status__in=['pending', 'supervisor_approved']).count(),
-    }
-    
-    # Calculate previous period statistics
-    prev_stats = {
-        'total_checklists': prev_checklists.count(),
-        'verified_count': prev_checklists.filter(status='quality_certified').count(),
-        'rejected_count': prev_checklists.filter(status__in=['rejected', 'quality_rejected']).count(),
-        'pending_count': prev_checklists.filter(status__in=['pending', 'supervisor_approved']).count(),
+    # Current and previous period statistics in one query
+    periods = {
+        'current': Q(date__range=[start_date, end_date]),
+        'previous': Q(date__range=[prev_start_date, prev_end_date]),
     }
+    period_stats = status_breakdown(
+        DTPMChecklistFMA03New.objects.filter(date__range=[prev_start_date, end_date]),
+        DTPM_CHECKLIST_STATUS_BUCKETS,
+        periods=periods
+    )
+    stats = period_stats['current']
+    prev_stats = period_stats['previous']
     
     if stats['total_checklists'] > 0:
         stats['completion_rate'] = ((stats['verified_count'] + stats['rejected_count']) / stats['total_checklists']) * 100
@@ -8790,41 +8016,36 @@ def dtpm_new_dashboard(request):
         is_active=True
     ).exclude(checkpoint_number=8).order_by('order', 'checkpoint_number')
     
-    # Calculate statistics by checkpoint
+    # Calculate statistics by checkpoint: both periods, all checkpoints, one query
     checkpoint_stats = {}
-    prev_checkpoint_stats = {}
+    counts_by_checkpoint = status_breakdown(
+        DTPMCheckResultNew.objects.filter(
+            checklist__date__range=[prev_start_date, end_date]
+        ),
+        CHECK_RESULT_BUCKETS,
+        periods={
+            'current': Q(checklist__date__range=[start_date, end_date]),
+            'previous': Q(checklist__date__range=[prev_start_date, prev_end_date]),
+        },
+        group_by='checkpoint'
+    )
+    no_results = {
+        'current': empty_breakdown(CHECK_RESULT_BUCKETS),
+        'previous': empty_breakdown(CHECK_RESULT_BUCKETS),
+    }
     
-    # First collect previous period stats
     for checkpoint in active_checkpoints:
-        prev_results = DTPMCheckResultNew.objects.filter(
-            checklist__in=prev_checklists,
-            checkpoint=checkpoint
-        )
-        
-        prev_total = prev_results.count()
-        prev_ok_count = prev_results.filter(status='OK').count()
+        counts = counts_by_checkpoint.get(checkpoint.id, no_results)
         
-        prev_ok_rate = (prev_ok_count / prev_total) * 100 if prev_total > 0 else 0
-            
-        prev_checkpoint_stats[checkpoint.checkpoint_number] = {
-            'ok_rate': prev_ok_rate
-        }
-    
-    # Now collect current period stats with comparison
-    for checkpoint in active_checkpoints:
-        results = DTPMCheckResultNew.objects.filter(
-            checklist__in=checklists,
-            checkpoint=checkpoint
-        )
-        
-        total = results.count()
-        ok_count = results.filter(status='OK').count()
-        ng_count = results.filter(status='NG').count()
+        total = counts['current']['total']
+        ok_count = counts['current']['ok_count']
+        ng_count = counts['current']['ng_count']
         
         ok_rate = (ok_count / total) * 100 if total > 0 else 0
         
-        # Calculate change from previous period    
-        prev_ok_rate = prev_checkpoint_stats.get(checkpoint.checkpoint_number, {}).get('ok_rate', 0)
+        # Calculate change from previous period
+        prev_total = counts['previous']['total']
+        prev_ok_rate = (counts['previous']['ok_count'] / prev_total) * 100 if prev_total > 0 else 0
         change = ok_rate - prev_ok_rate
             
         checkpoint_stats[checkpoint.checkpoint_number] = {
@@ -8854,26 +8075,22 @@ def dtpm_new_dashboard(request):
         ]
     }
     
-    # Prepare trend line chart data (daily data within selected range)
-    date_range = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        date_range.append(current_date)
-        current_date += timedelta(days=1)
+    # Prepare trend line chart data (daily data within selected range, one query)
+    date_range, daily_series = time_series(
+        checklists, 'date', start_date, end_date, DTPM_CHECKLIST_STATUS_BUCKETS
+    )
     
     success_rates = []
     completion_rates = []
     checklist_counts = []
     
     # Calculate daily statistics
-    for day in date_range:
-        day_checklists = checklists.filter(date=day)
-        day_count = day_checklists.count()
+    for index, day in enumerate(date_range):
+        day_count = daily_series['total_checklists'][index]
         checklist_counts.append(day_count)
         
-        day_verified = day_checklists.filter(status='quality_certified').count()
-        day_rejected = day_checklists.filter(status__in=['rejected', 'quality_rejected']).count()
+        day_verified = daily_series['verified_count'][index]
+        day_rejected = daily_series['rejected_count'][index]
         
         if day_verified + day_rejected > 0:
             day_success_rate = (day_verified / (day_verified + day_rejected)) * 100
@@ -8903,22 +8120,26 @@ def dtpm_new_dashboard(request):
     start_week = start_date - timedelta(days=start_date.weekday())
     end_week = end_date + timedelta(days=(6 - end_date.weekday()))
     
+    weeks = []
     current_week_start = start_week
     while current_week_start <= end_week:
-        current_week_end = current_week_start + timedelta(days=6)
-        
-        week_checklists = checklists.filter(
-            date__range=[current_week_start, current_week_end]
-        )
-        
-        week_label = f"{current_week_start.strftime('%m/%d')} - {current_week_end.strftime('%m/%d')}"
+        weeks.append((current_week_start, current_week_start + timedelta(days=6)))
+        current_week_start += timedelta(days=7)
+    
+    # Every week's status counts in one query
+    weekly_counts = status_breakdown(
+        checklists,
+        DTPM_CHECKLIST_STATUS_BUCKETS,
+        periods={week: Q(date__range=list(week)) for week in weeks}
+    )
+    
+    for week in weeks:
+        week_label = f"{week[0].strftime('%m/%d')} - {week[1].strftime('%m/%d')}"
         weekly_data['weeks'].append(week_label)
         
-        weekly_data['verified'].append(week_checklists.filter(status='quality_certified').count())
-        weekly_data['rejected'].append(week_checklists.filter(status__in=['rejected', 'quality_rejected']).count())
-        weekly_data['pending'].append(week_checklists.filter(status__in=['pending', 'supervisor_approved']).count())
-        
-        current_week_start += timedelta(days=7)
+        weekly_data['verified'].append(weekly_counts[week]['verified_count'])
+        weekly_data['rejected'].append(weekly_counts[week]['rejected_count'])
+        weekly_data['pending'].append(weekly_counts[week]['pending_count'])
     
     context = {
         'stats': stats,
@@ -9056,6 +8277,8 @@ def checksheet_responses_list(request):
     # Filters
     status_filter = request.GET.get('status')
     checksheet_filter = request.GET.get('checksheet')
+    nok_filter = request.GET.get('nok')
+    sort = request.GET.get('sort')
     
     if status_filter:
         responses = responses.filter(status=status_filter)
@@ -9063,6 +8286,20 @@ def checksheet_responses_list(request):
     if checksheet_filter:
         responses = responses.filter(checksheet_id=checksheet_filter)
     
+    # Stored counters (see ChecksheetResponse.refresh_counters)
+    if nok_filter == 'yes':
+        responses = responses.filter(nok_count__gt=0)
+    elif nok_filter == 'no':
+        responses = responses.filter(nok_count=0)
+    
+    sort_fields = {
+        'completion': ('completion_pct', '-created_at'),
+        '-completion': ('-completion_pct', '-created_at'),
+        'nok': ('-nok_count', '-created_at'),
+    }
+    if sort in sort_fields:
+        responses = responses.order_by(*sort_fields[sort])
+    
     # Filter based on user role
     if request.user.user_type == 'operator':
         responses = responses.filter(filled_by=request.user)
@@ -9087,6 +8324,8 @@ def checksheet_responses_list(request):
         'checksheets': checksheets,
         'selected_status': status_filter,
         'selected_checksheet': checksheet_filter,
+        'selected_nok': nok_filter,
+        'selected_sort': sort,
         'page_title': 'Checksheet Responses',
         'total_count': total_count,
         'pending_count': pending_count,
@@ -9099,145 +8338,36 @@ def checksheet_responses_list(request):
 @login_required
 def create_checksheet_response(request, checksheet_id):
     """Create a new checksheet response"""
-    checksheet = get_object_or_404(
-        Checksheet.objects.prefetch_related(
-            Prefetch('sections', queryset=ChecksheetSection.objects.filter(is_active=True).order_by('order')),
-            Prefetch('sections__fields', queryset=ChecksheetField.objects.filter(is_active=True).order_by('order'))
-        ),
-        pk=checksheet_id,
-        is_active=True
-    )
+    from .checksheet_utils import read_field_values, save_field_responses, schema_cache
+
+    checksheet = get_object_or_404(Checksheet, pk=checksheet_id, is_active=True)
+    schema = schema_cache.get(checksheet.pk)
     
     if request.method == 'POST':
-        # Create response
-        response = ChecksheetResponse.objects.create(
-            checksheet=checksheet,
-            filled_by=request.user,
-            status='draft'
-        )
-        
-        # Process form data
-        selected_model = None
-        errors = []
-        
-        # First pass: collect selected model
-        for section in checksheet.sections.filter(is_active=True):
-            for field in section.fields.filter(is_active=True):
-                if 'Program selection' in field.label or 'program' in field.label.lower():
-                    field_key = f'field_{field.id}'
-                    selected_model = request.POST.get(field_key, '')
-                    break
-        
-        # Second pass: process all fields
-        for section in checksheet.sections.filter(is_active=True).order_by('order'):
-            for field in section.fields.filter(is_active=True).order_by('order'):
-                field_key = f'field_{field.id}'
-                status_key = f'status_{field.id}'
-                comment_key = f'comment_{field.id}'
-                
-                # Initialize variables
-                value = ''
-                status = ''
-                comment = request.POST.get(comment_key, '').strip()
-                
-                # CRITICAL FIX: Handle different field types correctly
-                if field.field_type == 'ok_nok':
-                    if field.has_status_field:
-                        # For fields with status, the OK/NOK is in status_key and actual value is in field_key
-                        status = request.POST.get(status_key, '').strip()
-                        value = request.POST.get(field_key, '').strip()
-                    else:
-                        # For simple OK/NOK fields, the value IS the OK/NOK selection
-                        value = request.POST.get(field_key, '').strip()
-                        status = ''  # No separate status
-                elif field.field_type == 'yes_no':
-                    if field.has_status_field:
-                        status = request.POST.get(status_key, '').strip()
-                        value = request.POST.get(field_key, '').strip()
-                    else:
-                        value = request.POST.get(field_key, '').strip()
-                        status = ''
-                else:
-                    # For all other field types
-                    value = request.POST.get(field_key, '').strip()
-                    if field.has_status_field:
-                        status = request.POST.get(status_key, '').strip()
-                
-                # Auto-fill based on model (only if value is empty)
-                if field.auto_fill_based_on_model and selected_model and field.model_value_mapping and not value:
-                    auto_value = field.get_value_for_model(selected_model)
-                    if auto_value:
-                        value = auto_value
-                
-                # VALIDATION
-                # Check if field is required
-                if field.is_required:
-                    # For OK/NOK fields without separate status, check the value
-                    if field.field_type == 'ok_nok' and not field.has_status_field:
-                        if not value:
-                            errors.append(f"{field.label} is required")
-                    # For fields with status field, check status
-                    elif field.has_status_field:
-                        if not status:
-                            errors.append(f"{field.label} is required")
-                    # For all other fields, check value
-                    else:
-                        if not value:
-                            errors.append(f"{field.label} is required")
-                
-                # Check if comment is required when NOK/No
-                if field.requires_comment_if_nok:
-                    # Check status field if it exists
-                    if field.has_status_field:
-                        if status in ['NOK', 'No'] and not comment:
-                            errors.append(f"Comment is required for '{field.label}' when {status}")
-                    # Otherwise check the value itself for OK/NOK or Yes/No fields
-                    elif field.field_type in ['ok_nok', 'yes_no']:
-                        if value in ['NOK', 'No'] and not comment:
-                            errors.append(f"Comment is required for '{field.label}' when {value}")
-                
-                # Validate numeric ranges
-                if field.field_type in ['number', 'decimal'] and value:
-                    try:
-                        numeric_value = float(value)
-                        if field.min_value is not None and numeric_value < field.min_value:
-                            errors.append(f"{field.label} must be at least {field.min_value} {field.unit}")
-                        if field.max_value is not None and numeric_value > field.max_value:
-                            errors.append(f"{field.label} must be at most {field.max_value} {field.unit}")
-                    except ValueError:
-                        errors.append(f"{field.label} must be a valid number")
-                
-                # Create field response
-                ChecksheetFieldResponse.objects.create(
-                    response=response,
-                    field=field,
-                    value=value,
-                    status=status,
-                    comment=comment,
-                    filled_by=request.user
-                )
+        rows, errors = read_field_values(schema, request.POST)
         
         if errors:
-            # If there are errors, show them and delete the response
+            # If there are errors, show them and re-render the form with the data
             for error in errors:
                 messages.error(request, error)
-            response.delete()
-            
-            # Properly prefetch related fields for re-rendering
-            sections_with_fields = checksheet.sections.filter(is_active=True).prefetch_related(
-                Prefetch('fields', queryset=ChecksheetField.objects.filter(is_active=True).order_by('order'))
-            ).order_by('order')
-            
-            # Re-render form with data
             context = {
                 'checksheet': checksheet,
-                'sections': sections_with_fields,
+                'sections': schema.sections,
                 'page_title': f'Create {checksheet.name}',
                 'is_edit': False,
                 'form_data': request.POST
             }
             return render(request, 'checksheets/checksheet_form.html', context)
         
+        # Create response
+        with transaction.atomic():
+            response = ChecksheetResponse.objects.create(
+                checksheet=checksheet,
+                filled_by=request.user,
+                status='draft'
+            )
+            save_field_responses(response, rows, request.user)
+        
         # Check if user wants to submit or save as draft
         action = request.POST.get('action')
         if action == 'submit':
@@ -9251,13 +8381,9 @@ def create_checksheet_response(request, checksheet_id):
             return redirect('edit_checksheet_response', response_id=response.id)
     
     # GET request - show form
-    sections = checksheet.sections.filter(is_active=True).prefetch_related(
-        Prefetch('fields', queryset=ChecksheetField.objects.filter(is_active=True).order_by('order'))
-    ).order_by('order')
-    
     context = {
         'checksheet': checksheet,
-        'sections': sections,
+        'sections': schema.sections,
         'page_title': f'Create {checksheet.name}',
         'is_edit': False
     }
@@ -9267,6 +8393,8 @@ def create_checksheet_response(request, checksheet_id):
 @login_required
 def edit_checksheet_response(request, response_id):
     """Edit an existing checksheet response"""
+    from .checksheet_utils import read_field_values, save_field_responses, schema_cache
+
     response = get_object_or_404(
         ChecksheetResponse.objects.select_related('checksheet', 'filled_by'),
         pk=response_id
@@ -9291,98 +8419,12 @@ def edit_checksheet_response(request, response_id):
         return redirect('checksheet_response_detail', response_id=response.id)
     
     checksheet = response.checksheet
+    schema = schema_cache.get(checksheet.pk)
     
     if request.method == 'POST':
-        selected_model = None
-        errors = []
-        
-        # First pass: collect selected model
-        for section in checksheet.sections.filter(is_active=True):
-            for field in section.fields.filter(is_active=True):
-                if 'Program selection' in field.label or 'program' in field.label.lower():
-                    field_key = f'field_{field.id}'
-                    selected_model = request.POST.get(field_key, '')
-                    break
-        
-        # Second pass: update all fields
-        for section in checksheet.sections.filter(is_active=True).order_by('order'):
-            for field in section.fields.filter(is_active=True).order_by('order'):
-                field_key = f'field_{field.id}'
-                status_key = f'status_{field.id}'
-                comment_key = f'comment_{field.id}'
-                
-                # Initialize variables
-                value = ''
-                status = ''
-                comment = request.POST.get(comment_key, '').strip()
-                
-                # Handle different field types correctly
-                if field.field_type == 'ok_nok':
-                    if field.has_status_field:
-                        status = request.POST.get(status_key, '').strip()
-                        value = request.POST.get(field_key, '').strip()
-                    else:
-                        value = request.POST.get(field_key, '').strip()
-                        status = ''
-                elif field.field_type == 'yes_no':
-                    if field.has_status_field:
-                        status = request.POST.get(status_key, '').strip()
-                        value = request.POST.get(field_key, '').strip()
-                    else:
-                        value = request.POST.get(field_key, '').strip()
-                        status = ''
-                else:
-                    value = request.POST.get(field_key, '').strip()
-                    if field.has_status_field:
-                        status = request.POST.get(status_key, '').strip()
-                
-                # Auto-fill based on model (only if value is empty)
-                if field.auto_fill_based_on_model and selected_model and field.model_value_mapping and not value:
-                    auto_value = field.get_value_for_model(selected_model)
-                    if auto_value:
-                        value = auto_value
-                
-                # VALIDATION
-                if field.is_required:
-                    if field.field_type == 'ok_nok' and not field.has_status_field:
-                        if not value:
-                            errors.append(f"{field.label} is required")
-                    elif field.has_status_field:
-                        if not status:
-                            errors.append(f"{field.label} is required")
-                    else:
-                        if not value:
-                            errors.append(f"{field.label} is required")
-                
-                if field.requires_comment_if_nok:
-                    if field.has_status_field:
-                        if status in ['NOK', 'No'] and not comment:
-                            errors.append(f"Comment is required for '{field.label}' when {status}")
-                    elif field.field_type in ['ok_nok', 'yes_no']:
-                        if value in ['NOK', 'No'] and not comment:
-                            errors.append(f"Comment is required for '{field.label}' when {value}")
-                
-                if field.field_type in ['number', 'decimal'] and value:
-                    try:
-                        numeric_value = float(value)
-                        if field.min_value is not None and numeric_value < field.min_value:
-                            errors.append(f"{field.label} must be at least {field.min_value} {field.unit}")
-                        if field.max_value is not None and numeric_value > field.max_value:
-                            errors.append(f"{field.label} must be at most {field.max_value} {field.unit}")
-                    except ValueError:
-                        errors.append(f"{field.label} must be a valid number")
-                
-                # Update or create field response
-                field_response, created = ChecksheetFieldResponse.objects.update_or_create(
-                    response=response,
-                    field=field,
-                    defaults={
-                        'value': value,
-                        'status': status,
-                        'comment': comment,
-                        'filled_by': request.user
-                    }
-                )
+        rows, errors = read_field_values(schema, request.POST)
+        
+        save_field_responses(response, rows, request.user)
         
         if errors:
             for error in errors:
@@ -9404,15 +8446,13 @@ def edit_checksheet_response(request, response_id):
                 return redirect('edit_checksheet_response', response_id=response.id)
     
     # GET request or form has errors - show form with existing data
-    sections = checksheet.sections.filter(is_active=True).prefetch_related(
-        Prefetch('fields', queryset=ChecksheetField.objects.filter(is_active=True).order_by('order'))
-    ).order_by('order')
+    sections = schema.sections
     
     # Build response data for template
     existing_responses = {}
-    for field_response in response.field_responses.select_related('field'):
-        existing_responses[field_response.field.id] = {
-            'field_id': field_response.field.id,
+    for field_response in response.field_responses.all():
+        existing_responses[field_response.field_id] = {
+            'field_id': field_response.field_id,
             'value': field_response.value,
             'status': field_response.status,
             'comment': field_response.comment,
@@ -9576,11 +8616,13 @@ def edit_checksheet_response(request, response_id):
 @login_required
 def checksheet_response_detail(request, response_id):
     """View checksheet response details"""
+    from .checksheet_utils import schema_cache
+
     response = get_object_or_404(
         ChecksheetResponse.objects.select_related(
             'checksheet', 'filled_by', 'supervisor_approved_by', 'quality_approved_by'
         ).prefetch_related(
-            'field_responses__field__section'
+            'field_responses__field'
         ),
         pk=response_id
     )
@@ -9591,14 +8633,15 @@ def checksheet_response_detail(request, response_id):
             messages.error(request, 'You do not have permission to view this response')
             return redirect('checksheet_responses_list')
     
-    # Group responses by section
+    # Group the (prefetched) responses under the checksheet's active sections
+    by_section = defaultdict(list)
+    for field_response in response.field_responses.all():
+        by_section[field_response.field.section_id].append(field_response)
+    
     sections_data = []
-    for section in response.checksheet.sections.filter(is_active=True).order_by('order'):
-        field_responses = response.field_responses.filter(
-            field__section=section
-        ).select_related('field').order_by('field__order')
-        
-        if field_responses.exists():
+    for section in schema_cache.get(response.checksheet_id).sections:
+        field_responses = sorted(by_section.get(section.id, []), key=lambda r: r.field.order)
+        if field_responses:
             sections_data.append({
                 'section': section,
                 'field_responses': field_responses